@@ -0,0 +1,95 @@
+"""
+Report the bytes each degradation op allocates per frame, with and without a workspace.
+
+Every op is run on an HD1K-sized frame under tracemalloc (numpy reports its
+buffers to it, including the ones OpenCV returns). The peak above the live
+memory before the call is the memory the op allocated for that frame. 'fresh'
+calls the op the old way; 'workspace' passes a warm per-worker Workspace and a
+preallocated out, as a worker does from its second frame on.
+
+    python benchmarks/bench_allocations.py --width 2560 --height 1080
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.effects import (add_gaussian_noise, add_shot_noise, adjust_contrast_color, adjust_illumination,
+                               apply_white_balance, sample_low_light_params)
+from low_light.motion_blur import apply_motion_blur
+from low_light.noise_rng import RandomStreams
+from low_light.pipeline import Pipeline
+from low_light.workspace import Workspace
+
+
+def allocated_bytes(function):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+def measure(function, workspace):
+    # Run once so the workspace is sized for this resolution, then measure.
+    function(workspace)
+    return allocated_bytes(lambda: function(workspace))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-frame allocations of the degradation ops')
+    parser.add_argument('--width', type=int, default=2560)
+    parser.add_argument('--height', type=int, default=1080)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    frame_bytes = image.nbytes
+    out = np.empty_like(image)
+    streams = RandomStreams(0)
+
+    def generator(stage):
+        return streams.generator(0, stage)
+
+    def unless_fresh(workspace, value):
+        return None if workspace is None else value
+
+    ops = {
+        'shot noise': lambda ws: add_shot_noise(image, 0.1, generator('shot_noise'), unless_fresh(ws, out), ws),
+        'gaussian noise': lambda ws: add_gaussian_noise(image, 0, 10, generator('gaussian_noise'),
+                                                        unless_fresh(ws, out), ws),
+        'illumination': lambda ws: adjust_illumination(image, 0.5, unless_fresh(ws, out), ws),
+        'motion blur': lambda ws: apply_motion_blur(image, 5, out=unless_fresh(ws, out)),
+        'contrast + color (hsv)': lambda ws: adjust_contrast_color(image, 1.1, 0.7, 'hsv', unless_fresh(ws, out), ws),
+        'white balance': lambda ws: apply_white_balance(image, 0.9, 1.0, 1.1, unless_fresh(ws, out), ws),
+    }
+
+    params = sample_low_light_params(generator('params'))
+    batch = np.stack([image, image])
+    batch_out = np.empty_like(batch)
+    pipeline = Pipeline()
+    ops['pipeline, pair'] = lambda ws: pipeline.run(batch, params, streams, [(0, 0), (0, 1)],
+                                                    unless_fresh(ws, batch_out), ws)
+
+    print(f"frame {args.width}x{args.height}x3 ({frame_bytes / 2 ** 20:.1f} MiB), MiB allocated per call")
+    print(f"{'op':<24} {'fresh':>8} {'workspace':>10} {'frames':>7}")
+    total_fresh = total_workspace = 0
+    for name, op in ops.items():
+        fresh = measure(op, None)
+        workspace = measure(op, Workspace())
+        if not name.startswith('pipeline'):
+            total_fresh += fresh
+            total_workspace += workspace
+        print(f"{name:<24} {fresh / 2 ** 20:>8.1f} {workspace / 2 ** 20:>10.1f} "
+              f"{fresh / frame_bytes:>3.1f}->{workspace / frame_bytes:.1f}")
+    print(f"{'staged ops, summed':<24} {total_fresh / 2 ** 20:>8.1f} {total_workspace / 2 ** 20:>10.1f} "
+          f"{total_fresh / frame_bytes:>3.1f}->{total_workspace / frame_bytes:.1f}")
+
+
+if __name__ == '__main__':
+    main()
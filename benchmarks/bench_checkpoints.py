@@ -0,0 +1,77 @@
+"""
+Benchmark recording finished images: the old rewrite-the-whole-JSON-per-image
+checkpoint against the SQLite CheckpointStore.
+
+Both record the same ChairsSDHom-style relative paths one at a time, as the
+converters do. Reported are the wall time, the time per image over the last
+tenth of the run (which grows with n for JSON and stays flat for the store)
+and the bytes written to disk; for the store that is the final size of the
+database and its write-ahead log, a lower bound.
+
+    python benchmarks/bench_checkpoints.py --sizes 1000 4000 16000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.checkpoints import CheckpointStore
+
+
+def paths(count):
+    return [f"train/t{i % 2}/{i // 2:07d}.png" for i in range(count)]
+
+
+def record_json(names, directory):
+    path = os.path.join(directory, 'checkpoints.json')
+    checkpoints = {}
+    written = 0
+    timings = []
+    for name in names:
+        start = time.perf_counter()
+        checkpoints[name] = True
+        with open(path, 'w') as f:
+            json.dump(checkpoints, f)
+        written += os.path.getsize(path)
+        timings.append(time.perf_counter() - start)
+    return timings, written
+
+
+def record_store(names, directory):
+    path = os.path.join(directory, 'checkpoints.sqlite')
+    timings = []
+    with CheckpointStore(path) as store:
+        for name in names:
+            start = time.perf_counter()
+            store.add(name)
+            timings.append(time.perf_counter() - start)
+    written = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+                  if name.startswith('checkpoints.sqlite'))
+    return timings, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark checkpoint recording')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000])
+    parser.add_argument('--json_limit', type=int, default=4000, help='Largest size timed for the JSON checkpoint')
+    args = parser.parse_args()
+
+    print(f"{'images':>7} {'method':<7} {'total s':>9} {'us/image at end':>16} {'MiB written':>12}")
+    for size in args.sizes:
+        names = paths(size)
+        for method, record in (('json', record_json), ('sqlite', record_store)):
+            if method == 'json' and size > args.json_limit:
+                continue
+            with tempfile.TemporaryDirectory() as directory:
+                timings, written = record(names, directory)
+            tail = timings[-max(1, size // 10):]
+            print(f"{size:>7} {method:<7} {sum(timings):>9.2f} {1e6 * sum(tail) / len(tail):>16.1f} "
+                  f"{written / 2 ** 20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
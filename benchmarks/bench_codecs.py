@@ -0,0 +1,80 @@
+"""
+Benchmark the output codecs on darkened images: encode time, decode time and
+bytes per image for each codec spec.
+
+Images are taken from a dataset (--dataset and --src, the first --limit
+images of its plan) or, by default, from a synthetic FlyingChairsOcc-style
+set (see bench_write_through.py), and darkened the way the dataset is
+converted by default. Encode time is what a write-bound conversion pays per
+image, decode time what a read-bound training job pays, and the size what
+both pay in disk bandwidth.
+
+    python benchmarks/bench_codecs.py --dataset kitti2015 --src /media/.../KITTI_2015 --limit 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_write_through import make_dataset
+
+from low_light.codecs import get_codec
+from low_light.convert import DARKEN_METHODS
+from low_light.datasets import get_dataset, plan_conversion
+
+DEFAULT_CODECS = ['source', 'png:level=1', 'png:level=3,strategy=rle', 'png:level=6', 'png:level=9',
+                  'png:level=6,strategy=huffman', 'webp', 'npy']
+
+
+def load_images(spec, src, limit):
+    images = []
+    for task in plan_conversion(spec, src).images[:limit]:
+        image = cv2.imread(os.path.join(src, task.path), cv2.IMREAD_UNCHANGED)
+        images.append((task.path, DARKEN_METHODS[spec.method](image, spec.darkness)))
+    return images
+
+
+def measure(codec, images):
+    start = time.perf_counter()
+    encoded = [codec.encode(image, path) for path, image in images]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for data in encoded:
+        codec.decode(data)
+    decode = time.perf_counter() - start
+    return encode, decode, sum(data.nbytes for data in encoded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark output codecs')
+    parser.add_argument('--dataset', type=str, default='flyingchairsocc')
+    parser.add_argument('--src', type=str, default=None, help='Root of the dataset (default: a synthetic one)')
+    parser.add_argument('--limit', type=int, default=50, help='Images to encode')
+    parser.add_argument('--codecs', type=str, nargs='+', default=DEFAULT_CODECS)
+    args = parser.parse_args()
+
+    spec = get_dataset(args.dataset)
+    with tempfile.TemporaryDirectory() as root:
+        src = args.src
+        if src is None:
+            src = os.path.join(root, 'FlyingChairsOcc')
+            make_dataset(src, (args.limit + 1) // 2, 512, 384)
+        images = load_images(spec, src, args.limit)
+    raw = sum(image.nbytes for _, image in images)
+    print(f"{len(images)} {args.dataset} images, darkened by {spec.darkness} ({spec.method}), "
+          f"{raw / len(images) / 2 ** 10:.0f} KiB raw each")
+    print(f"{'codec':<30} {'encode ms':>10} {'decode ms':>10} {'KiB/image':>10} {'of raw':>7}")
+    for spec_string in args.codecs:
+        codec = get_codec(spec_string)
+        encode, decode, size = measure(codec, images)
+        print(f"{codec.spec:<30} {1e3 * encode / len(images):>10.2f} {1e3 * decode / len(images):>10.2f} "
+              f"{size / len(images) / 2 ** 10:>10.1f} {100 * size / raw:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the pass-through copy: shutil.copy2 one file after another, as the
+converters did, against copy_fast on a pool of threads as PassThrough runs it.
+
+Files of --size_mib MiB each (ground truth sized, e.g. .pfm disparity or .flo
+flow) are written to --root and copied to a fresh directory on --target, so
+pointing the two at different volumes measures a cross-device copy. The page
+cache is not dropped; run with files larger than memory, or drop it between
+runs (echo 3 > /proc/sys/vm/drop_caches), to measure the disks rather than the
+kernel's memcpy. Reported are the wall time, the throughput and the method
+copy_fast settled on (reflink on Btrfs/XFS, copy_file_range elsewhere).
+
+    python benchmarks/bench_copy.py --files 200 --size_mib 8 --threads 1 4 8 --target /media/.../scratch
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.files import copy_fast
+
+
+def make_files(directory, count, size):
+    block = os.urandom(min(size, 2 ** 20))
+    names = []
+    for index in range(count):
+        name = f"{index:06d}_flow.flo"
+        with open(os.path.join(directory, name), 'wb') as f:
+            for offset in range(0, size, len(block)):
+                f.write(block[:size - offset])
+        names.append(name)
+    return names
+
+
+def copy_serial(names, src, dst, threads):
+    for name in names:
+        shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+    return Counter({'copy2': len(names)})
+
+
+def copy_parallel(names, src, dst, threads):
+    with ThreadPoolExecutor(threads) as executor:
+        return Counter(executor.map(lambda name: copy_fast(os.path.join(src, name), os.path.join(dst, name)), names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pass-through copies')
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--size_mib', type=float, default=4)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--root', type=str, default=None,
+                        help='Directory of the source files (default: a temporary one)')
+    parser.add_argument('--target', type=str, default=None, help='Directory to copy into (default: next to the source)')
+    args = parser.parse_args()
+
+    size = int(args.size_mib * 2 ** 20)
+    with tempfile.TemporaryDirectory(dir=args.root) as root, \
+            tempfile.TemporaryDirectory(dir=args.target or root) as target:
+        names = make_files(root, args.files, size)
+        total = args.files * size
+        print(f"{args.files} files of {args.size_mib} MiB, {total / 2 ** 20:.0f} MiB")
+        runs = [('copy2', copy_serial, 1)] + [(f"copy_fast x{threads}", copy_parallel, threads)
+                                              for threads in args.threads]
+        for name, copy, threads in runs:
+            dst = tempfile.mkdtemp(dir=target)
+            start = time.perf_counter()
+            methods = copy(names, root, dst, threads)
+            elapsed = time.perf_counter() - start
+            shutil.rmtree(dst)
+            print(f"{name:<14} {elapsed:>7.2f} s {total / 2 ** 20 / elapsed:>9.1f} MiB/s  "
+                  f"{', '.join(sorted(methods))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the motion blur paths across kernel sizes.
+
+Horizontal blur compares the original dense k x k filter2D (kernel rebuilt per
+call) with the separable path. Slanted blur compares a per-call rotated kernel,
+the cached kernel and FFT convolution. The max column is the largest absolute
+difference from the dense reference of the same angle.
+
+    python benchmarks/bench_motion_blur.py --sizes 3 7 15 31 63
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light import motion_blur
+from low_light.motion_blur import apply_motion_blur
+
+
+def median_time(function, repeats):
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def uncached_rotated(image, kernel_size, angle):
+    motion_blur.line_kernel.cache_clear()
+    return apply_motion_blur(image, kernel_size, angle, method='kernel')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark motion blur paths')
+    parser.add_argument('--width', type=int, default=2560)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(range(3, 32)))
+    parser.add_argument('--angle', type=float, default=30.0, help='Angle of the slanted blur')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (0, 0), 2)
+
+    print(f"frame {args.width}x{args.height}x3, median of {args.repeats} runs, times in ms")
+    print(f"{'k':>3} | {'dense':>7} {'separ.':>7} {'speedup':>7} {'max':>3} | "
+          f"{'rotate':>7} {'cached':>7} {'fft':>7} {'max':>3}")
+    for size in args.sizes:
+        reference = apply_motion_blur(image, size, method='dense')
+        separable = apply_motion_blur(image, size, method='separable')
+        dense_time = median_time(lambda: apply_motion_blur(image, size, method='dense'), args.repeats)
+        separable_time = median_time(lambda: apply_motion_blur(image, size, method='separable'), args.repeats)
+        separable_error = np.abs(separable.astype(np.int16) - reference).max()
+
+        slanted_reference = apply_motion_blur(image, size, args.angle, method='kernel')
+        rotate_time = median_time(lambda: uncached_rotated(image, size, args.angle), args.repeats)
+        cached_time = median_time(lambda: apply_motion_blur(image, size, args.angle, method='kernel'), args.repeats)
+        fft = apply_motion_blur(image, size, args.angle, method='fft')
+        fft_time = median_time(lambda: apply_motion_blur(image, size, args.angle, method='fft'), args.repeats)
+        fft_error = np.abs(fft.astype(np.int16) - slanted_reference).max()
+
+        print(f"{size:>3} | {dense_time * 1e3:>7.1f} {separable_time * 1e3:>7.1f} "
+              f"{dense_time / separable_time:>6.1f}x {separable_error:>3} | "
+              f"{rotate_time * 1e3:>7.1f} {cached_time * 1e3:>7.1f} {fft_time * 1e3:>7.1f} {fft_error:>3}")
+
+
+if __name__ == '__main__':
+    main()
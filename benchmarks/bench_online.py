@@ -0,0 +1,79 @@
+"""
+Benchmark degrading a dataset while it is read against reading a converted
+(pre-darkened) copy: what training pays per sample for not keeping dark
+copies on disk.
+
+A synthetic FlyingChairsOcc-style dataset (see bench_write_through.py) is
+converted once into PNGs with each effect. Every epoch then reads all
+samples: from the converted copy, decoding the PNGs and reading the ground
+truth, and through DegradedDataset, decoding the clean PNGs and degrading
+them. Reported are samples per second for each, single-threaded, so the
+numbers scale with the workers of a data loader.
+
+    python benchmarks/bench_online.py --pairs 100 --width 1024 --height 436
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_write_through import make_dataset
+
+from low_light.convert import convert_dataset
+from low_light.datasets import get_dataset
+from low_light.online import DegradedDataset, dataset_options
+
+
+def read_converted(root, dataset, index):
+    # The sample of dataset, read from its converted copy at root
+    sample = {}
+    for path, task in dataset.samples[index][1]:
+        if task is None:
+            with open(os.path.join(root, path), 'rb') as f:
+                sample[path] = f.read()
+        else:
+            sample[path] = cv2.imdecode(np.fromfile(os.path.join(root, path), dtype=np.uint8), cv2.IMREAD_COLOR)
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark on-the-fly degradation against pre-darkened images')
+    parser.add_argument('--pairs', type=int, default=100)
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=436)
+    parser.add_argument('--effects', type=str, nargs='+', default=['darken', 'low_light'])
+    parser.add_argument('--root', type=str, default=None, help='Directory to work in (default: a temporary one)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    spec = get_dataset('flyingchairsocc')
+    with tempfile.TemporaryDirectory(dir=args.root) as root:
+        src = os.path.join(root, 'FlyingChairsOcc')
+        make_dataset(src, args.pairs, args.width, args.height)
+        print(f"{args.pairs} pairs of {args.width}x{args.height}")
+        for effect in args.effects:
+            options = dataset_options(spec, effect)
+            dst = os.path.join(root, effect)
+            convert_dataset(spec, src, dst, options, seed=0)
+            dataset = DegradedDataset(spec, src, options, seed=0)
+            runs = (
+                ('pre-darkened', lambda index: read_converted(dst, dataset, index)),
+                ('on the fly', dataset.__getitem__),
+            )
+            for name, read in runs:
+                start = time.perf_counter()
+                for index in range(len(dataset)):
+                    read(index)
+                elapsed = time.perf_counter() - start
+                print(f"{effect:<10} {name:<13} {elapsed:>7.2f} s {len(dataset) / elapsed:>9.1f} samples/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the parameter designs against the per-pair draws: time to draw
+the parameters of N pairs and how evenly they cover the parameter ranges.
+
+Per-pair streams are what lll.py and convert.py do by default, one
+sample_low_light_params call per pair; the designs draw all N in one
+sample_low_light_table call. Coverage is measured on the parameters mapped
+back to the unit cube: the centered L2 discrepancy (lower is more even) and
+the share of the cells of a --cells x --cells grid filled in every
+two-parameter projection, averaged over the pairs of continuous parameters
+(how much of each pairwise combination the set of pairs explores; the blur
+kernel only takes a few values).
+
+    python benchmarks/bench_sampler.py --pairs 256 1024 4096
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.effects import DEFAULT_RANGES, PARAMETER_NAMES, sample_low_light_params, sample_low_light_table
+from low_light.noise_rng import RandomStreams
+from low_light.sampling import DESIGNS
+
+
+def centered_discrepancy(points):
+    # Hickernell's centered L2 discrepancy, O(N^2) in memory: keep N to a few thousand
+    count, dims = points.shape
+    offset = np.abs(points - 0.5)
+    single = np.prod(1 + 0.5 * offset - 0.5 * offset ** 2, axis=1).sum()
+    double = np.ones((count, count))
+    for dim in range(dims):
+        column = offset[:, dim]
+        double *= 1 + 0.5 * column[:, None] + 0.5 * column[None, :] - 0.5 * np.abs(
+            points[:, dim][:, None] - points[:, dim][None, :])
+    return np.sqrt((13 / 12) ** dims - 2 / count * single + double.sum() / count ** 2)
+
+
+def pairwise_coverage(points, cells):
+    cell = np.minimum((points * cells).astype(int), cells - 1)
+    continuous = [dim for dim, name in enumerate(DEFAULT_RANGES) if name != 'blur_kernel']
+    filled = [len(np.unique(cell[:, i] * cells + cell[:, j])) / cells ** 2
+              for i, j in itertools.combinations(continuous, 2)]
+    return np.mean(filled)
+
+
+def to_unit(table):
+    # Parameters back onto [0, 1] by their ranges; integers by their equal bins
+    columns = []
+    for name, (low, high) in DEFAULT_RANGES.items():
+        values = np.asarray(table[PARAMETER_NAMES[name]], dtype=np.float64)
+        if name == 'blur_kernel':
+            values, high = values + 0.5, high + 1
+        columns.append((values - low) / (high - low))
+    return np.column_stack(columns)
+
+
+def per_pair(count, seed):
+    streams = RandomStreams(seed)
+    draws = [sample_low_light_params(streams.generator(index, 'params')) for index in range(count)]
+    return {name: np.array([draw[name] for draw in draws]) for name in draws[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parameter designs')
+    parser.add_argument('--pairs', type=int, nargs='+', default=[256, 1024, 4096])
+    parser.add_argument('--cells', type=int, default=16, help='Grid cells per parameter for the coverage')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'pairs':>6} {'design':<10} {'draw ms':>9} {'CL2 discrepancy':>16} {'pairwise coverage':>18}")
+    for count in args.pairs:
+        runs = [('per-pair', lambda: per_pair(count, args.seed))]
+        runs += [(design, lambda design=design: sample_low_light_table(count, np.random.default_rng(args.seed),
+                                                                       design=design)) for design in DESIGNS]
+        for name, draw in runs:
+            start = time.perf_counter()
+            table = draw()
+            elapsed = time.perf_counter() - start
+            unit = to_unit(table)
+            print(f"{count:>6} {name:<10} {1e3 * elapsed:>9.1f} {centered_discrepancy(unit):>16.5f} "
+                  f"{100 * pairwise_coverage(unit, args.cells):>17.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the contrast and saturation stage on KITTI-sized frames.
+
+Compares the legacy convertScaleAbs + HSV round trip with the fused contrast
+and luma-blend matrix. The diff columns are the mean, 99th percentile and max
+absolute difference between the two modes, in uint8 levels.
+
+    python benchmarks/bench_saturation.py --image datasets/KITTI_2015/testing/image_2/000164_10.png
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.saturation import adjust_contrast_saturation
+
+
+def median_time(function, repeats):
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the saturation modes')
+    parser.add_argument('--image', type=str, default=None, help='BGR image to use instead of a synthetic frame')
+    parser.add_argument('--width', type=int, default=1242)
+    parser.add_argument('--height', type=int, default=375)
+    parser.add_argument('--contrast', type=float, nargs='+', default=[0.8, 1.0, 1.2])
+    parser.add_argument('--color', type=float, nargs='+', default=[0.6, 0.8, 1.0])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.image:
+        image = cv2.imread(args.image)
+        if image is None:
+            sys.exit(f"Could not load '{args.image}'")
+    else:
+        image = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (0, 0), 3)
+        image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+
+    height, width = image.shape[:2]
+    print(f"frame {width}x{height}x3, median of {args.repeats} runs, times in ms")
+    print(f"{'contrast':>8} {'color':>5} | {'hsv':>6} {'luma':>6} {'speedup':>7} | "
+          f"{'mean':>5} {'p99':>4} {'max':>4}")
+    for contrast in args.contrast:
+        for color in args.color:
+            legacy = adjust_contrast_saturation(image, contrast, color, mode='hsv')
+            fused = adjust_contrast_saturation(image, contrast, color, mode='luma')
+            hsv_time = median_time(lambda: adjust_contrast_saturation(image, contrast, color, mode='hsv'),
+                                   args.repeats)
+            luma_time = median_time(lambda: adjust_contrast_saturation(image, contrast, color, mode='luma'),
+                                    args.repeats)
+            difference = np.abs(fused.astype(np.int16) - legacy)
+            print(f"{contrast:>8.2f} {color:>5.2f} | {hsv_time * 1e3:>6.2f} {luma_time * 1e3:>6.2f} "
+                  f"{hsv_time / luma_time:>6.1f}x | {difference.mean():>5.2f} "
+                  f"{np.percentile(difference, 99):>4.0f} {difference.max():>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark reading a converted dataset as a tree of small files against tar
+shards: the training-side cost of per-file metadata.
+
+A synthetic FlyingChairsOcc-style dataset (see bench_write_through.py) is
+converted once into files and once into shards. Both are then read in full:
+the files one open() at a time in a shuffled sample order, as a map-style
+loader does; the shards sequentially through ShardReader, and once more in
+the same shuffled order through the shard indexes. Reported are the wall
+time, samples per second and the number of files each layout holds. Point
+--root at the external volume and drop the page cache (echo 3 >
+/proc/sys/vm/drop_caches) before running to measure the disk rather than
+memory.
+
+    python benchmarks/bench_shards.py --pairs 2000 --root /media/.../scratch
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_write_through import make_dataset
+
+from low_light.convert import convert_dataset
+from low_light.datasets import get_dataset, walk_files
+from low_light.shards import ShardReader, pack_dataset
+
+
+def read_files(root, samples, order):
+    for key in order:
+        for path in samples[key]:
+            with open(os.path.join(root, path), 'rb') as f:
+                f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reading files against tar shards')
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--width', type=int, default=512)
+    parser.add_argument('--height', type=int, default=384)
+    parser.add_argument('--shard_size', type=float, default=256, help='MiB per shard')
+    parser.add_argument('--root', type=str, default=None, help='Directory to work in (default: a temporary one)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    spec = get_dataset('flyingchairsocc')
+    options = {'effect': 'darken', 'method': 'scale', 'darkness': 0.12, 'haze': 0.0}
+    with tempfile.TemporaryDirectory(dir=args.root) as root:
+        src, files, shards = (os.path.join(root, name) for name in ('FlyingChairsOcc', 'files', 'shards'))
+        make_dataset(src, args.pairs, args.width, args.height)
+        convert_dataset(spec, src, files, options, seed=0)
+        pack_dataset(spec, src, shards, options, seed=0, shard_size=int(args.shard_size * 2 ** 20))
+
+        samples = {}
+        for path in walk_files(files):
+            samples.setdefault(spec.sample_key(path), []).append(path)
+        order = sorted(samples)
+        random.Random(0).shuffle(order)
+        reader = ShardReader(shards)
+        print(f"{len(samples)} samples: {sum(map(len, samples.values()))} files, or {len(reader.shards)} shards")
+        runs = (
+            ('files, shuffled', lambda: read_files(files, samples, order)),
+            ('shards, streamed', lambda: sum(1 for _ in reader)),
+            ('shards, shuffled', lambda: [reader[key] for key in order]),
+        )
+        for name, read in runs:
+            start = time.perf_counter()
+            read()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<17} {elapsed:>7.2f} s {len(samples) / elapsed:>9.0f} samples/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark the shot noise samplers against exact Poisson.
+
+For each noise level, every mode is timed on a KITTI-sized frame whose pixels
+cover all 256 intensities, and its output is compared with the exact sampler
+per input intensity: largest mean and standard deviation error, and the
+average total variation distance between the two output histograms.
+
+    python benchmarks/bench_shot_noise.py --repeats 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.shot_noise import choose_shot_noise_mode, quantize_noise_level, sample_shot_noise, shot_noise_counts
+
+
+def time_mode(image, noise_level, mode, repeats, seed):
+    rng = np.random.default_rng(seed)
+    sample_shot_noise(image, noise_level, mode, rng)  # warm-up, builds tables
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = sample_shot_noise(image, noise_level, mode, rng)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)), output
+
+
+def per_intensity_histograms(image, output):
+    counts = np.bincount(image.ravel().astype(np.int64) * 256 + output.ravel(), minlength=256 * 256)
+    return counts.reshape(256, 256).astype(np.float64)
+
+
+def compare(reference, candidate):
+    values = np.arange(256)
+    ref_total = reference.sum(axis=1, keepdims=True)
+    cand_total = candidate.sum(axis=1, keepdims=True)
+    ref_p, cand_p = reference / ref_total, candidate / cand_total
+    ref_mean, cand_mean = ref_p @ values, cand_p @ values
+    ref_std = np.sqrt(np.maximum(ref_p @ values ** 2 - ref_mean ** 2, 0))
+    cand_std = np.sqrt(np.maximum(cand_p @ values ** 2 - cand_mean ** 2, 0))
+    tv = 0.5 * np.abs(ref_p - cand_p).sum(axis=1)
+    return np.abs(cand_mean - ref_mean).max(), np.abs(cand_std - ref_std).max(), tv.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shot noise sampling modes')
+    parser.add_argument('--width', type=int, default=1242)
+    parser.add_argument('--height', type=int, default=375)
+    parser.add_argument('--noise_levels', type=float, nargs='+', default=[0.05, 0.2, 1.0, 8.0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    image = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+
+    print(f"frame {args.width}x{args.height}x3, median of {args.repeats} runs")
+    print(f"{'level':>6} {'mode':>8} {'ms':>8} {'speedup':>8} {'|dmean|':>8} {'|dstd|':>8} {'TV':>7}")
+    for noise_level in args.noise_levels:
+        start = time.perf_counter()
+        shot_noise_counts(quantize_noise_level(noise_level))
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        exact_time, exact = time_mode(image, noise_level, 'poisson', args.repeats, args.seed)
+        # A second, independent exact draw gives the sampling-noise floor of the statistics.
+        _, exact_again = time_mode(image, noise_level, 'poisson', 1, args.seed + 1)
+        reference = per_intensity_histograms(image, exact)
+        for mode in ('poisson', 'normal', 'table'):
+            if mode == 'poisson':
+                elapsed, output = exact_time, exact_again
+            else:
+                elapsed, output = time_mode(image, noise_level, mode, args.repeats, args.seed + 1)
+            dmean, dstd, tv = compare(reference, per_intensity_histograms(image, output))
+            print(f"{noise_level:>6g} {mode:>8} {elapsed * 1e3:>8.1f} {exact_time / elapsed:>7.1f}x "
+                  f"{dmean:>8.3f} {dstd:>8.3f} {tv:>7.4f}")
+        print(f"{'':>6} auto -> {choose_shot_noise_mode(noise_level)}, table build {build_ms:.1f} ms (cached)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the streaming conversion against the per-image pool.
+
+A synthetic FlyingChairsOcc-style dataset (see bench_write_through.py) is
+converted with the low_light effect, once by workers that read, degrade and
+write whole images in turn and once through the three-stage
+StreamingPipeline, for every --workers given. Reported are the wall time and,
+for streaming, the occupancy of each stage: the stage near 100% is the
+bottleneck. Point --root at the external volume to see disk waits overlap.
+
+    python benchmarks/bench_streaming.py --pairs 100 --workers 1 4 --readers 2 --writers 2
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_write_through import make_dataset
+
+from low_light.convert import build_parser, convert_dataset, effect_options
+from low_light.datasets import get_dataset
+
+
+class _Report(logging.Handler):
+    # Keeps the stage occupancy line convert_dataset logs at the end
+    def __init__(self):
+        super().__init__()
+        self.occupancy = ''
+
+    def emit(self, record):
+        if record.getMessage().startswith('Stage occupancy'):
+            self.occupancy = record.getMessage()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming conversion')
+    parser.add_argument('--pairs', type=int, default=100)
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=436)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--compute', type=str, default='process', choices=('process', 'thread'))
+    parser.add_argument('--root', type=str, default=None, help='Directory to work in (default: a temporary one)')
+    args = parser.parse_args()
+    report = _Report()
+    logging.basicConfig(level=logging.INFO, handlers=[report])
+
+    spec = get_dataset('flyingchairsocc')
+    options = effect_options(build_parser().parse_args(['flyingchairsocc', '.', '.', '--effect', 'low_light']), spec)
+    stream = {'readers': args.readers, 'writers': args.writers, 'compute': args.compute, 'byte_budget': 2 ** 30}
+    with tempfile.TemporaryDirectory(dir=args.root) as root:
+        src = os.path.join(root, 'FlyingChairsOcc')
+        make_dataset(src, args.pairs, args.width, args.height)
+        print(f"{args.pairs} pairs of {args.width}x{args.height}, low_light effect")
+        for workers in args.workers:
+            for name, settings in (('per-image', None), ('streaming', stream)):
+                dst = os.path.join(root, f"{name}_{workers}")
+                report.occupancy = ''
+                start = time.perf_counter()
+                convert_dataset(spec, src, dst, options, seed=0, workers=workers, stream=settings)
+                elapsed = time.perf_counter() - start
+                print(f"{name:<10} {workers:>2} workers {elapsed:>7.2f} s  {report.occupancy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the latency of degrading one frame: whole, or split into bands
+run by a pool of threads (Pipeline.run with threads).
+
+One frame goes through the full low-light pipeline with exact Poisson shot
+noise, as the slider GUIs preview it, from a warm workspace. Reported are
+the milliseconds per frame and the speedup over the whole-frame run, and
+whether every thread count gives the bytes of the single-thread run (the
+banded noise must not depend on the number of threads). The speedup is
+bounded by the cores: numpy and OpenCV only run bands at once on as many
+cores as there are.
+
+    python benchmarks/bench_threads.py --width 3840 --height 2160 --threads 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.noise_rng import RandomStreams
+from low_light.pipeline import Pipeline
+from low_light.workspace import Workspace
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark threaded single-frame pipeline runs')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--shot_noise_mode', type=str, default='poisson')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (1, args.height, args.width, 3), dtype=np.uint8)
+    params = dict(noise_level=0.1, gaussian_std=8.0, illumination_factor=0.5, blur_kernel_size=9,
+                  blur_angle=30.0, contrast_factor=1.1, color_factor=0.8, red_gain=1.1, green_gain=0.9,
+                  blue_gain=1.0)
+    pipeline = Pipeline(shot_noise_mode=args.shot_noise_mode)
+    out = np.empty_like(image)
+
+    print(f"frame {args.width}x{args.height}, {os.cpu_count()} cores")
+    print(f"{'threads':>8} {'ms/frame':>9} {'speedup':>8} {'same bytes':>11}")
+    baseline = reference = None
+    for threads in [None] + args.threads:
+        workspace = Workspace()
+        run = lambda: pipeline.run(image, params, RandomStreams(0), out=out, workspace=workspace, threads=threads)
+        result = run().copy()
+        elapsed = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            elapsed.append(time.perf_counter() - start)
+        best = min(elapsed)
+        baseline = baseline or best
+        if threads:
+            reference = result if reference is None else reference
+            same = str(np.array_equal(result, reference))
+        else:
+            same = '-'
+        print(f"{threads or 'whole':>8} {1e3 * best:>9.1f} {baseline / best:>7.2f}x {same:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark streaming a frame through the pipeline in bands of rows against
+processing it whole: the memory a worker holds for the temporaries of one
+frame, and the time per frame.
+
+Every run degrades one frame of the given size with the full low-light
+pipeline (slanted motion blur, long enough by default that filter2D would
+take its DFT path, so the blur needs its halo of rows), in place
+as degrade_image does with tile_rows, from a warm per-worker Workspace.
+'workspace' is the size of the buffers the workspace holds after the run;
+'peak' the most memory allocated during a run (under tracemalloc, which
+numpy reports its buffers to), on top of the frame itself. Each run is
+checked to produce the whole-frame bytes.
+
+    python benchmarks/bench_tiles.py --width 3840 --height 2160 --tile_rows 16 64 256
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.noise_rng import RandomStreams
+from low_light.pipeline import Pipeline
+from low_light.workspace import Workspace
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tiled against whole-frame pipeline runs')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--tile_rows', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--kernel', type=int, default=15, help='Motion blur kernel size')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (1, args.height, args.width, 3), dtype=np.uint8)
+    params = dict(noise_level=0.1, gaussian_std=8.0, illumination_factor=0.5, blur_kernel_size=args.kernel,
+                  blur_angle=30.0, contrast_factor=1.1, color_factor=0.8, red_gain=1.1, green_gain=0.9,
+                  blue_gain=1.0)
+    pipeline = Pipeline()
+    reference = pipeline.run(image, params, RandomStreams(0), out=np.empty_like(image))
+
+    print(f"frame {args.width}x{args.height}x3 ({image.nbytes / 2 ** 20:.1f} MiB)")
+    print(f"{'tile rows':>10} {'workspace MiB':>14} {'peak MiB':>9} {'ms/frame':>9} {'identical':>10}")
+    for tile_rows in [None] + args.tile_rows:
+        workspace = Workspace()
+        frame = image.copy()
+        if tile_rows:
+            run = lambda: pipeline.run(frame, params, RandomStreams(0), out=frame, workspace=workspace,
+                                       tile_rows=tile_rows)
+        else:
+            # Whole frames need an output of their own
+            out = np.empty_like(frame)
+            run = lambda: pipeline.run(frame, params, RandomStreams(0), out=out, workspace=workspace)
+        identical = np.array_equal(run(), reference)
+        elapsed = []
+        for _ in range(args.repeat):
+            frame[...] = image
+            start = time.perf_counter()
+            run()
+            elapsed.append(time.perf_counter() - start)
+        frame[...] = image
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        extra = workspace.nbytes + (0 if tile_rows else image.nbytes)
+        print(f"{tile_rows or 'whole':>10} {extra / 2 ** 20:>14.1f} {peak / 2 ** 20:>9.1f} "
+              f"{1e3 * min(elapsed):>9.1f} {str(identical):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark comparing a dataset tree with its converted copy: the
+is_directory_structure_identical of the old conversion scripts against
+scan_tree manifests, cold and through their caches.
+
+A FlyingThings3D-style tree (--directories sequence directories of --files
+files each) is generated in --root with an identical copy next to it. The old
+check walks the source and starts another os.walk of the destination for
+every source directory; scan_tree lists each tree once with os.scandir and,
+on the second run, only stats the directories whose cache entries it reuses.
+Point --root at the external volume, and drop the page cache between runs, to
+see the cost of the stat calls there.
+
+    python benchmarks/bench_tree_compare.py --directories 2000 --files 100
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.manifest import scan_tree
+
+
+def is_directory_structure_identical(src, dst):
+    # As in convert_hd1k.py, convert_kitti_15.py and convert_flyingthings3d_subset.py
+    for src_root, src_dirs, src_files in os.walk(src):
+        dst_root = src_root.replace(src, dst)
+
+        if not os.path.exists(dst_root):
+            return False
+
+        dst_dirs, dst_files = [], []
+        for _, dirs, files in os.walk(dst_root):
+            dst_dirs = dirs
+            dst_files = files
+            break
+
+        if set(src_dirs) != set(dst_dirs) or set(src_files) != set(dst_files):
+            return False
+
+    return True
+
+
+def make_tree(root, directories, files):
+    for index in range(directories):
+        directory = os.path.join(root, 'frames_cleanpass', 'TRAIN', 'A', f"{index:04d}", 'left')
+        os.makedirs(directory)
+        for frame in range(files):
+            open(os.path.join(directory, f"{frame:04d}.png"), 'wb').close()
+
+
+def compare_manifests(src, dst, state):
+    source = scan_tree(src, os.path.join(state, 'source_tree.json'))
+    target = scan_tree(dst, os.path.join(state, 'tree.json'))
+    return not source.diff(target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tree comparison')
+    parser.add_argument('--directories', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--root', type=str, default=None, help='Directory to work in (default: a temporary one)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.root) as root:
+        src, dst, state = (os.path.join(root, name) for name in ('FlyingThings3D', 'FlyingThings3D_ll', 'state'))
+        make_tree(src, args.directories, args.files)
+        # copytree keeps mtimes, as the converted copies do
+        shutil.copytree(src, dst)
+        print(f"{args.directories * args.files} files in {args.directories} directories")
+        runs = (
+            ('os.walk', lambda: is_directory_structure_identical(src, dst)),
+            ('scan_tree cold', lambda: compare_manifests(src, dst, state)),
+            ('scan_tree cached', lambda: compare_manifests(src, dst, state)),
+        )
+        for name, compare in runs:
+            start = time.perf_counter()
+            identical = compare()
+            print(f"{name:<17} {time.perf_counter() - start:>7.2f} s  identical={identical}")
+
+
+if __name__ == '__main__':
+    main()
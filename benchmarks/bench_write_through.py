@@ -0,0 +1,103 @@
+"""
+Benchmark write-through conversion against the old copytree-then-overwrite flow.
+
+A synthetic FlyingChairsOcc-style dataset (image pairs, flow and occlusion
+maps) is generated in --root, then converted three ways on the same volume:
+- copytree: shutil.copytree of the whole dataset, then every image read back
+  from the copy, darkened and overwritten, with PIL as convert_flyingchairsocc.py
+  did and with OpenCV, the engine's codec, to separate I/O from encoder speed;
+- write-through: convert_dataset, which reads each image from the source,
+  writes the darkened image once and copies only the other files.
+Reported are the wall time and the bytes each flow writes. Point --root at
+the external volume to see the effect of its write bandwidth.
+
+    python benchmarks/bench_write_through.py --pairs 200 --root /media/.../scratch
+"""
+import argparse
+import fnmatch
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from low_light.convert import convert_dataset
+from low_light.datasets import get_dataset
+
+
+def make_dataset(root, pairs, width, height):
+    rng = np.random.default_rng(0)
+    data = os.path.join(root, 'data')
+    os.makedirs(data)
+    # A smooth image compresses like a photo rather than like noise
+    base = cv2.resize(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+    for index in range(1, pairs + 1):
+        for name in ('img1', 'img2'):
+            cv2.imwrite(os.path.join(data, f"{index:05d}_{name}.png"), np.roll(base, index, axis=1))
+        for name in ('occ1', 'occ2'):
+            cv2.imwrite(os.path.join(data, f"{index:05d}_{name}.png"), (base[:, :, 0] > 128).astype(np.uint8) * 255)
+        rng.random((height, width, 2), dtype=np.float32).tofile(os.path.join(data, f"{index:05d}_flow.flo"))
+
+
+def tree_bytes(root):
+    return sum(os.path.getsize(os.path.join(directory, name)) for directory, _, files in os.walk(root)
+               for name in files)
+
+
+def copytree_then_overwrite(src, dst, darkness=0.12, codec='pil'):
+    shutil.copytree(src, dst)
+    written = tree_bytes(dst)
+    for root, _, files in os.walk(dst):
+        for file in files:
+            if fnmatch.fnmatch(file, "*_img1.png") or fnmatch.fnmatch(file, "*_img2.png"):
+                file_path = os.path.join(root, file)
+                if codec == 'pil':
+                    img_dark = Image.fromarray((np.array(Image.open(file_path)) * darkness).astype('uint8'))
+                    img_dark.save(file_path)
+                else:
+                    cv2.imwrite(file_path, (cv2.imread(file_path, cv2.IMREAD_UNCHANGED) * darkness).astype('uint8'))
+                written += os.path.getsize(file_path)
+    return written
+
+
+def write_through(src, dst):
+    options = {'effect': 'darken', 'method': 'scale', 'darkness': 0.12, 'haze': 0.0}
+    stats = convert_dataset(get_dataset('flyingchairsocc'), src, dst, options, seed=0, workers=1)
+    return stats.bytes_written + stats.bytes_copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark write-through conversion')
+    parser.add_argument('--pairs', type=int, default=100)
+    parser.add_argument('--width', type=int, default=512)
+    parser.add_argument('--height', type=int, default=384)
+    parser.add_argument('--root', type=str, default=None, help='Directory to work in (default: a temporary one)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(dir=args.root) as root:
+        src = os.path.join(root, 'FlyingChairsOcc')
+        make_dataset(src, args.pairs, args.width, args.height)
+        print(f"{args.pairs} pairs of {args.width}x{args.height}, dataset {tree_bytes(src) / 2 ** 20:.1f} MiB")
+        flows = (
+            ('copytree, PIL', copytree_then_overwrite),
+            ('copytree, cv2', lambda src, dst: copytree_then_overwrite(src, dst, codec='cv2')),
+            ('write-through', write_through),
+        )
+        for name, convert in flows:
+            dst = os.path.join(root, name.replace(', ', '_'))
+            start = time.perf_counter()
+            written = convert(src, dst)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<14} {elapsed:>7.2f} s {written / 2 ** 20:>8.1f} MiB written")
+
+
+if __name__ == '__main__':
+    main()
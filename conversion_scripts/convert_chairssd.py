@@ -1,92 +1,15 @@
+"""
+Shortcut for python convert.py chairssd with the paths this script has always used.
+Extra options, e.g. --workers or --restart, are passed on.
+"""
 import os
 import sys
-import shutil
-import numpy as np
-import json
-import subprocess
 
-from PIL import Image
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def add_darkness(image_path, darkness_factor=0.12):
-    img = Image.open(image_path)
-    img_np = np.array(img)
-    img_dark_np = (img_np * darkness_factor).astype('uint8')
-    img_dark = Image.fromarray(img_dark_np)
-
-    img.show(title='Original Image')
-    img_dark.show(title='Dark Image')
-
-def display_sample_images(directory, num_samples=1):
-    samples_processed = 0
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if samples_processed >= num_samples:
-                break
-
-            file_path = os.path.join(root, file)
-
-            if file_path.endswith('.png'):
-                print(f"Displaying sample {samples_processed + 1}: {file_path}")
-                add_darkness(file_path)
-                samples_processed += 1
-
-        if samples_processed >= num_samples:
-            break
-
-    print(f"Displayed {samples_processed} samples")
-
-def clone_directory(src, dst):
-    shutil.copytree(src, dst)
-
-def darken_images_in_directory(directory, checkpoint_file, darkness_factor=0.12):
-    num_images = 0
-    checkpoints = {}
-
-    if os.path.exists(checkpoint_file):
-        with open(checkpoint_file, 'r') as f:
-            checkpoints = json.load(f)
-
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-
-            if file_path.endswith('.png'):
-                if file_path in checkpoints and checkpoints[file_path] == True:
-                    print(f"Skipping already darkened image: {file_path}")
-                else:
-                    img = Image.open(file_path)
-                    img_np = np.array(img)
-                    img_dark_np = (img_np * darkness_factor).astype('uint8')
-                    img_dark = Image.fromarray(img_dark_np)
-                    img_dark.save(file_path)
-                    num_images += 1
-                    checkpoints[file_path] = True
-                    with open(checkpoint_file, 'w') as f:
-                        json.dump(checkpoints, f)
-
-    return num_images
+from low_light.convert import main
 
 if __name__ == '__main__':
-    src_dir = "./ChairsSDHom/data"
-    dst_dir = r"/media/anil/New Volume2/Nihal/Low_Light_dataset/ChairsSDHom_dark"
-    checkpoint_file = 'darken_images_checkpoints.json'
-
-    # ...
-    print(f"Displaying samples from {src_dir}...")
-    display_sample_images(src_dir)
-    proceed = input("Do you want to proceed with cloning and darkening the dataset? (y/n): ")
-    if proceed.lower() != 'y':
-        print("Aborted.")
-        exit()
-
-    if os.path.exists(dst_dir):
-        shutil.rmtree(dst_dir)
-        print(f"Removed existing directory: {dst_dir}")
-
-    print(f"Cloning directory {src_dir} to {dst_dir}...")
-    clone_directory(src_dir, dst_dir)
-    print(f"Clone completed.")
-    
-    print(f"Starting to darken images in {dst_dir}...")
-    num_samples = darken_images_in_directory(dst_dir, checkpoint_file)
-    print(f"Darkening completed: {num_samples} samples darkened")
+    sys.exit(main(['chairssd',
+                   './ChairsSDHom/data',
+                   '/media/anil/New Volume2/Nihal/Low_Light_dataset/ChairsSDHom_dark'] + sys.argv[1:]))
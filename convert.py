@@ -0,0 +1,10 @@
+"""
+Convert a dataset into its low-light version: python convert.py <dataset> <src> <dst>.
+The dataset descriptors and the conversion engine live in the low_light package; this is only the command line.
+"""
+import sys
+
+from low_light.convert import main
+
+if __name__ == '__main__':
+    sys.exit(main())
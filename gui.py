@@ -6,57 +6,17 @@ from PIL import Image, ImageTk
 import os
 import threading
 
+from low_light.pipeline import Pipeline
+
 update_timer = None
 
 last_processed_image = None
 
-def add_shot_noise(image, noise_level):
-    if noise_level <= 0:
-        return image  # Return the original image if noise_level is 0 or negative
-    image = image.astype(np.float32)
-    # Ensure noise_level is positive to avoid division by zero
-    noisy_image = np.random.poisson(image * max(noise_level, 0.01)) / max(noise_level, 0.01)
-    return noisy_image.clip(0, 255).astype(np.uint8)
-
-def add_gaussian_noise(image, mean, std):
-    row, col, ch = image.shape
-    noise = np.random.normal(mean, std, (row, col, ch))
-    noisy_image = image + noise
-    return noisy_image.clip(0, 255).astype(np.uint8)
-
-# def adjust_illumination(image, illumination_factor):
-#     adjusted_image = image.astype(np.float32) * illumination_factor
-#     return adjusted_image.clip(0, 255).astype(np.uint8)
-
-def adjust_illumination(image, illumination_factor):
-    image = image.astype(np.float32) / 255.0
-    gamma = 1.0 / illumination_factor
-    adjusted_image = np.power(image, gamma)
-    return (adjusted_image * 255).clip(0, 255).astype(np.uint8)
-
-
-
-def apply_motion_blur(image, kernel_size):
-    kernel = np.zeros((kernel_size, kernel_size))
-    kernel[int((kernel_size - 1) / 2), :] = np.ones(kernel_size)
-    kernel /= kernel_size
-    blurred_image = cv2.filter2D(image, -1, kernel)
-    return blurred_image
-
-def adjust_contrast_color(image, contrast_factor, color_factor):
-    adjusted_image = cv2.convertScaleAbs(image, alpha=contrast_factor, beta=0)
-    adjusted_image = cv2.cvtColor(adjusted_image, cv2.COLOR_BGR2HSV)
-    adjusted_image[:, :, 1] = np.clip(adjusted_image[:, :, 1] * color_factor, 0, 255).astype(np.uint8)
-    adjusted_image = cv2.cvtColor(adjusted_image, cv2.COLOR_HSV2BGR)
-    return adjusted_image
-
-def apply_white_balance(image, red_gain, green_gain, blue_gain):
-    image = image.astype(np.float32)
-    image[:, :, 0] *= red_gain
-    image[:, :, 1] *= green_gain
-    image[:, :, 2] *= blue_gain
-    return np.clip(image, 0, 255).astype(np.uint8)
+# The sliders preview the original look: exact Poisson shot noise and the HSV saturation
+pipeline = Pipeline(shot_noise_mode='poisson', saturation_mode='hsv')
 
+# The preview is one frame at a time: spread its bands over the cores
+PREVIEW_THREADS = os.cpu_count() or 1
 
 # GUI application with Tkinter
 def create_gui_app(frame1):
@@ -80,6 +40,7 @@ def create_gui_app(frame1):
         gaussian_std = gaussian_std_slider.get()
         illumination_factor = illumination_slider.get()
         blur_kernel_size = blur_kernel_slider.get()
+        blur_angle = blur_angle_slider.get()
         contrast_factor = contrast_slider.get()
         color_factor = color_slider.get()
         red_gain = red_gain_slider.get()
@@ -88,12 +49,19 @@ def create_gui_app(frame1):
         small_frame1 = cv2.resize(frame1, (0, 0), fx=scale_factor, fy=scale_factor)
         # Apply effects
 
-        processed = add_shot_noise(small_frame1, noise_level)
-        processed = add_gaussian_noise(processed, 0, gaussian_std)
-        processed = adjust_illumination(processed, illumination_factor)
-        processed = apply_motion_blur(processed, blur_kernel_size)
-        processed = adjust_contrast_color(processed, contrast_factor, color_factor)
-        processed = apply_white_balance(processed, red_gain, green_gain, blue_gain)
+        params = {
+            'noise_level': noise_level,
+            'gaussian_std': gaussian_std,
+            'illumination_factor': illumination_factor,
+            'blur_kernel_size': blur_kernel_size,
+            'blur_angle': blur_angle,
+            'contrast_factor': contrast_factor,
+            'color_factor': color_factor,
+            'red_gain': red_gain,
+            'green_gain': green_gain,
+            'blue_gain': blue_gain,
+        }
+        processed = pipeline.run(small_frame1[None], params, threads=PREVIEW_THREADS)[0]
 
 
         # processed = add_shot_noise(frame1, noise_level)
@@ -134,6 +102,8 @@ def create_gui_app(frame1):
     illumination_slider.pack(fill='x', expand=True)
     blur_kernel_slider = tk.Scale(slider_frame, from_=5, to=11, resolution=1, label="Blur Kernel Size", orient=tk.HORIZONTAL, command=lambda event: update_image())
     blur_kernel_slider.pack(fill='x', expand=True)
+    blur_angle_slider = tk.Scale(slider_frame, from_=0, to=179.5, resolution=0.5, label="Blur Angle", orient=tk.HORIZONTAL, command=lambda event: update_image())
+    blur_angle_slider.pack(fill='x', expand=True)
     contrast_slider = tk.Scale(slider_frame, from_=0.8, to=1.2, resolution=0.01, label="Contrast Factor", orient=tk.HORIZONTAL, command=lambda event: update_image())
     contrast_slider.pack(fill='x', expand=True)
     color_slider = tk.Scale(slider_frame, from_=0.4, to=0.8, resolution=0.01, label="Color Factor", orient=tk.HORIZONTAL, command=lambda event: update_image())
@@ -172,6 +142,7 @@ def create_gui_app(frame1):
     gaussian_std_slider.get(),
     illumination_slider.get(),
     blur_kernel_slider.get(),
+    blur_angle_slider.get(),
     contrast_slider.get(),
     color_slider.get(),
     red_gain_slider.get(),
@@ -185,7 +156,7 @@ def create_gui_app(frame1):
 
 
 
-def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur_kernel_size, contrast_factor, color_factor, red_gain, green_gain, blue_gain):
+def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur_kernel_size, blur_angle, contrast_factor, color_factor, red_gain, green_gain, blue_gain):
     # Define save path
     global image_file_path
     if last_processed_image is None:
@@ -206,6 +177,7 @@ def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur
         file.write(f"Gaussian STD: {gaussian_std}\n")
         file.write(f"Illumination Factor: {illumination_factor}\n")
         file.write(f"Blur Kernel Size: {blur_kernel_size}\n")
+        file.write(f"Blur Angle: {blur_angle}\n")
         file.write(f"Contrast Factor: {contrast_factor}\n")
         file.write(f"Color Factor: {color_factor}\n")
         file.write(f"Red Gain: {red_gain}\n")
@@ -218,17 +190,18 @@ def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur
 image_file_path = 'datasets/KITTI_2015/testing/image_2/000164_10.png'  # Store the file path in a global variable
 
 # Load the image as before
-try:
-    frame1 = cv2.imread(image_file_path)
-    if frame1 is None:
-        raise IOError("Could not load the image.")
-    if len(frame1.shape) == 2:
-        # Grayscale image
-        frame1 = cv2.cvtColor(frame1, cv2.COLOR_GRAY2RGB)  # Convert grayscale to RGB
-    else:
-        # BGR color image
-        frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB
-    create_gui_app(frame1)
-except IOError as e:
-    print(e)
+if __name__ == '__main__':
+    try:
+        frame1 = cv2.imread(image_file_path)
+        if frame1 is None:
+            raise IOError("Could not load the image.")
+        if len(frame1.shape) == 2:
+            # Grayscale image
+            frame1 = cv2.cvtColor(frame1, cv2.COLOR_GRAY2RGB)  # Convert grayscale to RGB
+        else:
+            # BGR color image
+            frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB
+        create_gui_app(frame1)
+    except IOError as e:
+        print(e)
 
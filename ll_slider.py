@@ -6,73 +6,16 @@ from PIL import Image, ImageTk
 import os
 import threading
 
+from low_light.pipeline import Pipeline
+
 update_timer = None
 last_processed_image = None
 
-def add_shot_noise(image, noise_level):
-    """
-    Add shot noise to the image.
-    Increasing the noise_level will increase the amount of shot noise applied to the image.
-    """
-    if noise_level <= 0:
-        return image
-    image = image.astype(np.float32)
-    noisy_image = np.random.poisson(image * max(noise_level, 0.01)) / max(noise_level, 0.01)
-    return noisy_image.clip(0, 255).astype(np.uint8)
-
-def add_gaussian_noise(image, mean, std):
-    """
-    Add Gaussian noise to the image.
-    Increasing the std will increase the standard deviation of the Gaussian noise applied to the image.
-    """
-    row, col, ch = image.shape
-    noise = np.random.normal(mean, std, (row, col, ch))
-    noisy_image = image + noise
-    return noisy_image.clip(0, 255).astype(np.uint8)
-
-def adjust_illumination(image, illumination_factor):
-    """
-    Adjust the illumination of the image.
-    Decreasing the illumination_factor will make the image darker, simulating low-light conditions.
-    """
-    image = image.astype(np.float32) / 255.0
-    gamma = 1.0 / illumination_factor
-    adjusted_image = np.power(image, gamma)
-    return (adjusted_image * 255).clip(0, 255).astype(np.uint8)
-
-def apply_motion_blur(image, kernel_size):
-    """
-    Apply motion blur to the image.
-    Increasing the kernel_size will increase the amount of motion blur applied to the image.
-    """
-    kernel = np.zeros((kernel_size, kernel_size))
-    kernel[int((kernel_size - 1) / 2), :] = np.ones(kernel_size)
-    kernel /= kernel_size
-    blurred_image = cv2.filter2D(image, -1, kernel)
-    return blurred_image
+# The sliders preview the original look: exact Poisson shot noise and the HSV saturation
+pipeline = Pipeline(shot_noise_mode='poisson', saturation_mode='hsv')
 
-def adjust_contrast_color(image, contrast_factor, color_factor):
-    """
-    Adjust the contrast and color saturation of the image.
-    Increasing the contrast_factor will increase the contrast of the image.
-    Decreasing the color_factor will decrease the color saturation of the image.
-    """
-    adjusted_image = cv2.convertScaleAbs(image, alpha=contrast_factor, beta=0)
-    adjusted_image = cv2.cvtColor(adjusted_image, cv2.COLOR_BGR2HSV)
-    adjusted_image[:, :, 1] = np.clip(adjusted_image[:, :, 1] * color_factor, 0, 255).astype(np.uint8)
-    adjusted_image = cv2.cvtColor(adjusted_image, cv2.COLOR_HSV2BGR)
-    return adjusted_image
-
-def apply_white_balance(image, red_gain, green_gain, blue_gain):
-    """
-    Apply white balance to the image.
-    Adjusting the red_gain, green_gain, and blue_gain will change the color balance of the image.
-    """
-    image = image.astype(np.float32)
-    image[:, :, 0] *= red_gain
-    image[:, :, 1] *= green_gain
-    image[:, :, 2] *= blue_gain
-    return np.clip(image, 0, 255).astype(np.uint8)
+# The preview is one frame at a time: spread its bands over the cores
+PREVIEW_THREADS = os.cpu_count() or 1
 
 def create_gui_app(frame1):
     """
@@ -98,6 +41,7 @@ def create_gui_app(frame1):
         gaussian_std = gaussian_std_slider.get()
         illumination_factor = illumination_slider.get()
         blur_kernel_size = blur_kernel_slider.get()
+        blur_angle = blur_angle_slider.get()
         contrast_factor = contrast_slider.get()
         color_factor = color_slider.get()
         red_gain = red_gain_slider.get()
@@ -106,12 +50,19 @@ def create_gui_app(frame1):
 
         small_frame1 = cv2.resize(frame1, (0, 0), fx=scale_factor, fy=scale_factor)
 
-        processed = add_shot_noise(small_frame1, noise_level)
-        processed = add_gaussian_noise(processed, 0, gaussian_std)
-        processed = adjust_illumination(processed, illumination_factor)
-        processed = apply_motion_blur(processed, blur_kernel_size)
-        processed = adjust_contrast_color(processed, contrast_factor, color_factor)
-        processed = apply_white_balance(processed, red_gain, green_gain, blue_gain)
+        params = {
+            'noise_level': noise_level,
+            'gaussian_std': gaussian_std,
+            'illumination_factor': illumination_factor,
+            'blur_kernel_size': blur_kernel_size,
+            'blur_angle': blur_angle,
+            'contrast_factor': contrast_factor,
+            'color_factor': color_factor,
+            'red_gain': red_gain,
+            'green_gain': green_gain,
+            'blue_gain': blue_gain,
+        }
+        processed = pipeline.run(small_frame1[None], params, threads=PREVIEW_THREADS)[0]
 
         processed = cv2.resize(processed, (frame1.shape[1], frame1.shape[0]))
 
@@ -143,6 +94,9 @@ def create_gui_app(frame1):
     blur_kernel_slider = tk.Scale(slider_frame, from_=5, to=11, resolution=1, label="Blur Kernel Size", orient=tk.HORIZONTAL, command=lambda event: update_image())
     blur_kernel_slider.pack(fill='x', expand=True)
 
+    blur_angle_slider = tk.Scale(slider_frame, from_=0, to=179.5, resolution=0.5, label="Blur Angle", orient=tk.HORIZONTAL, command=lambda event: update_image())
+    blur_angle_slider.pack(fill='x', expand=True)
+
     contrast_slider = tk.Scale(slider_frame, from_=0.8, to=1.2, resolution=0.01, label="Contrast Factor", orient=tk.HORIZONTAL, command=lambda event: update_image())
     contrast_slider.pack(fill='x', expand=True)
 
@@ -166,6 +120,7 @@ def create_gui_app(frame1):
         gaussian_std_slider.get(),
         illumination_slider.get(),
         blur_kernel_slider.get(),
+        blur_angle_slider.get(),
         contrast_slider.get(),
         color_slider.get(),
         red_gain_slider.get(),
@@ -178,7 +133,7 @@ def create_gui_app(frame1):
 
     window.mainloop()
 
-def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur_kernel_size, contrast_factor, color_factor, red_gain, green_gain, blue_gain):
+def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur_kernel_size, blur_angle, contrast_factor, color_factor, red_gain, green_gain, blue_gain):
     """
     Save the processed image and its corresponding settings.
     """
@@ -200,6 +155,7 @@ def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur
         file.write(f"Gaussian STD: {gaussian_std}\n")
         file.write(f"Illumination Factor: {illumination_factor}\n")
         file.write(f"Blur Kernel Size: {blur_kernel_size}\n")
+        file.write(f"Blur Angle: {blur_angle}\n")
         file.write(f"Contrast Factor: {contrast_factor}\n")
         file.write(f"Color Factor: {color_factor}\n")
         file.write(f"Red Gain: {red_gain}\n")
@@ -211,17 +167,18 @@ def save_image_and_settings(noise_level, gaussian_std, illumination_factor, blur
 # Load an image to start with
 image_file_path = './saved_images/casc/traffic.jpg'
 
-try:
-    frame1 = cv2.imread(image_file_path)
-    if frame1 is None:
-        raise IOError("Could not load the image.")
-    if len(frame1.shape) == 2:
-        frame1 = cv2.cvtColor(frame1, cv2.COLOR_GRAY2RGB)
-    else:
-        frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
-    create_gui_app(frame1)
-except IOError as e:
-    print(e)
+if __name__ == '__main__':
+    try:
+        frame1 = cv2.imread(image_file_path)
+        if frame1 is None:
+            raise IOError("Could not load the image.")
+        if len(frame1.shape) == 2:
+            frame1 = cv2.cvtColor(frame1, cv2.COLOR_GRAY2RGB)
+        else:
+            frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
+        create_gui_app(frame1)
+    except IOError as e:
+        print(e)
 
 
 """
@@ -0,0 +1,51 @@
+"""
+Synthetic low-light degradation of images and image pairs.
+
+Importing the package loads nothing but this file: the submodules, and with
+them OpenCV, are imported on first use of one of the names below, so worker
+processes and data loaders only pay for the stages they touch.
+"""
+import importlib
+
+_EXPORTS = {
+    'add_shot_noise': 'effects',
+    'add_gaussian_noise': 'effects',
+    'adjust_illumination': 'effects',
+    'adjust_contrast_color': 'effects',
+    'adjust_color': 'effects',
+    'apply_white_balance': 'effects',
+    'apply_low_light_effects': 'effects',
+    'sample_low_light_params': 'effects',
+    'DEFAULT_RANGES': 'effects',
+    'sample_low_light_table': 'effects',
+    'apply_low_light_effects_batch': 'pipeline',
+    'Pipeline': 'pipeline',
+    'apply_motion_blur': 'motion_blur',
+    'adjust_contrast_saturation': 'saturation',
+    'adjust_saturation': 'saturation',
+    'RandomStreams': 'noise_rng',
+    'Workspace': 'workspace',
+    'CheckpointStore': 'checkpoints',
+    'convert_dataset': 'convert',
+    'get_dataset': 'datasets',
+    'Overlay': 'overlay',
+    'scan_tree': 'manifest',
+    'get_codec': 'codecs',
+    'open_packed': 'shards',
+    'DegradedDataset': 'online',
+    'Recipes': 'recipes',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,167 @@
+import numpy as np
+import cv2
+
+from .motion_blur import blur_rows, blur_rows_shifted
+from .pointwise_lut import apply_lut, stage_lut
+from .saturation import SATURATION_MODES, adjust_contrast_saturation
+from .shot_noise import SHOT_NOISE_MODES, SHOT_NOISE_SAMPLERS, choose_shot_noise_mode
+from .workspace import scratch, to_uint8
+
+
+def _per_sample(values, count, name):
+    """
+    Broadcast a scalar or length-N parameter to a float64 vector of length count.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        return np.full(count, values)
+    if values.shape != (count,):
+        raise ValueError(f"{name} must be a scalar or have length {count}, got shape {values.shape}")
+    return values
+
+
+def _check_batch(images):
+    if images.ndim != 4 or images.dtype != np.uint8:
+        raise ValueError(f"Expected a (N, H, W, C) uint8 batch, got {images.dtype} array of shape {images.shape}")
+
+
+def add_shot_noise_batch(images, noise_level, mode='auto', rng=np.random, out=None, workspace=None):
+    """
+    Add shot noise to every image of the batch with its own noise level.
+    Samples with noise_level <= 0 are left untouched, as in sample_shot_noise. With
+    mode='auto' each sample gets the sampler chosen for its noise level. rng is
+    either one generator shared by the batch, in which case samples sharing the
+    exact or normal sampler are drawn in one broadcast call, or a list with one
+    generator per sample (see noise_rng.stage_generators).
+    """
+    if mode not in SHOT_NOISE_MODES:
+        raise ValueError(f"Unknown shot noise mode '{mode}', expected one of {SHOT_NOISE_MODES}")
+    active = noise_level > 0
+    if not active.any():
+        if out is None:
+            return images
+        out[...] = images
+        return out
+    rate = np.maximum(noise_level, 0.01)
+    modes = np.array([choose_shot_noise_mode(level) if mode == 'auto' else mode for level in noise_level])
+    modes[~active] = 'none'
+
+    output = np.empty_like(images) if out is None else out
+    output[~active] = images[~active]
+    if isinstance(rng, list):
+        for sample in np.flatnonzero(active):
+            sampler = SHOT_NOISE_SAMPLERS[modes[sample]]
+            sampler(images[sample], rate[sample], rng[sample], out=output[sample], workspace=workspace)
+        return output
+    for sampler_mode in ('poisson', 'normal'):
+        index = np.flatnonzero(modes == sampler_mode)
+        sampler = SHOT_NOISE_SAMPLERS[sampler_mode]
+        if len(index) == len(images):
+            sampler(images, rate[:, None, None, None], rng, out=output, workspace=workspace)
+        elif len(index):
+            output[index] = sampler(images[index], rate[index][:, None, None, None], rng, workspace=workspace)
+    sampler = SHOT_NOISE_SAMPLERS['table']
+    for sample in np.flatnonzero(modes == 'table'):
+        sampler(images[sample], rate[sample], rng, out=output[sample], workspace=workspace)
+    return output
+
+
+def add_gaussian_noise_batch(images, mean, std, rng=np.random, out=None, workspace=None):
+    """
+    Add Gaussian noise to every image of the batch with its own standard deviation.
+    Generators fill a single float32 noise buffer (from workspace, if given) in
+    place; the legacy global state keeps its float64 draws so seeded runs of
+    older scripts still reproduce.
+    """
+    if isinstance(rng, (list, np.random.Generator)):
+        noise = scratch(workspace, 'gaussian_noise', images.shape, np.float32)
+        if isinstance(rng, list):
+            for generator, target in zip(rng, noise):
+                generator.standard_normal(dtype=np.float32, out=target)
+        else:
+            rng.standard_normal(dtype=np.float32, out=noise)
+        noise *= std.astype(np.float32)[:, None, None, None]
+        noise += mean
+    else:
+        noise = rng.normal(mean, std[:, None, None, None], images.shape)
+    noise += images
+    return to_uint8(noise, out)
+
+
+def apply_lut_batch(images, tables, out=None):
+    """
+    Apply one (256, C) table per sample.
+    A table lookup is memory bound, so each sample goes through cv2.LUT on a view
+    of the batch; a broadcast fancy-index gather is several times slower.
+    """
+    if out is None:
+        out = np.empty_like(images)
+    for image, table, target in zip(images, tables, out):
+        apply_lut(image, table, out=target)
+    return out
+
+
+def apply_motion_blur_batch(images, kernel_size, out=None):
+    """
+    Apply the horizontal motion blur with a per-sample kernel size.
+    Samples sharing a kernel size are stacked vertically and blurred in a single
+    one-dimensional pass; the blur is horizontal, so frames never bleed into each other.
+    """
+    num, width, channels = images.shape[0], images.shape[2], images.shape[3]
+    kernel_size = kernel_size.astype(np.int64)
+    output = np.empty_like(images) if out is None else out
+    for size in np.unique(kernel_size).tolist():
+        index = np.flatnonzero(kernel_size == size)
+        group = images if len(index) == num else images[index]
+        if size <= 1:
+            output[index] = group
+            continue
+        if len(index) == num:
+            if size % 2:
+                blur_rows(images.reshape(-1, width, channels), size, out=output.reshape(-1, width, channels))
+            else:
+                for image, target in zip(images, output):
+                    blur_rows_shifted(image, size, target)
+            continue
+        blurred = blur_rows(group.reshape(-1, width, channels), size).reshape(group.shape)
+        if size % 2 == 0:
+            # The original kernel's line sits one row above its anchor for even
+            # sizes, which shifts each frame down by a (reflected) row.
+            output[index, 1:] = blurred[:, :-1]
+            output[index, 0] = blurred[:, 1]
+        else:
+            output[index] = blurred
+    return output
+
+
+def adjust_color_batch(images, color_factor, out=None, workspace=None):
+    """
+    Scale the color saturation of every image of the batch through one HSV round trip.
+    """
+    width, channels = images.shape[2:]
+    hsv = scratch(workspace, 'hsv', images.shape, np.uint8)
+    cv2.cvtColor(images.reshape(-1, width, channels), cv2.COLOR_BGR2HSV, dst=hsv.reshape(-1, width, channels))
+    saturation = np.multiply(hsv[..., 1], color_factor[:, None, None],
+                             out=scratch(workspace, 'hsv_saturation', images.shape[:3], np.float64))
+    to_uint8(saturation, hsv[..., 1])
+    target = None if out is None else out.reshape(-1, width, channels)
+    return cv2.cvtColor(hsv.reshape(-1, width, channels), cv2.COLOR_HSV2BGR, dst=target).reshape(images.shape)
+
+
+def adjust_contrast_saturation_batch(images, contrast_factor, color_factor, mode='luma', out=None, workspace=None):
+    """
+    Scale contrast and saturation of every image of the batch with its own factors.
+    mode='luma' runs the fused contrast and luma-blend matrix per sample; mode='hsv'
+    is the legacy contrast lookup followed by one batched HSV round trip.
+    """
+    if mode not in SATURATION_MODES:
+        raise ValueError(f"Unknown saturation mode '{mode}', expected one of {SATURATION_MODES}")
+    if mode == 'hsv':
+        contrast_tables = [stage_lut('contrast', contrast) for contrast in contrast_factor.tolist()]
+        contrasted = apply_lut_batch(images, contrast_tables, out=out)
+        return adjust_color_batch(contrasted, color_factor, out=contrasted, workspace=workspace)
+    if out is None:
+        out = np.empty_like(images)
+    for image, contrast, color, target in zip(images, contrast_factor.tolist(), color_factor.tolist(), out):
+        adjust_contrast_saturation(image, contrast, color, out=target)
+    return out
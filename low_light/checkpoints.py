@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+
+class CheckpointStore:
+    """
+    The set of finished outputs of a conversion, kept in an SQLite database.
+
+    add() buffers paths and commits them in one transaction every batch_size
+    paths or every interval seconds, so recording an image costs O(1)
+    amortized instead of rewriting a JSON file of every path so far. The
+    database runs in WAL mode: a crash loses at most the uncommitted batch
+    (those images are simply converted again), never the file, and several
+    processes can record into the same store at once, each through its own
+    CheckpointStore; writers wait up to timeout seconds for each other.
+    Paths are '/'-separated and relative to the dataset root.
+
+    Each path can carry a key describing what it was made from (see
+    convert.output_key); a path recorded again replaces its key, a path
+    recorded without one (as imported from old JSON checkpoints) keeps
+    whatever key it had.
+    """
+
+    def __init__(self, path, batch_size=256, interval=2.0, timeout=60.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        # WAL needs shared memory; on filesystems without it SQLite keeps its
+        # rollback journal, which is just as crash-safe, only slower.
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS done (path TEXT PRIMARY KEY, key TEXT) WITHOUT ROWID')
+        columns = [row[1] for row in self._connection.execute('PRAGMA table_info(done)')]
+        if 'key' not in columns:
+            # A store of an older version, which only recorded paths
+            self._connection.execute('ALTER TABLE done ADD COLUMN key TEXT')
+        self._pending = []
+        self._flushed = time.monotonic()
+
+    def __repr__(self):
+        return f"CheckpointStore({self.path!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        self.flush()
+        return self._connection.execute('SELECT COUNT(*) FROM done').fetchone()[0]
+
+    def __contains__(self, path):
+        if any(pending == path for pending, _ in self._pending):
+            return True
+        return self._connection.execute('SELECT 1 FROM done WHERE path = ?', (path,)).fetchone() is not None
+
+    def paths(self):
+        """
+        Every recorded path, as a set.
+        """
+        self.flush()
+        return {path for path, in self._connection.execute('SELECT path FROM done')}
+
+    def keys(self):
+        """
+        Every recorded path with its key (None when it was recorded without one), as a dict.
+        """
+        self.flush()
+        return dict(self._connection.execute('SELECT path, key FROM done'))
+
+    def add(self, path, key=None):
+        self._pending.append((path, key))
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def update(self, paths):
+        """
+        Record paths, an iterable of paths or of (path, key) pairs.
+        """
+        self._pending.extend(path if isinstance(path, tuple) else (path, None) for path in paths)
+        self.flush()
+
+    def flush(self):
+        """
+        Commit the buffered paths.
+        """
+        self._flushed = time.monotonic()
+        if not self._pending:
+            return
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+        # queue on the busy timeout instead of failing halfway through.
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._connection.executemany('INSERT INTO done (path, key) VALUES (?, ?) ON CONFLICT (path) '
+                                         'DO UPDATE SET key = excluded.key WHERE excluded.key IS NOT NULL',
+                                         self._pending)
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
+        self._pending = []
+
+    def clear(self):
+        self._pending = []
+        self._connection.execute('DELETE FROM done')
+
+    def close(self):
+        if self._connection is None:
+            return
+        self.flush()
+        self._connection.close()
+        self._connection = None
+
+
+def read_checkpoint_keys(path):
+    """
+    The paths and keys recorded in the store at path, as CheckpointStore.keys
+    returns them, read without writing anything: no store is created, and an
+    existing one is opened read-only. A missing store has recorded nothing.
+    """
+    if not os.path.exists(path):
+        return {}
+    # Even read-only, SQLite recreates the WAL files of a store in WAL mode;
+    # a store closed cleanly has none, and can be read as an immutable file
+    mode = 'mode=ro' if os.path.exists(path + '-wal') else 'immutable=1'
+    connection = sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?{mode}', uri=True)
+    try:
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(done)')]
+        if not columns:
+            return {}
+        # A store of an older version only recorded paths
+        key = 'key' if 'key' in columns else 'NULL'
+        return dict(connection.execute(f'SELECT path, {key} FROM done'))
+    finally:
+        connection.close()
+
+
+def read_json_checkpoint(json_path, root=None):
+    """
+    The paths marked done in a {path: true} checkpoint written by the old
+    conversion scripts, made relative to root.
+    Those scripts keyed images by their path below the dataset directory or by
+    the path they were written to (root joined with it); paths outside root
+    are left out.
+    """
+    with open(json_path, 'r') as f:
+        checkpoints = json.load(f)
+    prefix = os.path.join(root, '') if root is not None else None
+    paths = []
+    for name, done in checkpoints.items():
+        if done is not True:
+            continue
+        if os.path.isabs(name) or (prefix is not None and name.startswith(prefix)):
+            if root is None:
+                continue
+            name = os.path.relpath(os.path.abspath(name), os.path.abspath(root))
+            if name == os.pardir or name.startswith(os.pardir + os.sep):
+                continue
+        paths.append(name.replace(os.sep, '/'))
+    return paths
+
+
+def import_json_checkpoint(store, json_path, root=None):
+    """
+    Record the finished paths of an old JSON checkpoint in store; returns how many it held.
+    """
+    paths = read_json_checkpoint(json_path, root)
+    store.update(paths)
+    return len(paths)
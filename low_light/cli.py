@@ -0,0 +1,247 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from .effects import DEFAULT_RANGES, apply_low_light_effects
+from .noise_rng import RandomStreams
+from .sampling import DESIGNS
+from .saturation import SATURATION_MODES
+from .shot_noise import SHOT_NOISE_MODES
+from .workspace import worker_workspace
+
+_RANGE_HELP = {
+    'noise_level': 'noise level',
+    'gaussian_std': 'Gaussian noise standard deviation',
+    'illumination': 'illumination factor',
+    'blur_kernel': 'blur kernel size',
+    'contrast': 'contrast factor',
+    'color': 'color factor',
+    'red_gain': 'red gain for white balance',
+    'green_gain': 'green gain for white balance',
+    'blue_gain': 'blue gain for white balance',
+}
+
+
+def _correlation(value):
+    first, _, rest = value.partition(':')
+    second, _, coefficient = rest.partition(':')
+    try:
+        coefficient = float(coefficient)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected NAME:NAME:R, got '{value}'") from None
+    for name in (first, second):
+        if name not in DEFAULT_RANGES:
+            raise argparse.ArgumentTypeError(f"Unknown parameter '{name}', expected one of {sorted(DEFAULT_RANGES)}")
+    if not -1 < coefficient < 1 or first == second:
+        raise argparse.ArgumentTypeError(f"Expected two parameters and a correlation in (-1, 1), got '{value}'")
+    return [first, second, coefficient]
+
+
+def add_effect_arguments(parser):
+    """
+    Add the --<name>_min/--<name>_max ranges and the sampler options of the low-light pipeline.
+    """
+    for name, (low, high) in DEFAULT_RANGES.items():
+        value_type = int if name == 'blur_kernel' else float
+        parser.add_argument(f'--{name}_min', type=value_type, default=low, help=f'Minimum {_RANGE_HELP[name]}')
+        parser.add_argument(f'--{name}_max', type=value_type, default=high, help=f'Maximum {_RANGE_HELP[name]}')
+    parser.add_argument('--shot_noise_mode', type=str, default='auto', choices=list(SHOT_NOISE_MODES),
+                        help='Shot noise sampler used by the lookup-table path (the staged path is always exact Poisson)')
+    parser.add_argument('--saturation_mode', type=str, default='luma', choices=list(SATURATION_MODES),
+                        help='Blend toward luma fused with contrast, or the legacy HSV round trip')
+    parser.add_argument('--design', type=str, default=None, choices=DESIGNS,
+                        help='Place the parameters of all pairs together, as independent draws, a Latin hypercube or '
+                             'a scrambled Sobol sequence (default: every pair draws its own from its streams)')
+    parser.add_argument('--log_scale', type=str, nargs='+', default=[], choices=list(DEFAULT_RANGES), metavar='NAME',
+                        help='Parameters drawn log-uniformly from their range (implies --design random if none given)')
+    parser.add_argument('--correlate', type=_correlation, action='append', default=[], metavar='NAME:NAME:R',
+                        help='Rank correlation between two parameters, e.g. illumination:noise_level:-0.6 for darker '
+                             'pairs with more noise (can be repeated; implies --design random if none given)')
+    parser.add_argument('--tile_rows', type=int, default=None, metavar='ROWS',
+                        help='Stream each frame through the pipeline in bands of about ROWS rows, bounding the '
+                             'temporaries by the band instead of the frame (same output; default: whole frames)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Split each frame into bands degraded by this many threads at once, for the latency of '
+                             'large frames (every band draws its own noise, so the output differs from a run '
+                             'without threads but not between thread counts)')
+
+
+def add_pool_arguments(parser, workers=1):
+    """
+    Add the seed and process pool options.
+    """
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Global seed; every pair or image group draws its parameters and noise from streams keyed by '
+                             '(seed, index)')
+    parser.add_argument('--workers', type=int, default=workers, help='Number of worker processes')
+    parser.add_argument('--chunk_size', type=int, default=None,
+                        help='Pairs or images sent to a worker at a time (default: about four chunks per worker)')
+    parser.add_argument('--cv_threads', type=int, default=None,
+                        help='OpenCV threads per worker (default: cores divided by workers)')
+
+
+def range_options(args):
+    """
+    Collect the parameter ranges from parsed arguments.
+    """
+    return {name: (getattr(args, f'{name}_min'), getattr(args, f'{name}_max')) for name in DEFAULT_RANGES}
+
+
+def sampler_options(args):
+    """
+    The parameter design from parsed arguments (see effects.draw_low_light_params), or None for per-pair streams.
+    """
+    if args.design is None and not args.log_scale and not args.correlate:
+        return None
+    return {
+        'design': args.design or 'random',
+        'scales': {name: 'log' for name in args.log_scale},
+        'correlations': args.correlate,
+    }
+
+
+def build_parser():
+    """
+    Build the argument parser of the lll.py command line.
+    """
+    parser = argparse.ArgumentParser(description='Apply low-light effects to image pairs')
+    parser.add_argument('--input_dir', type=str, required=True, help='Directory containing input image pairs')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to save output image pairs')
+    add_effect_arguments(parser)
+    parser.add_argument('--pointwise_mode', type=str, default='lut', choices=['lut', 'staged'],
+                        help='Run illumination, contrast and white balance as lookup tables or as the staged reference ops')
+    add_pool_arguments(parser)
+    return parser
+
+
+def effect_options(args):
+    """
+    Collect the keyword arguments of apply_low_light_effects from parsed arguments.
+    """
+    return {
+        'ranges': range_options(args),
+        'mode': args.pointwise_mode,
+        'shot_noise_mode': args.shot_noise_mode,
+        'saturation_mode': args.saturation_mode,
+        'sampler': sampler_options(args),
+        'tile_rows': args.tile_rows,
+        'threads': args.threads,
+    }
+
+
+def pool_settings(tasks, workers, chunk_size=None, cv_threads=None):
+    """
+    Resolve the pool size, chunk size and OpenCV threads per worker for a number of tasks.
+    """
+    workers = min(workers, tasks)
+    if chunk_size is None:
+        chunk_size = max(1, min(16, tasks // (workers * 4)))
+    if cv_threads is None:
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+    return workers, chunk_size, cv_threads
+
+
+def _init_worker(cv_threads):
+    # Every worker runs its own OpenCV thread pool; left alone, N workers would
+    # each start one thread per core and oversubscribe the machine.
+    cv2.setNumThreads(cv_threads)
+
+
+def process_image_pair(task):
+    """
+    Read, degrade and write one image pair.
+    Runs in the parent or in a pool worker and returns (level, message) instead of
+    logging, so the parent can log every pair in order. Temporaries live in the
+    process's workspace, sized on the first pair of each resolution.
+    """
+    index, input_dir, output_dir, file1, file2, seed, options = task
+    frame1_path = os.path.join(input_dir, file1)
+    frame2_path = os.path.join(input_dir, file2)
+
+    try:
+        frame1 = cv2.imread(frame1_path)
+        frame2 = cv2.imread(frame2_path)
+
+        if frame1 is None or frame2 is None:
+            return logging.WARNING, f"Skipping image pair {file1} and {file2} due to missing or invalid files."
+
+        # Apply low-light effects to the image pair
+        low_light_frame1, low_light_frame2 = apply_low_light_effects(frame1, frame2, RandomStreams(seed), index,
+                                                                     workspace=worker_workspace(), **options)
+
+        # Save the processed image pair
+        cv2.imwrite(os.path.join(output_dir, f"low_light_{file1}"), low_light_frame1)
+        cv2.imwrite(os.path.join(output_dir, f"low_light_{file2}"), low_light_frame2)
+
+        return logging.INFO, f"Processed image pair {file1} and {file2}"
+    except Exception as e:
+        return logging.ERROR, f"Error processing image pair {file1} and {file2}: {str(e)}"
+
+
+def process_image_pairs(input_dir, output_dir, seed=None, workers=1, chunk_size=None, cv_threads=None, options=None):
+    """
+    Degrade every image pair of input_dir into output_dir.
+    options are passed on to apply_low_light_effects (see effect_options).
+    With workers > 1 the pairs are dispatched to a process pool in chunks of
+    chunk_size pairs (default: about four chunks per worker, at most 16 pairs),
+    each worker limited to cv_threads OpenCV threads (default: its share of the
+    cores). Results are logged in pair order, and since every pair draws from its
+    own streams the output does not depend on the number of workers. The seed
+    and parameters of every pair are recorded in output_dir/recipes.npz (see
+    recipes.py).
+    """
+    # Create the output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    seed = RandomStreams(seed).seed
+    logging.info(f"Using seed {seed}")
+
+    # Get the list of image files in the input directory, sorted so pair indices
+    # (and with them each pair's noise streams) do not depend on listing order
+    image_files = sorted(f for f in os.listdir(input_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    if len(image_files) % 2:
+        logging.warning(f"Skipping unpaired image {image_files[-1]}")
+
+    options = options or {}
+    if options.get('sampler'):
+        options = dict(options, sampler=dict(options['sampler'], count=len(image_files) // 2))
+    tasks = [(i // 2, input_dir, output_dir, image_files[i], image_files[i + 1], seed, options)
+             for i in range(0, len(image_files) - 1, 2)]
+
+    if workers <= 1 or len(tasks) <= 1:
+        for level, message in map(process_image_pair, tasks):
+            logging.log(level, message)
+    else:
+        workers, chunk_size, cv_threads = pool_settings(len(tasks), workers, chunk_size, cv_threads)
+        logging.info(f"Processing {len(tasks)} pairs with {workers} workers, {chunk_size} pairs per chunk")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cv_threads,)) as executor:
+            for level, message in executor.map(process_image_pair, tasks, chunksize=chunk_size):
+                logging.log(level, message)
+
+    from .recipes import RECIPE_NAME, make_recipes
+
+    frames = [(task[3 + frame], task[0], frame) for task in tasks for frame in (0, 1)]
+    # The defaults of apply_low_light_effects, for the options not given
+    recipe_options = dict({'ranges': None, 'mode': 'lut', 'shot_noise_mode': 'auto', 'saturation_mode': 'luma'},
+                          **options, effect='low_light')
+    make_recipes(frames, seed, recipe_options, input_dir).save(os.path.join(output_dir, RECIPE_NAME))
+    logging.info("Image pair processing completed.")
+
+
+def main(argv=None):
+    """
+    Entry point of lll.py and python -m low_light.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+
+    if not os.path.exists(args.input_dir):
+        logging.error(f"Input directory '{args.input_dir}' does not exist.")
+        return 1
+
+    process_image_pairs(args.input_dir, args.output_dir, args.seed, args.workers, args.chunk_size, args.cv_threads,
+                        effect_options(args))
+    return 0
@@ -0,0 +1,153 @@
+import functools
+import io
+import os
+
+import cv2
+import numpy as np
+
+# zlib strategies of the PNG encoder. Darkened images have few distinct
+# values and long runs, so 'rle' and 'huffman' get close to the size of the
+# default strategy at a fraction of its time.
+PNG_STRATEGIES = {
+    'default': cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    'filtered': cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+    'huffman': cv2.IMWRITE_PNG_STRATEGY_HUFFMAN_ONLY,
+    'rle': cv2.IMWRITE_PNG_STRATEGY_RLE,
+    'fixed': cv2.IMWRITE_PNG_STRATEGY_FIXED,
+}
+
+
+class Codec:
+    """
+    How converted images are stored. encode() turns an image into the bytes
+    of a file, decode() turns them back; extension is that of the files
+    written, or None to keep the extension (and format) of each source image.
+    Codecs are named by a spec string, 'name' or 'name:option=value,...'
+    (see get_codec), which is what runs record and pass to their workers.
+    """
+
+    name = None
+    extension = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.spec!r})"
+
+    @property
+    def spec(self):
+        return self.name
+
+    def output_path(self, path):
+        """
+        The path an image read from path is written to.
+        """
+        if self.extension is None:
+            return path
+        return os.path.splitext(path)[0] + self.extension
+
+    def encode(self, image, path=None):
+        raise NotImplementedError
+
+    def decode(self, data, flags=cv2.IMREAD_UNCHANGED):
+        """
+        The image in data, any buffer; flags are as in cv2.imdecode.
+        """
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+class SourceCodec(Codec):
+    """
+    OpenCV's default encoder for the format of each source image, as the converters always wrote.
+    """
+
+    name = 'source'
+
+    def encode(self, image, path=None):
+        encoded, data = cv2.imencode(os.path.splitext(path)[1], image)
+        if not encoded:
+            raise ValueError('could not be encoded')
+        return data
+
+
+class PngCodec(Codec):
+    """
+    PNG with an explicit zlib level (0-9) and strategy (see PNG_STRATEGIES).
+    """
+
+    name = 'png'
+    extension = '.png'
+
+    def __init__(self, level=3, strategy='default'):
+        if strategy not in PNG_STRATEGIES:
+            raise ValueError(f"Unknown PNG strategy '{strategy}', expected one of {sorted(PNG_STRATEGIES)}")
+        self.level = int(level)
+        self.strategy = strategy
+
+    @property
+    def spec(self):
+        return f"png:level={self.level},strategy={self.strategy}"
+
+    def encode(self, image, path=None):
+        encoded, data = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, self.level,
+                                                     cv2.IMWRITE_PNG_STRATEGY, PNG_STRATEGIES[self.strategy]])
+        if not encoded:
+            raise ValueError('could not be encoded')
+        return data
+
+
+class WebpCodec(Codec):
+    """
+    Lossless WebP: smaller than PNG and slower to encode. 8-bit only, and
+    grayscale images come back as three identical channels.
+    """
+
+    name = 'webp'
+    extension = '.webp'
+
+    def encode(self, image, path=None):
+        # A quality above 100 selects the lossless mode
+        encoded, data = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, 101])
+        if not encoded:
+            raise ValueError('could not be encoded')
+        return data
+
+
+class NpyCodec(Codec):
+    """
+    The raw array in NumPy's .npy format: no compression, the fastest to
+    write and to read, and the largest.
+    """
+
+    name = 'npy'
+    extension = '.npy'
+
+    def encode(self, image, path=None):
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, np.ascontiguousarray(image), allow_pickle=False)
+        return buffer.getbuffer()
+
+    def decode(self, data, flags=None):
+        return np.lib.format.read_array(io.BytesIO(data), allow_pickle=False)
+
+
+CODECS = {codec.name: codec for codec in (SourceCodec, PngCodec, WebpCodec, NpyCodec)}
+
+
+@functools.lru_cache(maxsize=None)
+def get_codec(spec='source'):
+    """
+    The codec of a spec string: a name of CODECS, optionally followed by
+    options, as in 'png:level=9,strategy=rle'.
+    """
+    name, _, arguments = spec.partition(':')
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', expected one of {sorted(CODECS)}")
+    options = {}
+    for argument in filter(None, arguments.split(',')):
+        key, separator, value = argument.partition('=')
+        if not separator:
+            raise ValueError(f"Codec option '{argument}' is not key=value")
+        options[key] = value
+    try:
+        return CODECS[name](**options)
+    except TypeError:
+        raise ValueError(f"Invalid options for codec '{name}': {arguments}") from None
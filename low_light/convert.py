@@ -0,0 +1,801 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .checkpoints import CheckpointStore, import_json_checkpoint, read_checkpoint_keys, read_json_checkpoint
+from .cli import _init_worker, add_effect_arguments, add_pool_arguments, pool_settings, range_options, sampler_options
+from .codecs import CODECS, get_codec
+from .datasets import DATASETS, STATE_DIR, get_dataset, plan_conversion
+from .effects import _apply_staged, draw_low_light_params
+from .files import COPY_CHUNK, copy_fast, link_file, links_to, same_copy, write_bytes_atomic
+from .manifest import TreeManifest, scan_tree
+from .noise_rng import RandomStreams
+from .overlay import write_overlay_manifest
+from .pipeline import BAND_ROWS, apply_low_light_effects_batch
+from .streaming import StreamingPipeline
+from .workspace import worker_workspace
+
+EFFECTS = ('darken', 'low_light')
+
+# How the files passed through unchanged reach the destination: copied,
+# linked (hard links on one filesystem, symbolic links across), or only listed
+# in an overlay manifest pointing back at the source.
+LAYOUTS = ('copy', 'link', 'manifest')
+
+# Where the compute stage of a streaming conversion runs.
+COMPUTE_POOLS = ('process', 'thread')
+
+# What identifies the source of an output in its key: size and modification
+# time, or a hash of the content (slower, but survives copies that reset mtimes).
+SOURCE_KEYS = ('stat', 'content')
+
+# Part of every output key. Bump it whenever convert_image produces different
+# images for the same source and options (a fixed effect, other encoder
+# settings), so that the next run rebuilds the outputs of the previous version.
+PIPELINE_VERSION = 1
+
+# Threads passing files through. Copies spend their time in the kernel, so a
+# few threads keep several requests in flight without holding the GIL.
+COPY_THREADS = 4
+
+
+def darken_scale(image, factor):
+    """
+    Multiply and truncate, as (img * factor).astype('uint8') in most of the old converters.
+    """
+    return (image * factor).astype(np.uint8)
+
+
+def darken_round(image, factor):
+    """
+    Multiply, round and saturate, as cv2.addWeighted(img, factor, img, 0, 0) in the KITTI converters
+    and cv2.convertScaleAbs in fc_ll.py.
+    """
+    return cv2.convertScaleAbs(image, alpha=factor)
+
+
+def darken_hsv_value(image, factor):
+    """
+    Scale the HSV value channel, as flyingthings3dll.py did.
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    hsv[:, :, 2] = hsv[:, :, 2] * factor
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+def darken_brightness(image, factor):
+    """
+    PIL's ImageEnhance.Brightness, as sintel_ll.py did. It treats every channel alike, so BGR order is harmless.
+    """
+    from PIL import Image, ImageEnhance
+
+    return np.asarray(ImageEnhance.Brightness(Image.fromarray(image)).enhance(factor))
+
+
+DARKEN_METHODS = {
+    'scale': darken_scale,
+    'round': darken_round,
+    'hsv_value': darken_hsv_value,
+    'brightness': darken_brightness,
+}
+
+
+def add_haze(image, density, rng, intensity=(0.4, 0.8)):
+    """
+    Blend the image toward white through a random per-pixel haze map, as convert_fcocc.py did.
+    """
+    haze = density * rng.uniform(intensity[0], intensity[1], image.shape[:2])
+    if image.ndim == 3:
+        haze = haze[:, :, None]
+    hazy = np.float32(image) / 255.0 * (1 - haze) + haze
+    return np.uint8(hazy * 255)
+
+
+def degrade_image(image, group, frame, streams, options, workspace=None, params=None):
+    """
+    Apply the effect of options to one image of a dataset.
+    With the 'low_light' effect the parameters come from the streams of the
+    image's group (or from the design of options['sampler'], see
+    draw_low_light_params) and the noise from those of (group, frame), so the
+    frames of a two-image group come out as apply_low_light_effects(frame1,
+    frame2, streams, group) would produce them. params replaces the sampled
+    parameters with recorded ones (see recipes.py); options['mode'] =
+    'staged' runs the reference ops, as lll.py --pointwise_mode staged does.
+    With options['tile_rows'] the image is degraded in place, in bands of
+    that many rows (see Pipeline.run), so no second full-size frame is made;
+    with options['threads'] it is degraded in place by that many threads,
+    band by band, with the noise of the threaded pipeline.
+    """
+    if options['effect'] == 'low_light':
+        if params is None:
+            params = draw_low_light_params(streams, group, options['ranges'], options.get('sampler'))
+        if options.get('mode') == 'staged':
+            return _apply_staged(image, params, streams, (group, frame), options['saturation_mode'], workspace)
+        tile_rows, threads = options.get('tile_rows'), options.get('threads')
+        return apply_low_light_effects_batch(image[None], keys=[(group, frame)], rng=streams,
+                                             shot_noise_mode=options['shot_noise_mode'],
+                                             saturation_mode=options['saturation_mode'], workspace=workspace,
+                                             out=image[None] if tile_rows or threads else None,
+                                             tile_rows=tile_rows, threads=threads, **params)[0]
+    image = DARKEN_METHODS[options['method']](image, options['darkness'])
+    if options['haze'] > 0:
+        image = add_haze(image, options['haze'], streams.generator((group, frame), 'haze'))
+    return image
+
+
+def plan_options(options, plan):
+    """
+    options with the parameter design of options['sampler'], if any, sized
+    to the image groups of a ConversionPlan.
+    """
+    if not options.get('sampler'):
+        return options
+    groups = plan.images[-1].group + 1 if plan.images else 0
+    return dict(options, sampler=dict(options['sampler'], count=groups))
+
+
+def _read_flags(options):
+    # The plain darkening methods keep alpha and grayscale as they are, like the
+    # PIL-based converters did; the pipeline and the HSV method need BGR.
+    if options['effect'] == 'low_light' or options['method'] == 'hsv_value':
+        return cv2.IMREAD_COLOR
+    return cv2.IMREAD_UNCHANGED
+
+
+def read_image(task):
+    """
+    Read and decode the source image of a task. Returns the item degrade_item
+    works on and its size in bytes, the (item, nbytes) a StreamingPipeline
+    reader returns.
+    """
+    path, src, dst, group, frame, seed, options = task
+    try:
+        data = np.fromfile(os.path.join(src, path), dtype=np.uint8)
+    except OSError:
+        data = None
+    image = cv2.imdecode(data, _read_flags(options)) if data is not None and data.size else None
+    if image is None:
+        raise ValueError('missing or unreadable image')
+    return (image, group, frame, seed, options), image.nbytes
+
+
+def degrade_item(item):
+    """
+    Degrade an image read by read_image, in the worker's workspace.
+    """
+    image, group, frame, seed, options = item
+    return degrade_image(image, group, frame, RandomStreams(seed), options, worker_workspace())
+
+
+def write_image(task, image):
+    """
+    Encode a degraded image with the codec of the options (by default in the
+    format of its source) and write it to dst, renamed into place so an
+    interrupted run leaves no truncated images. Returns the number of bytes
+    written.
+    """
+    path, dst, options = task[0], task[2], task[6]
+    codec = get_codec(options.get('codec', 'source'))
+    data = codec.encode(image, path)
+    write_bytes_atomic(os.path.join(dst, codec.output_path(path)), data)
+    return data.nbytes
+
+
+def convert_image(task):
+    """
+    Read, degrade and write one image (see read_image, degrade_item and
+    write_image). Runs in the parent or in a pool worker and returns (path,
+    error, timings, size): error is None on success, timings are the seconds
+    spent reading, degrading and writing, and size is the number of bytes
+    written.
+    """
+    path = task[0]
+    timings = [0.0, 0.0, 0.0]
+    try:
+        started = time.perf_counter()
+        item, _ = read_image(task)
+        read = time.perf_counter()
+        timings[0] = read - started
+
+        image = degrade_item(item)
+        degraded = time.perf_counter()
+        timings[1] = degraded - read
+
+        size = write_image(task, image)
+        timings[2] = time.perf_counter() - degraded
+        return path, None, timings, size
+    except Exception as e:
+        return path, str(e), timings, 0
+
+
+class ConversionStats:
+    """
+    Counters and timings of one conversion run.
+    read, compute and write are summed over the workers, so with N workers
+    they add up to about N times the wall time.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.converted = 0
+        self.skipped = 0
+        self.rebuild = Counter()
+        self.failed = 0
+        self.copied = 0
+        self.linked = 0
+        self.referenced = 0
+        self.copy_skipped = 0
+        self.copy_failed = 0
+        self.copy_methods = Counter()
+        self.copy_seconds = 0.0
+        self.bytes_copied = 0
+        self.bytes_written = 0
+        self.read = 0.0
+        self.compute = 0.0
+        self.write = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add(self, error, timings, size):
+        if error is None:
+            self.converted += 1
+            self.bytes_written += size
+        else:
+            self.failed += 1
+        self.read += timings[0]
+        self.compute += timings[1]
+        self.write += timings[2]
+
+    def add_pass_through(self, outcome, size):
+        if outcome == 'linked':
+            self.linked += 1
+        elif outcome == 'up to date':
+            self.copy_skipped += 1
+        else:
+            self.copied += 1
+            self.bytes_copied += size
+            self.copy_methods[outcome] += 1
+
+    @property
+    def copy_rate(self):
+        """
+        Bytes copied per second of the pass-through stage.
+        """
+        return self.bytes_copied / max(self.copy_seconds, 1e-9)
+
+    def progress(self):
+        done = self.converted + self.failed
+        return (f"{done + self.skipped}/{self.total} images, "
+                f"{done / max(self.elapsed, 1e-9):.1f} images/s")
+
+    def summary(self):
+        busy = max(self.read + self.compute + self.write, 1e-9)
+        return (f"{self.converted} images converted ({self.bytes_written / 2 ** 20:.1f} MiB written), "
+                f"{self.skipped} already done, {self.failed} failed; "
+                f"{self.copied} files copied ({self.bytes_copied / 2 ** 20:.1f} MiB at "
+                f"{self.copy_rate / 2 ** 20:.1f} MiB/s), {self.linked} linked, {self.referenced} left in the source, "
+                f"{self.copy_skipped} up to date, {self.copy_failed} failed; "
+                f"{self.elapsed:.1f} s. Worker time: read {100 * self.read / busy:.0f}%, "
+                f"degrade {100 * self.compute / busy:.0f}%, write {100 * self.write / busy:.0f}%")
+
+
+def checkpoint_path(dst):
+    return os.path.join(dst, STATE_DIR, 'checkpoints.sqlite')
+
+
+def open_checkpoints(dst, import_from=()):
+    """
+    Open the checkpoint store of a destination, first recording the finished
+    images of old {path: true} JSON checkpoints given in import_from.
+    """
+    store = CheckpointStore(checkpoint_path(dst))
+    for json_path in import_from:
+        count = import_json_checkpoint(store, json_path, dst)
+        logging.info(f"Imported {count} finished images from {json_path}")
+    return store
+
+
+def recorded_checkpoints(dst, import_from=()):
+    """
+    The {path: key} a dry run compares against: what open_checkpoints(dst,
+    import_from).keys() would hold, read without creating or writing the
+    store (imported paths keep the key already recorded, or get None).
+    """
+    recorded = read_checkpoint_keys(checkpoint_path(dst))
+    for json_path in import_from:
+        paths = read_json_checkpoint(json_path, dst)
+        for path in paths:
+            recorded.setdefault(path, None)
+        logging.info(f"Would import {len(paths)} finished images from {json_path}")
+    return recorded
+
+
+def _up_to_date(source, target):
+    try:
+        existing = os.stat(target)
+    except FileNotFoundError:
+        return False
+    return same_copy((source.st_size, source.st_mtime_ns), (existing.st_size, existing.st_mtime_ns))
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def source_signature(path, mode='stat'):
+    """
+    What the output key records of a source image: 'size:mtime_ns', or with
+    mode='content' a hash of its bytes.
+    """
+    if mode == 'content':
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2 ** 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    info = os.stat(path)
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+
+def parameter_digest(options, seed=None):
+    """
+    Digest of everything but the source an output depends on: the pipeline
+    version, the options the effect actually reads and, for randomized
+    effects, the seed. A seed of None stands for any seed, so outputs made
+    with whichever seed are kept.
+    """
+    if options['effect'] == 'low_light':
+        used = {key: options[key] for key in ('effect', 'ranges', 'shot_noise_mode', 'saturation_mode')}
+        if options.get('sampler'):
+            used['sampler'] = options['sampler']
+        if options.get('mode') == 'staged':
+            # The reference ops need not give the bytes of the lut path (e.g.
+            # with the table shot noise sampler); lut keys stay as they were
+            used['mode'] = 'staged'
+        elif options.get('threads'):
+            # Threaded runs draw their noise band by band, whatever the number of threads
+            used['band_rows'] = BAND_ROWS
+        randomized = True
+    else:
+        used = {key: options[key] for key in ('effect', 'method', 'darkness', 'haze')}
+        randomized = options['haze'] > 0
+    codec = get_codec(options.get('codec', 'source'))
+    if codec.name != 'source':
+        used['codec'] = codec.spec
+    parameters = {'version': PIPELINE_VERSION, 'options': used, 'seed': seed if randomized else None}
+    return _digest(json.dumps(parameters, sort_keys=True).encode())
+
+
+def output_key(signature, parameters, group, frame):
+    """
+    The key recorded with a converted image: the digest of its source
+    signature, then the digest of the parameters and the random streams
+    (group, frame) it was made with.
+    """
+    return f"{_digest(signature.encode())}-{_digest(f'{parameters}:{group}:{frame}'.encode())}"
+
+
+def rebuild_reason(path, key, recorded, output):
+    """
+    Why the image at path must be converted to the file output, given its
+    current key and the recorded keys, or None when its output is up to date.
+    Images recorded without a key (imported from old JSON checkpoints) count
+    as up to date.
+    """
+    if path not in recorded:
+        return 'new'
+    if not os.path.exists(output):
+        return 'missing'
+    previous = recorded[path]
+    if previous is None or previous == key:
+        return None
+    if previous.split('-')[0] != key.split('-')[0]:
+        return 'source changed'
+    return 'parameters changed'
+
+
+def pass_through_file(source, target, layout='copy', hardlink=True, chunk_size=COPY_CHUNK):
+    """
+    Bring one file from source to target, copied with copy_fast or, with
+    layout='link', linked (see link_file), unless target already holds it.
+    Returns 'up to date', 'linked' or the copy method used.
+    """
+    info = os.stat(source)
+    if layout == 'link':
+        if links_to(source, info, target):
+            return 'up to date'
+        return 'linked' if link_file(source, target, hardlink) != 'copy' else 'copy'
+    if _up_to_date(info, target):
+        return 'up to date'
+    return copy_fast(source, target, chunk_size)
+
+
+class PassThrough:
+    """
+    The files of a conversion passed through unchanged, brought from src to
+    dst according to layout on a pool of threads, so they stream alongside
+    the image workers instead of after them. With 'link', files are
+    hard-linked when src and dst share a filesystem and symlinked otherwise;
+    with 'manifest' nothing is written but an overlay manifest listing them.
+    start() submits every file, wait() collects the outcomes into stats.
+    """
+
+    def __init__(self, paths, src, dst, layout='copy', dataset=None, threads=COPY_THREADS, chunk_size=COPY_CHUNK):
+        self.paths = paths
+        self.src = src
+        self.dst = dst
+        self.layout = layout
+        self.dataset = dataset
+        self.threads = max(1, threads)
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._futures = []
+        self._started = None
+
+    def _run(self, path, hardlink):
+        size = os.path.getsize(os.path.join(self.src, path))
+        outcome = pass_through_file(os.path.join(self.src, path), os.path.join(self.dst, path), self.layout, hardlink,
+                                    self.chunk_size)
+        return outcome, size, time.perf_counter()
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.layout == 'manifest' or not self.paths:
+            return
+        hardlink = os.stat(self.src).st_dev == os.stat(self.dst).st_dev
+        self._executor = ThreadPoolExecutor(max_workers=min(self.threads, len(self.paths)),
+                                            thread_name_prefix='pass-through')
+        self._futures = [(path, self._executor.submit(self._run, path, hardlink)) for path in self.paths]
+
+    def wait(self, stats):
+        if self.layout == 'manifest':
+            write_overlay_manifest(self.dst, self.src, self.paths, self.dataset)
+            stats.referenced += len(self.paths)
+            return
+        finished = self._started
+        for path, future in self._futures:
+            try:
+                outcome, size, done = future.result()
+            except OSError as e:
+                stats.copy_failed += 1
+                logging.error(f"Error passing {path} through: {e}")
+                continue
+            stats.add_pass_through(outcome, size)
+            finished = max(finished, done)
+        stats.copy_seconds += finished - self._started
+        self.close()
+
+    def close(self, cancel=False):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=cancel)
+            self._executor = None
+
+
+def compare_outputs(spec, src, dst, layout='copy', codec='source'):
+    """
+    Compare the tree at dst with what converting src should produce: every
+    image (under the name codec writes it to) and, unless layout is 'manifest', every file passed through. Both
+    trees are indexed with scan_tree, through caches in dst's state directory,
+    so repeated comparisons only list the directories that changed. Returns a
+    TreeDiff whose changed paths are the passed-through files that differ in
+    size or modification time from their source; converted images are
+    expected to.
+    """
+    state = os.path.join(dst, STATE_DIR)
+    source = scan_tree(src, os.path.join(state, 'source_tree.json'), skip=(STATE_DIR,))
+    target = scan_tree(dst, os.path.join(state, 'tree.json'), skip=(STATE_DIR,))
+    plan = plan_conversion(spec, src, source.paths())
+    output_path = get_codec(codec).output_path
+    outputs = TreeManifest(src, {output_path(task.path): source.files[task.path] for task in plan.images})
+    if layout != 'manifest':
+        outputs.files.update(source.subset(plan.pass_through).files)
+    diff = outputs.diff(target)
+    diff.changed = source.subset(diff.changed & set(plan.pass_through)).diff(target, same_copy).changed
+    return diff
+
+
+def _stream_images(tasks, workers, cv_threads, stream):
+    workers, _, cv_threads = pool_settings(len(tasks), workers, None, cv_threads)
+    if stream['compute'] == 'process':
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cv_threads,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='compute')
+    pipeline = StreamingPipeline(read_image, degrade_item, write_image, executor, workers, stream['readers'],
+                                 stream['writers'], stream['byte_budget'])
+    logging.info(f"Streaming {len(tasks)} images through {pipeline}")
+    return pipeline
+
+
+def convert_dataset(spec, src, dst, options, seed=None, workers=1, chunk_size=None, cv_threads=None, restart=False,
+                    dry_run=False, log_every=100, import_checkpoints=(), layout='copy', copy_threads=COPY_THREADS,
+                    source_key='stat', stream=None):
+    """
+    Convert the dataset described by spec from src into dst.
+
+    Images are read from src, degraded according to options (see
+    effect_options) on a pool of workers and written straight to dst, so every
+    image is read once and written once; ground truth and, if the dataset
+    copies them, the other files are passed through meanwhile on copy_threads
+    threads, copied, linked or listed in an overlay manifest according to
+    layout (see PassThrough). Every output goes through a temporary file
+    renamed into place.
+
+    By default each worker reads, degrades and writes whole images in turn.
+    With stream (see stream_options), images instead flow through a
+    StreamingPipeline: reader threads decode, the workers (processes or
+    threads) only degrade and writer threads encode, so disk waits and codec
+    time overlap the compute; the occupancy of each stage is logged at the
+    end. Both produce the same images.
+
+    Runs are incremental, like make: every converted image is recorded in a
+    CheckpointStore under dst (after importing the old JSON checkpoints in
+    import_checkpoints) with its output_key, made of its source signature
+    (see source_signature and source_key), the parameters and the pipeline
+    version, and only images whose key changed are converted again;
+    up-to-date copies are not redone either. restart forgets the recorded
+    images, dry_run only logs what would be rebuilt and why, and writes
+    nothing (not even the store or the imported checkpoints). The seed and
+    parameters of every image are recorded as recipes (see recipes.py) in
+    the state directory, unless kept outputs may come from another seed.
+    Returns the ConversionStats of the run.
+    """
+    plan = plan_conversion(spec, src)
+    options = plan_options(options, plan)
+    parameters = parameter_digest(options, seed)
+    seed = RandomStreams(seed).seed
+    logging.info(f"{plan}; {len(plan.pairs())} frame pairs")
+
+    if dry_run:
+        # A dry run writes nothing, not even the store or the checkpoints it would import
+        store = None
+        recorded = {} if restart else recorded_checkpoints(dst, import_checkpoints)
+    else:
+        store = open_checkpoints(dst, import_checkpoints)
+        if restart:
+            store.clear()
+        recorded = {} if restart else store.keys()
+
+    output_path = get_codec(options.get('codec', 'source')).output_path
+    keys = {}
+    pending = []
+    stats = ConversionStats(len(plan.images))
+    for task in plan.images:
+        signature = source_signature(os.path.join(src, task.path), source_key)
+        keys[task.path] = output_key(signature, parameters, task.group, task.frame)
+        reason = rebuild_reason(task.path, keys[task.path], recorded, os.path.join(dst, output_path(task.path)))
+        if reason is not None:
+            pending.append(task)
+            stats.rebuild[reason] += 1
+            if dry_run:
+                logging.info(f"Would convert {task.path} ({reason})")
+    stats.skipped = len(plan.images) - len(pending)
+    if dry_run:
+        reasons = ', '.join(f"{count} {reason}" for reason, count in sorted(stats.rebuild.items()))
+        logging.info(f"Would convert {len(pending)} images ({reasons or 'none'}; {stats.skipped} up to date) "
+                     f"and pass through up to {len(plan.pass_through)} files ({layout})")
+        return stats
+
+    if options['effect'] == 'low_light' or options['haze'] > 0:
+        logging.info(f"Using seed {seed}")
+    # Outputs kept from runs with another seed would not match the recipes of this one
+    if parameters == parameter_digest(options, seed) or not stats.skipped:
+        from .recipes import RECIPE_NAME, plan_recipes
+
+        os.makedirs(os.path.join(dst, STATE_DIR), exist_ok=True)
+        plan_recipes(plan, seed, options, src).save(os.path.join(dst, STATE_DIR, RECIPE_NAME))
+    written = [task.path for task in plan.images] + (plan.pass_through if layout != 'manifest' else [])
+    for directory in sorted({os.path.dirname(path) for path in written}):
+        os.makedirs(os.path.join(dst, directory), exist_ok=True)
+
+    tasks = [(task.path, src, dst, task.group, task.frame, seed, options) for task in pending]
+    executor = None
+    pipeline = None
+    pass_through = PassThrough(plan.pass_through, src, dst, layout, spec.name, copy_threads)
+    completed = False
+    try:
+        pass_through.start()
+        if stream is not None and tasks:
+            pipeline = _stream_images(tasks, workers, cv_threads, stream)
+            results = ((task[0], error, timings, size) for task, size, error, timings in pipeline.run(tasks))
+        elif workers <= 1 or len(tasks) <= 1:
+            results = map(convert_image, tasks)
+        else:
+            workers, chunk_size, cv_threads = pool_settings(len(tasks), workers, chunk_size, cv_threads)
+            logging.info(f"Converting {len(tasks)} images with {workers} workers, {chunk_size} images per chunk")
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cv_threads,))
+            results = executor.map(convert_image, tasks, chunksize=chunk_size)
+
+        for number, (path, error, timings, size) in enumerate(results, 1):
+            stats.add(error, timings, size)
+            if error is None:
+                store.add(path, keys[path])
+            else:
+                logging.error(f"Error converting {path}: {error}")
+            if number % log_every == 0:
+                logging.info(stats.progress())
+
+        pass_through.wait(stats)
+        completed = True
+    finally:
+        pass_through.close(cancel=not completed)
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        store.close()
+
+    logging.info(stats.summary())
+    if pipeline is not None:
+        logging.info(pipeline.report())
+    return stats
+
+
+def effect_options(args, spec):
+    """
+    Collect the options of degrade_image and write_image from parsed arguments, defaulting to the dataset's own
+    darkening.
+    """
+    return {
+        'effect': args.effect,
+        'method': args.method or spec.method,
+        'darkness': spec.darkness if args.darkness is None else args.darkness,
+        'haze': args.haze,
+        'ranges': range_options(args),
+        'shot_noise_mode': args.shot_noise_mode,
+        'saturation_mode': args.saturation_mode,
+        'sampler': sampler_options(args),
+        'tile_rows': args.tile_rows,
+        'threads': args.threads,
+        'codec': args.codec,
+    }
+
+
+def stream_options(args):
+    """
+    The stream argument of convert_dataset from parsed arguments: None unless --stream was given.
+    """
+    if not args.stream:
+        return None
+    return {
+        'readers': args.readers,
+        'writers': args.writers,
+        'compute': args.compute,
+        'byte_budget': int(args.byte_budget * 2 ** 20),
+    }
+
+
+def _codec_spec(spec):
+    try:
+        return get_codec(spec).spec
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_parser():
+    """
+    Build the argument parser of the convert.py command line.
+    """
+    datasets = '\n'.join(f"  {name:<22} {spec.description}" for name, spec in sorted(DATASETS.items()))
+    parser = argparse.ArgumentParser(description='Convert a dataset into its low-light version',
+                                     epilog=f"datasets:\n{datasets}", formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dataset', choices=sorted(DATASETS), metavar='dataset', help='Dataset name (see below)')
+    parser.add_argument('src', help='Root of the dataset')
+    parser.add_argument('dst', help='Root of the converted copy')
+    parser.add_argument('--effect', type=str, default='darken', choices=EFFECTS,
+                        help="Darken every image by a fixed factor, or apply the randomized low-light pipeline")
+    parser.add_argument('--darkness', type=float, default=None, help="Darkening factor (default: the dataset's)")
+    parser.add_argument('--method', type=str, default=None, choices=list(DARKEN_METHODS),
+                        help="How the factor is applied (default: the dataset's)")
+    parser.add_argument('--haze', type=float, default=0.0, help='Haze density added after darkening (0: none)')
+    parser.add_argument('--codec', type=_codec_spec, default='source', metavar='CODEC',
+                        help=f"How images are stored: {', '.join(CODECS)}, with options as in "
+                             f"png:level=9,strategy=rle (default: OpenCV's encoder for the source format)")
+    parser.add_argument('--output', type=str, default='files', choices=('files', 'tar', 'lmdb', 'recipes'),
+                        help='Write a tree of files, pack every pair with its ground truth into tar shards '
+                             '(WebDataset-style) or an LMDB environment, or only write the recipes of the images '
+                             '(seed and parameters, see recipes.py) to regenerate them from the source on read')
+    parser.add_argument('--shard_size', type=float, default=1024, help='MiB a tar shard is closed at')
+    parser.add_argument('--layout', type=str, default='copy', choices=LAYOUTS,
+                        help='Copy the ground truth and other files, link them (hard links on the same filesystem, '
+                             'symbolic links across), or only list them in an overlay manifest')
+    parser.add_argument('--copy_threads', type=int, default=COPY_THREADS,
+                        help='Threads copying or linking the files passed through, alongside the image workers')
+    parser.add_argument('--ground_truth', action='store_true',
+                        help='Also write the ground truth of datasets that leave it out by default (sintel)')
+    parser.add_argument('--skip_other', action='store_true',
+                        help='Only write images and ground truth, not the other files of the dataset')
+    parser.add_argument('--restart', action='store_true', help='Forget the finished images and convert every image again')
+    parser.add_argument('--import_checkpoint', action='append', default=[], metavar='JSON',
+                        help='Record the finished images of a *_checkpoints.json of the old conversion scripts '
+                             '(can be repeated)')
+    parser.add_argument('--source_key', type=str, default='stat', choices=SOURCE_KEYS,
+                        help='Notice changed source images by size and modification time, or by a hash of their '
+                             'content')
+    parser.add_argument('--compare', action='store_true',
+                        help='Only compare the destination with the expected output tree, listing what differs')
+    parser.add_argument('--dry_run', action='store_true', help='Only list the images that would be converted, and why')
+    parser.add_argument('--log_every', type=int, default=100, help='Log progress every this many images')
+    add_effect_arguments(parser.add_argument_group('low_light effect'))
+    add_pool_arguments(parser, workers=os.cpu_count() or 1)
+    streaming = parser.add_argument_group('streaming')
+    streaming.add_argument('--stream', action='store_true',
+                           help='Decode on reader threads and encode on writer threads, so the workers only degrade')
+    streaming.add_argument('--readers', type=int, default=2, help='Reader threads')
+    streaming.add_argument('--writers', type=int, default=2, help='Writer threads')
+    streaming.add_argument('--compute', type=str, default='process', choices=COMPUTE_POOLS,
+                           help='Degrade on --workers processes or threads')
+    streaming.add_argument('--byte_budget', type=float, default=1024,
+                           help='MiB of decoded images in flight at most; readers wait beyond it')
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of convert.py and python -m low_light.convert.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+    spec = get_dataset(args.dataset)
+    if args.ground_truth:
+        spec = spec.with_options(copy_ground_truth=True)
+    if args.skip_other:
+        spec = spec.with_options(copy_other=False)
+
+    if not os.path.isdir(args.src):
+        logging.error(f"Dataset directory '{args.src}' does not exist.")
+        return 1
+    if os.path.realpath(args.src) == os.path.realpath(args.dst):
+        logging.error("Source and destination are the same directory; the converter writes a separate copy.")
+        return 1
+
+    if args.compare:
+        if not os.path.isdir(args.dst):
+            logging.error(f"Destination directory '{args.dst}' does not exist.")
+            return 1
+        diff = compare_outputs(spec, args.src, args.dst, args.layout, args.codec)
+        for kind in ('missing', 'extra', 'changed'):
+            for path in sorted(getattr(diff, kind)):
+                logging.info(f"{kind}: {path}")
+        logging.info(f"{args.dst} against {args.src}: {len(diff.missing)} missing, {len(diff.extra)} extra, "
+                     f"{len(diff.changed)} changed")
+        return 1 if diff else 0
+
+    if args.output == 'recipes':
+        from .recipes import RECIPE_NAME, plan_recipes
+
+        recipes = plan_recipes(plan_conversion(spec, args.src), args.seed, effect_options(args, spec), args.src)
+        os.makedirs(args.dst, exist_ok=True)
+        recipes.save(os.path.join(args.dst, RECIPE_NAME))
+        logging.info(f"Wrote the recipes of {len(recipes)} {spec.name} images to {os.path.join(args.dst, RECIPE_NAME)} "
+                     f"({os.path.getsize(os.path.join(args.dst, RECIPE_NAME)) / 2 ** 10:.0f} KiB)")
+        return 0
+    logging.info(f"Converting {spec.name} from {args.src} to {args.dst}")
+    if args.output != 'files':
+        from .shards import pack_dataset
+
+        try:
+            stats = pack_dataset(spec, args.src, args.dst, effect_options(args, spec), args.seed, args.workers,
+                                 args.chunk_size, args.cv_threads, args.output, int(args.shard_size * 2 ** 20),
+                                 args.dry_run, args.log_every)
+        except ImportError as e:
+            logging.error(str(e))
+            return 1
+        return 1 if stats.failed else 0
+    stats = convert_dataset(spec, args.src, args.dst, effect_options(args, spec), args.seed, args.workers,
+                            args.chunk_size, args.cv_threads, args.restart, args.dry_run, args.log_every,
+                            args.import_checkpoint, args.layout, args.copy_threads, args.source_key,
+                            stream_options(args))
+    return 1 if stats.failed or stats.copy_failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
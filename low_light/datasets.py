@@ -0,0 +1,253 @@
+import copy
+import os
+import re
+
+# Directory the conversion engine keeps its own state in, inside the destination.
+STATE_DIR = '.low_light'
+
+# Descriptors of the datasets the conversion engine knows, keyed by the name
+# given on the command line (python convert.py <dataset> <src> <dst>).
+DATASETS = {}
+
+
+class DatasetSpec:
+    """
+    How to convert one dataset: which files are images to degrade, which are
+    ground truth to pass through untouched, and how images group into pairs.
+
+    images and ground_truth are regular expressions searched in each file's
+    path relative to the dataset root, always with '/' separators. Images
+    sharing a group share one set of degradation parameters, and consecutive
+    images of a group (in path order) form the dataset's frame pairs. group is
+    a regular expression whose captured parts make the group key; images it
+    does not match are grouped by directory (a sequence of frames). A
+    conversion passes the ground truth through when copy_ground_truth is set,
+    and the files that are neither images nor ground truth when copy_other is.
+    sample is a regular expression whose captured parts name the sample a
+    file belongs to when the dataset is packed into shards (see shards.py),
+    so that a pair travels with its ground truth; files it does not match
+    form a sample of their own.
+    darkness and method are the darkening the dataset was originally converted
+    with (see convert.DARKEN_METHODS).
+    """
+
+    def __init__(self, name, images, ground_truth=None, group=None, darkness=0.12, method='scale', copy_other=True,
+                 description='', sample=None, copy_ground_truth=True):
+        self.name = name
+        self.images = re.compile(images)
+        self.ground_truth = re.compile(ground_truth) if ground_truth else None
+        self.group = re.compile(group) if group else None
+        self.darkness = darkness
+        self.method = method
+        self.copy_other = copy_other
+        self.copy_ground_truth = copy_ground_truth
+        self.description = description
+        self.sample = re.compile(sample) if sample else None
+
+    def __repr__(self):
+        return f"DatasetSpec({self.name!r})"
+
+    def with_options(self, **options):
+        """
+        A copy of the descriptor with some attributes replaced.
+        """
+        spec = copy.copy(self)
+        for name, value in options.items():
+            setattr(spec, name, value)
+        return spec
+
+    def is_image(self, path):
+        return self.images.search(path) is not None
+
+    def is_ground_truth(self, path):
+        return self.ground_truth is not None and self.ground_truth.search(path) is not None
+
+    def sample_key(self, path):
+        """
+        The name of the sample path belongs to: its captured parts joined by
+        '/', or the path without its extension. Dots become underscores, as
+        in WebDataset the key of a member ends at the first dot of its name.
+        """
+        match = self.sample.search(path) if self.sample else None
+        if match is None:
+            key = path.rpartition('.')[0] if '.' in path.rpartition('/')[2] else path
+        else:
+            key = '/'.join(part.strip('/') for part in match.groups() if part and part.strip('/'))
+        return key.replace('.', '_')
+
+    def group_key(self, path):
+        match = self.group.search(path) if self.group else None
+        if match is None:
+            return (path.rpartition('/')[0],)
+        return match.groups()
+
+
+class ImageTask:
+    """
+    One image to degrade: its relative path, the index of its group among all
+    groups of the dataset and its position in that group. (group, frame) is
+    the image's random stream key.
+    """
+    __slots__ = ('path', 'group', 'frame')
+
+    def __init__(self, path, group, frame):
+        self.path = path
+        self.group = group
+        self.frame = frame
+
+    def __repr__(self):
+        return f"ImageTask({self.path!r}, group={self.group}, frame={self.frame})"
+
+
+class ConversionPlan:
+    """
+    The files of a dataset tree sorted into images, ground truth and other
+    files, with the images grouped and numbered.
+    """
+
+    def __init__(self, spec, images, ground_truth, other):
+        self.spec = spec
+        self.images = images
+        self.ground_truth = ground_truth
+        self.other = other
+
+    def __repr__(self):
+        return (f"ConversionPlan({self.spec.name!r}, {len(self.images)} images, "
+                f"{len(self.ground_truth)} ground truth, {len(self.other)} other)")
+
+    @property
+    def pass_through(self):
+        """
+        The files a conversion copies unchanged: the ground truth and the other files, each if the dataset copies them.
+        """
+        return self.companions if self.spec.copy_ground_truth else (self.other if self.spec.copy_other else [])
+
+    @property
+    def companions(self):
+        """
+        The files that travel with the images of their sample: the ground
+        truth, and the other files if the dataset copies them, whether or not
+        a conversion writes the ground truth.
+        """
+        return self.ground_truth + (self.other if self.spec.copy_other else [])
+
+    def pairs(self):
+        """
+        The (frame1, frame2) relative paths of consecutive images within each group.
+        """
+        pairs = []
+        for previous, task in zip(self.images, self.images[1:]):
+            if previous.group == task.group:
+                pairs.append((previous.path, task.path))
+        return pairs
+
+
+def register(spec):
+    DATASETS[spec.name] = spec
+    return spec
+
+
+def get_dataset(name):
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset '{name}', expected one of {sorted(DATASETS)}")
+    return DATASETS[name]
+
+
+def walk_files(root):
+    """
+    Every file below root as a sorted list of '/'-separated relative paths,
+    leaving out the engine's state directory.
+    """
+    paths = []
+    for directory, directories, files in os.walk(root):
+        if STATE_DIR in directories:
+            directories.remove(STATE_DIR)
+        relative = os.path.relpath(directory, root).replace(os.sep, '/')
+        prefix = '' if relative == '.' else relative + '/'
+        paths.extend(prefix + name for name in files)
+    paths.sort()
+    return paths
+
+
+def plan_conversion(spec, root, paths=None):
+    """
+    Sort the files of the dataset at root (or the relative paths given) into
+    a ConversionPlan.
+    Groups are numbered in key order and frames in path order, so the numbering
+    (and with it the noise of every image) depends only on the files present.
+    """
+    images, ground_truth, other = [], [], []
+    for path in walk_files(root) if paths is None else sorted(paths):
+        if spec.is_image(path):
+            images.append(path)
+        elif spec.is_ground_truth(path):
+            ground_truth.append(path)
+        else:
+            other.append(path)
+
+    groups = {}
+    for path in images:
+        groups.setdefault(spec.group_key(path), []).append(path)
+    tasks = []
+    for group, key in enumerate(sorted(groups)):
+        tasks.extend(ImageTask(path, group, frame) for frame, path in enumerate(groups[key]))
+    return ConversionPlan(spec, tasks, ground_truth, other)
+
+
+register(DatasetSpec(
+    'autoflow', images=r'(^|/)im[01]\.png$', ground_truth=r'\.flo$', darkness=0.05,
+    sample=r'^(.*)/[^/]+$',
+    description='AutoFlow: im0.png/im1.png per sample directory (auto_ll.py)'))
+register(DatasetSpec(
+    'flyingchairs', images=r'_img[12]\.ppm$', ground_truth=r'_flow\.flo$', group=r'^(.*)_img[12]\.ppm$',
+    darkness=0.04, method='round',
+    sample=r'^(.*)_(?:img[12]|flow)\.(?:ppm|flo)$',
+    description='FlyingChairs: NNNNN_img1.ppm/_img2.ppm with NNNNN_flow.flo (fc_ll.py)'))
+register(DatasetSpec(
+    'flyingchairsocc', images=r'_img[12]\.png$', ground_truth=r'_(flow\.flo|occ[12]\.png)$',
+    group=r'^(.*)_img[12]\.png$',
+    sample=r'^(.*)_(?:img[12]|flow|occ[12])\.(?:png|flo)$',
+    description='FlyingChairsOcc: NNNNN_img1.png/_img2.png with flow and occlusions '
+                '(convert_flyingchairsocc.py, convert_fcocc.py)'))
+register(DatasetSpec(
+    'chairssd', images=r'(^|/)t[01]/[^/]+\.png$', ground_truth=r'\.pfm$', group=r'^(.*)t[01](/[^/]+)$',
+    sample=r'^(.*?)(?:t[01]|flow)/([^/]+)\.(?:png|pfm)$',
+    description='ChairsSDHom: t0/NNNNN.png and t1/NNNNN.png with flow/NNNNN.pfm (convert_chairssd.py)'))
+register(DatasetSpec(
+    'flyingthings3d', images=r'(^|/)(left|right)/[^/]+\.png$', ground_truth=r'\.pfm$',
+    sample=r'(TRAIN|TEST)/([A-C])/(\d{4})/(?:into_(?:future|past)/)?(left|right)/'
+           r'(?:[A-Za-z]+_)?(\d{4})(?:_[LR])?\.(?:png|pfm)$',
+    description='FlyingThings3D: frames_*/.../left|right/NNNN.png with PFM ground truth '
+                '(convert_flyingthings3d.py, flyingthings3dll.py, ft_ll.py)'))
+register(DatasetSpec(
+    'flyingthings3d_subset', images=r'(^|/)image_clean/.+\.png$',
+    ground_truth=r'(^|/)(flow|flow_occlusions|disparity|disparity_change|disparity_occlusions|motion_boundaries)/',
+    sample=r'^(.*?)/?(?:image_clean|flow|flow_occlusions|disparity|disparity_change|disparity_occlusions|'
+           r'motion_boundaries)/(left|right)/(?:into_(?:future|past)/)?(\d+)\.\w+$',
+    description='FlyingThings3D subset: image_clean/left|right/NNNNNNN.png (convert_flyingthings3d_subset.py)'))
+register(DatasetSpec(
+    'kubric', images=r'(^|/)images/.+\.png$', ground_truth=r'(^|/)(forward|backward)_flow/',
+    sample=r'^(.*?)/?(?:images|forward_flow|backward_flow)/(.+)/[^/]*?(\d+)\.\w+$',
+    description='Kubric: images/<scene>/frame_NN.png with forward and backward flow (convert_kubric.py)'))
+register(DatasetSpec(
+    'kitti2012', images=r'(^|/)(training|testing)/(colored|image)_[01]/[^/]+\.png$',
+    ground_truth=r'(^|/)training/(flow|disp)_', group=r'^(.*)_1[01]\.png$', darkness=0.03, method='round',
+    sample=r'^(.*?)/?[^/]+/(\d{6})_1[01]\.png$',
+    description='KITTI 2012: colored_0/1 and image_0/1 NNNNNN_10.png/_11.png (kitti12_ll.py)'))
+register(DatasetSpec(
+    'kitti2015', images=r'(^|/)image_[23]/[^/]+\.png$', ground_truth=r'(^|/)training/(flow|disp)_',
+    group=r'^(.*)_1[01]\.png$', darkness=0.06, method='round',
+    sample=r'^(.*?)/?[^/]+/(\d{6})_1[01]\.png$',
+    description='KITTI 2015: image_2/3 NNNNNN_10.png/_11.png (kitti15_ll.py, convert_kitti_15.py)'))
+register(DatasetSpec(
+    'hd1k', images=r'^(?!(.*/)?hd1k_flow_(gt|uncertainty)/).*\.png$', ground_truth=r'(^|/)hd1k_flow_(gt|uncertainty)/',
+    group=r'^(.*/\d{6})_\d{4}\.png$',
+    sample=r'(\d{6})_(\d{4})\.png$',
+    description='HD1K: hd1k_input/image_2/SSSSSS_FFFF.png sequences (convert_hd1k.py)'))
+register(DatasetSpec(
+    'sintel', images=r'(^|/)(clean|final|albedo)/.+\.png$', ground_truth=r'(^|/)(flow|invalid|occlusions)/',
+    darkness=0.01, method='brightness',
+    # sintel_ll.py only ever wrote the images: the several GB of ground truth are written with --ground_truth
+    copy_ground_truth=False, copy_other=False,
+    sample=r'^(.*?)/?(?:clean|final|albedo|flow|invalid|occlusions)/(.+)/frame_(\d+)\.\w+$',
+    description='MPI Sintel: clean|final/<scene>/frame_NNNN.png sequences (sintel_ll.py)'))
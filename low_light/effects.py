@@ -0,0 +1,225 @@
+import functools
+import json
+
+import numpy as np
+import cv2
+
+from .pipeline import apply_low_light_effects_batch
+from .motion_blur import apply_motion_blur
+from .noise_rng import RandomStreams
+from .sampling import sample_table
+from .saturation import adjust_contrast_saturation
+from .shot_noise import sample_shot_noise
+from .workspace import scratch, to_uint8
+
+# Range every random parameter is drawn from, keyed like the --<name>_min /
+# --<name>_max options of the CLI. The draw order below is part of the
+# reproducibility contract: a seed regenerates the same parameters only as
+# long as they are drawn in this order.
+DEFAULT_RANGES = {
+    'noise_level': (0.05, 0.2),
+    'gaussian_std': (5, 20),
+    'illumination': (0.3, 0.7),
+    'blur_kernel': (3, 7),
+    'contrast': (0.8, 1.2),
+    'color': (0.6, 1.0),
+    'red_gain': (0.8, 1.2),
+    'green_gain': (0.8, 1.2),
+    'blue_gain': (0.8, 1.2),
+}
+
+
+def add_shot_noise(image, noise_level, rng=None, out=None, workspace=None):
+    """
+    Add shot noise to the image.
+    Increasing the noise_level will increase the amount of shot noise applied to the image.
+    Always exact Poisson noise; shot_noise.sample_shot_noise picks among the faster samplers.
+    """
+    return sample_shot_noise(image, noise_level, 'poisson', rng, out, workspace)
+
+
+def add_gaussian_noise(image, mean, std, rng=None, out=None, workspace=None):
+    """
+    Add Gaussian noise to the image.
+    Increasing the std will increase the standard deviation of the Gaussian noise applied to the image.
+    A numpy Generator draws float32 noise straight into a workspace buffer that is then clipped.
+    """
+    if isinstance(rng, np.random.Generator):
+        noise = rng.standard_normal(dtype=np.float32, out=scratch(workspace, 'gaussian_noise', image.shape, np.float32))
+        noise *= np.float32(std)
+        noise += mean
+    else:
+        noise = np.random.normal(mean, std, image.shape)
+    noise += image
+    return to_uint8(noise, out)
+
+
+def adjust_illumination(image, illumination_factor, out=None, workspace=None):
+    """
+    Adjust the illumination of the image.
+    Decreasing the illumination_factor will make the image darker, simulating low-light conditions.
+    """
+    adjusted_image = scratch(workspace, 'illumination', image.shape, np.float32)
+    np.copyto(adjusted_image, image)
+    adjusted_image /= 255.0
+    gamma = 1.0 / illumination_factor
+    np.power(adjusted_image, gamma, out=adjusted_image)
+    adjusted_image *= 255
+    return to_uint8(adjusted_image, out)
+
+
+def adjust_contrast_color(image, contrast_factor, color_factor, saturation_mode='hsv', out=None, workspace=None):
+    """
+    Adjust the contrast and color saturation of the image.
+    Increasing the contrast_factor will increase the contrast of the image.
+    Decreasing the color_factor will decrease the color saturation of the image.
+    saturation_mode='luma' runs both as one fused matrix pass instead of the HSV round trip.
+    """
+    if saturation_mode != 'hsv':
+        return adjust_contrast_saturation(image, contrast_factor, color_factor, saturation_mode, out)
+    adjusted_image = cv2.convertScaleAbs(image, scratch(workspace, 'contrast', image.shape, np.uint8),
+                                         alpha=contrast_factor, beta=0)
+    return adjust_color(adjusted_image, color_factor, out, workspace)
+
+
+def adjust_color(image, color_factor, out=None, workspace=None):
+    """
+    Scale the color saturation of the image through an HSV round trip.
+    This is the part of adjust_contrast_color that is not a per-channel lookup.
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=scratch(workspace, 'hsv', image.shape, np.uint8))
+    saturation = np.multiply(hsv[:, :, 1], color_factor,
+                             out=scratch(workspace, 'hsv_saturation', image.shape[:2], np.float64))
+    to_uint8(saturation, hsv[:, :, 1])
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=out)
+
+
+def apply_white_balance(image, red_gain, green_gain, blue_gain, out=None, workspace=None):
+    """
+    Apply white balance to the image.
+    Adjusting the red_gain, green_gain, and blue_gain will change the color balance of the image.
+    """
+    balanced_image = scratch(workspace, 'white_balance', image.shape, np.float32)
+    np.copyto(balanced_image, image)
+    balanced_image[:, :, 0] *= red_gain
+    balanced_image[:, :, 1] *= green_gain
+    balanced_image[:, :, 2] *= blue_gain
+    return to_uint8(balanced_image, out)
+
+
+def sample_low_light_params(rng, ranges=None):
+    """
+    Draw one low-light parameter set from rng.
+    ranges maps the names of DEFAULT_RANGES to (min, max); missing names use the defaults.
+    Returns the keyword arguments of apply_low_light_effects_batch.
+    """
+    ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+    return {
+        'noise_level': rng.uniform(*ranges['noise_level']),
+        'gaussian_std': rng.uniform(*ranges['gaussian_std']),
+        'illumination_factor': rng.uniform(*ranges['illumination']),
+        'blur_kernel_size': int(rng.integers(*ranges['blur_kernel'], endpoint=True)),
+        'contrast_factor': rng.uniform(*ranges['contrast']),
+        'color_factor': rng.uniform(*ranges['color']),
+        'red_gain': rng.uniform(*ranges['red_gain']),
+        'green_gain': rng.uniform(*ranges['green_gain']),
+        'blue_gain': rng.uniform(*ranges['blue_gain']),
+    }
+
+
+# Keyword of apply_low_light_effects_batch each range of DEFAULT_RANGES is drawn for.
+PARAMETER_NAMES = {
+    'noise_level': 'noise_level',
+    'gaussian_std': 'gaussian_std',
+    'illumination': 'illumination_factor',
+    'blur_kernel': 'blur_kernel_size',
+    'contrast': 'contrast_factor',
+    'color': 'color_factor',
+    'red_gain': 'red_gain',
+    'green_gain': 'green_gain',
+    'blue_gain': 'blue_gain',
+}
+
+
+def sample_low_light_table(count, rng, ranges=None, design='random', scales=None, correlations=()):
+    """
+    Draw the low-light parameters of count pairs in one vectorized call (see
+    sampling.sample_table for design, scales and correlations, which name
+    parameters like ranges). Returns a dict of length-count arrays keyed like
+    sample_low_light_params, which apply_low_light_effects_batch takes as it
+    is for a batch of count images, or row by row through draw_low_light_params.
+    """
+    ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+    table = sample_table(count, ranges, design, scales, correlations, rng, integers=('blur_kernel',))
+    return {PARAMETER_NAMES[name]: values for name, values in table.items()}
+
+
+@functools.lru_cache(maxsize=4)
+def _design_table(seed, ranges, sampler):
+    # Every worker builds the table of a run once, from the same seed
+    sampler = json.loads(sampler)
+    rng = RandomStreams(seed).generator(sampler['count'], 'design')
+    return sample_low_light_table(sampler['count'], rng, json.loads(ranges), sampler.get('design', 'random'),
+                                  sampler.get('scales'), sampler.get('correlations', ()))
+
+
+def draw_low_light_params(streams, group, ranges=None, sampler=None):
+    """
+    The parameters of one pair or image group. Without a sampler they are
+    drawn from the group's own 'params' stream (sample_low_light_params);
+    with one, a dict of design, scales and correlations (see
+    sample_low_light_table) plus count, the number of groups, they are row
+    group of the table designed for all groups from the streams' seed, so
+    the groups cover the ranges together instead of independently.
+    """
+    if not sampler:
+        return sample_low_light_params(streams.generator(group, 'params'), ranges)
+    table = _design_table(streams.seed, json.dumps(ranges, sort_keys=True), json.dumps(sampler, sort_keys=True))
+    if not 0 <= group < sampler['count']:
+        raise ValueError(f"Group {group} is outside the parameter design of {sampler['count']} groups")
+    return {name: values[group].item() for name, values in table.items()}
+
+
+def _apply_staged(frame, params, streams, key, saturation_mode, workspace):
+    frame = add_shot_noise(frame, params['noise_level'], streams.generator(key, 'shot_noise'), workspace=workspace)
+    frame = add_gaussian_noise(frame, 0, params['gaussian_std'], streams.generator(key, 'gaussian_noise'),
+                               workspace=workspace)
+    frame = adjust_illumination(frame, params['illumination_factor'], workspace=workspace)
+    frame = apply_motion_blur(frame, params['blur_kernel_size'], method='dense')
+    frame = adjust_contrast_color(frame, params['contrast_factor'], params['color_factor'], saturation_mode,
+                                  workspace=workspace)
+    return apply_white_balance(frame, params['red_gain'], params['green_gain'], params['blue_gain'],
+                               workspace=workspace)
+
+
+def apply_low_light_effects(frame1, frame2, streams, index, ranges=None, mode='lut', shot_noise_mode='auto',
+                            saturation_mode='luma', workspace=None, sampler=None, tile_rows=None,
+                            threads=None):
+    """
+    Apply the full low-light pipeline to an image pair with one random parameter set.
+    Parameters and noise come from the streams of pair `index`, so the same
+    (seed, index) always regenerates the same pair.
+    mode='lut' runs illumination, contrast and white balance as table lookups;
+    mode='staged' runs the reference ops and produces the same bytes when
+    shot_noise_mode is 'poisson'.
+    With a workspace, both paths keep their temporaries there (the lut path also
+    stacks the pair in it); the returned frames are fresh arrays either way.
+    sampler takes the parameters from a design over all pairs instead (see
+    draw_low_light_params). tile_rows streams the lut path in bands of rows,
+    threads runs its bands on a thread pool (see Pipeline.run).
+    """
+    params = draw_low_light_params(streams, index, ranges, sampler)
+    keys = [(index, 0), (index, 1)]
+
+    if mode == 'staged':
+        return (_apply_staged(frame1, params, streams, keys[0], saturation_mode, workspace),
+                _apply_staged(frame2, params, streams, keys[1], saturation_mode, workspace))
+
+    options = dict(params, shot_noise_mode=shot_noise_mode, rng=streams, saturation_mode=saturation_mode,
+                   workspace=workspace, tile_rows=tile_rows, threads=threads)
+    if frame1.shape == frame2.shape:
+        pair = np.stack([frame1, frame2], out=scratch(workspace, 'pair', (2,) + frame1.shape, frame1.dtype))
+        frames = apply_low_light_effects_batch(pair, keys=keys, **options)
+        return frames[0], frames[1]
+    return (apply_low_light_effects_batch(frame1[None], keys=keys[:1], **options)[0],
+            apply_low_light_effects_batch(frame2[None], keys=keys[1:], **options)[0])
@@ -0,0 +1,215 @@
+import os
+import shutil
+import stat
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Suffix of the files outputs are written to before being renamed into place.
+PARTIAL_SUFFIX = '.partial'
+
+# Bytes moved per copy_file_range/sendfile call.
+COPY_CHUNK = 64 * 2 ** 20
+
+# ioctl that makes a file share the blocks of another (Btrfs, XFS, bcachefs).
+FICLONE = 0x40049409
+
+# Seconds the modification times of a file and its copy may differ by: copy2
+# keeps the modification time, but FAT volumes only store it to 2 s.
+COPY_MTIME_TOLERANCE = 2
+
+
+def partial_path(path):
+    """
+    The temporary name path is written under: hidden, in the same directory
+    (so the final rename stays on one filesystem) and unique to the process.
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}{PARTIAL_SUFFIX}")
+
+
+def _discard(partial):
+    try:
+        os.remove(partial)
+    except FileNotFoundError:
+        pass
+
+
+def write_bytes_atomic(path, data):
+    """
+    Write data to path through a temporary file and a rename, so path never
+    holds a half-written file, even if the process dies mid-write.
+    """
+    partial = partial_path(path)
+    try:
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, path)
+    except BaseException:
+        _discard(partial)
+        raise
+
+
+def same_copy(entry, other):
+    """
+    Whether two files, as (size, mtime_ns), look like a file and its copy:
+    the same size, and modification times within COPY_MTIME_TOLERANCE.
+    """
+    return entry[0] == other[0] and abs(entry[1] - other[1]) < COPY_MTIME_TOLERANCE * 10 ** 9
+
+
+def copy_atomic(source, target):
+    """
+    shutil.copy2 through a temporary file and a rename.
+    """
+    partial = partial_path(target)
+    try:
+        shutil.copy2(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        _discard(partial)
+        raise
+
+
+def _reflink(source_fd, target_fd, size, chunk_size):
+    fcntl.ioctl(target_fd, FICLONE, source_fd)
+    return size
+
+
+def _copy_file_range(source_fd, target_fd, size, chunk_size):
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(source_fd, target_fd, min(chunk_size, size - offset), offset, offset)
+        if copied == 0:
+            break
+        offset += copied
+    return offset
+
+
+def _sendfile(source_fd, target_fd, size, chunk_size):
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(target_fd, source_fd, offset, min(chunk_size, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+
+def _read_write(source_fd, target_fd, size, chunk_size):
+    copied = 0
+    while True:
+        data = os.read(source_fd, min(chunk_size, 2 ** 24))
+        if not data:
+            return copied
+        copied += os.write(target_fd, data)
+
+
+# Ways to move the bytes of a file, cheapest first: a reflink shares the
+# blocks, the two kernel copies never bring the data into user space.
+_COPY_METHODS = [(name, method) for name, method, available in (
+    ('reflink', _reflink, sys.platform.startswith('linux')),
+    ('copy_file_range', _copy_file_range, hasattr(os, 'copy_file_range')),
+    ('sendfile', _sendfile, hasattr(os, 'sendfile')),
+    ('read_write', _read_write, True),
+) if available]
+
+
+def copy_fast(source, target, chunk_size=COPY_CHUNK):
+    """
+    shutil.copy2 through a temporary file and a rename, with the data moved
+    by the cheapest method the filesystems allow: a reflink, else
+    os.copy_file_range, else os.sendfile, in chunk_size pieces, else plain
+    reads and writes. A method that does not copy exactly the size of the
+    source hands over to the next one; OSError if plain reads do not either.
+    Returns the name of the method used.
+    """
+    partial = partial_path(target)
+    try:
+        with open(source, 'rb') as source_file, open(partial, 'wb') as target_file:
+            source_fd = source_file.fileno()
+            target_fd = target_file.fileno()
+            size = os.fstat(source_fd).st_size
+            for name, method in _COPY_METHODS:
+                try:
+                    copied = method(source_fd, target_fd, size, chunk_size)
+                    if copied != size:
+                        raise OSError(f"Copied {copied} of the {size} bytes of {source} with {name}")
+                    break
+                except OSError:
+                    # Not supported here (ENOSYS, EXDEV, EINVAL, EOPNOTSUPP,
+                    # ...), or stopped short: start over with the next method.
+                    if name == 'read_write':
+                        raise
+                    os.lseek(source_fd, 0, os.SEEK_SET)
+                    os.ftruncate(target_fd, 0)
+                    os.lseek(target_fd, 0, os.SEEK_SET)
+        shutil.copystat(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        _discard(partial)
+        raise
+    return name
+
+
+def link_atomic(source, target):
+    """
+    Hard-link target to source, replacing whatever target was.
+    """
+    partial = partial_path(target)
+    try:
+        os.link(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        _discard(partial)
+        raise
+
+
+def symlink_atomic(source, target):
+    """
+    Point a symbolic link at target to the absolute path of source, replacing whatever target was.
+    """
+    partial = partial_path(target)
+    try:
+        os.symlink(os.path.abspath(source), partial)
+        os.replace(partial, target)
+    except BaseException:
+        _discard(partial)
+        raise
+
+
+def link_file(source, target, hardlink=True):
+    """
+    Make target refer to source without copying its bytes: a hard link when
+    hardlink is set and the filesystem allows it, else a symbolic link, else
+    (on filesystems with neither, like exFAT) a copy. Returns 'hardlink',
+    'symlink' or 'copy'.
+    """
+    if hardlink:
+        try:
+            link_atomic(source, target)
+            return 'hardlink'
+        except OSError:
+            pass
+    try:
+        symlink_atomic(source, target)
+        return 'symlink'
+    except OSError:
+        copy_atomic(source, target)
+        return 'copy'
+
+
+def links_to(source, source_info, target):
+    """
+    Whether target is already a hard link or a symbolic link to source.
+    """
+    try:
+        existing = os.lstat(target)
+    except FileNotFoundError:
+        return False
+    if stat.S_ISLNK(existing.st_mode):
+        return os.readlink(target) == os.path.abspath(source)
+    return existing.st_ino == source_info.st_ino and existing.st_dev == source_info.st_dev
@@ -0,0 +1,143 @@
+import json
+import os
+
+from .files import write_bytes_atomic
+
+# Version of the cache format written by scan_tree.
+CACHE_VERSION = 1
+
+
+class TreeDiff:
+    """
+    How a tree differs from a reference: the relative paths it lacks, the ones
+    it holds in excess, and those present in both with another size or mtime.
+    """
+
+    def __init__(self, missing, extra, changed):
+        self.missing = missing
+        self.extra = extra
+        self.changed = changed
+
+    def __repr__(self):
+        return f"TreeDiff({len(self.missing)} missing, {len(self.extra)} extra, {len(self.changed)} changed)"
+
+    def __bool__(self):
+        return bool(self.missing or self.extra or self.changed)
+
+
+class TreeManifest:
+    """
+    The files of a directory tree: files maps every '/'-separated relative path
+    to its (size, mtime_ns). Build one with scan_tree; comparing two trees is
+    then a matter of set operations on their paths.
+    """
+
+    def __init__(self, root, files):
+        self.root = root
+        self.files = files
+
+    def __repr__(self):
+        return f"TreeManifest({self.root!r}, {len(self.files)} files)"
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, path):
+        return path in self.files
+
+    def paths(self):
+        return self.files.keys()
+
+    def bytes(self):
+        return sum(size for size, _ in self.files.values())
+
+    def subset(self, paths):
+        """
+        The manifest of the given paths only (those the tree holds).
+        """
+        return TreeManifest(self.root, {path: self.files[path] for path in paths if path in self.files})
+
+    def diff(self, other, same=None):
+        """
+        How other differs from this manifest. Files count as changed when their
+        (size, mtime_ns) differ, or when same(entry, other_entry) is false if
+        given (e.g. files.same_copy, for copies).
+        """
+        files, other_files = self.files, other.files
+        changed = {path for path in files.keys() & other_files.keys() if files[path] != other_files[path]}
+        if same is not None:
+            changed = {path for path in changed if not same(files[path], other_files[path])}
+        return TreeDiff(self.files.keys() - other.files.keys(), other.files.keys() - self.files.keys(), changed)
+
+
+def _read_cache(cache, root):
+    try:
+        with open(cache, 'r') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION or data.get('root') != os.path.abspath(root):
+        return {}
+    return data['directories']
+
+
+def _list_directory(path, skip):
+    subdirectories, files = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name in skip:
+                continue
+            try:
+                # Like os.walk: links to directories are neither entered nor files
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirectories.append(entry.name)
+                    continue
+                info = entry.stat()
+            except OSError:
+                # A dangling symbolic link
+                info = entry.stat(follow_symlinks=False)
+            files.append([entry.name, info.st_size, info.st_mtime_ns])
+    return subdirectories, files
+
+
+def scan_tree(root, cache=None, skip=()):
+    """
+    Index the tree at root in a single pass of os.scandir into a TreeManifest,
+    leaving out the entries named in skip at any depth.
+
+    With cache, the path of a JSON file, the listing of every directory is kept
+    there with the directory's mtime, and a directory whose mtime has not
+    changed since is taken from the cache without being listed or its files
+    stat'ed: a rescan then costs one stat per directory. Creating, deleting or
+    renaming a file (as every output of the engine is written) changes the
+    mtime of its directory; a file rewritten in place does not, so delete the
+    cache to notice those.
+    """
+    skip = frozenset(skip)
+    previous = _read_cache(cache, root) if cache is not None else {}
+    directories = {}
+    files = {}
+    relisted = False
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        path = os.path.join(root, relative) if relative else root
+        mtime = os.stat(path).st_mtime_ns
+        cached = previous.get(relative)
+        if cached is not None and cached[0] == mtime:
+            subdirectories, listing = cached[1], cached[2]
+        else:
+            subdirectories, listing = _list_directory(path, skip)
+            relisted = True
+        directories[relative] = [mtime, subdirectories, listing]
+        prefix = relative + '/' if relative else ''
+        for name, size, file_mtime in listing:
+            files[prefix + name] = (size, file_mtime)
+        stack.extend(prefix + name for name in reversed(subdirectories))
+
+    if cache is not None and (relisted or directories.keys() != previous.keys()):
+        os.makedirs(os.path.dirname(cache) or '.', exist_ok=True)
+        data = {'version': CACHE_VERSION, 'root': os.path.abspath(root), 'directories': directories}
+        write_bytes_atomic(cache, json.dumps(data, separators=(',', ':')).encode())
+    return TreeManifest(root, files)
@@ -0,0 +1,225 @@
+import functools
+
+import numpy as np
+import cv2
+
+MOTION_BLUR_METHODS = ('auto', 'separable', 'kernel', 'fft', 'taps', 'dense')
+
+# Slanted line kernels at least this long are convolved in the frequency domain.
+# From 13x13 up, filter2D switches to its own DFT path, which is slower than
+# reusing a cached kernel spectrum (see benchmarks/bench_motion_blur.py).
+FFT_MIN_KERNEL = 13
+
+# filter2D convolves kernels of this many taps and more through its DFT, whose
+# rounding depends on the size of the image.
+FILTER2D_DFT_AREA = 130
+
+# Angles are snapped to this many degrees before kernels are cached.
+ANGLE_STEP = 0.5
+
+
+def _quantize_angle(angle):
+    return round((angle % 180.0) / ANGLE_STEP) * ANGLE_STEP % 180.0
+
+
+def dense_line_kernel(kernel_size):
+    """
+    The original horizontal motion blur kernel: a k x k matrix whose middle row is 1/k.
+    """
+    kernel = np.zeros((kernel_size, kernel_size))
+    kernel[int((kernel_size - 1) / 2), :] = np.ones(kernel_size)
+    kernel /= kernel_size
+    return kernel
+
+
+@functools.lru_cache(maxsize=256)
+def line_kernel(kernel_size, angle):
+    """
+    Return the normalized k x k line kernel rotated by angle degrees (counter-clockwise).
+    0 is the original horizontal kernel and 90 its transpose; other angles rotate
+    it about the kernel center. Cached by (length, quantized angle).
+    """
+    angle = _quantize_angle(angle)
+    kernel = dense_line_kernel(kernel_size)
+    if angle == 90.0:
+        kernel = np.ascontiguousarray(kernel.T)
+    elif angle != 0.0:
+        center = ((kernel_size - 1) / 2.0, (kernel_size - 1) / 2.0)
+        rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+        kernel = cv2.warpAffine(kernel, rotation, (kernel_size, kernel_size), flags=cv2.INTER_LINEAR)
+        kernel /= kernel.sum()
+    kernel.flags.writeable = False
+    return kernel
+
+
+def blur_rows(image, kernel_size, out=None):
+    """
+    Average each pixel with its kernel_size horizontal neighbours (anchor k // 2).
+    Works on any stack of rows, e.g. frames of a batch stacked vertically. Odd sizes
+    use the O(1)-per-pixel box filter; even sizes use a one-row filter2D, whose
+    rounding the box filter does not reproduce at ties.
+    """
+    if kernel_size % 2:
+        return cv2.blur(image, (kernel_size, 1), dst=out, anchor=(kernel_size // 2, 0),
+                        borderType=cv2.BORDER_REFLECT_101)
+    kernel = np.full((1, kernel_size), 1.0 / kernel_size)
+    return cv2.filter2D(image, -1, kernel, dst=out, anchor=(kernel_size // 2, 0))
+
+
+def blur_rows_shifted(image, kernel_size, out):
+    """
+    blur_rows for even sizes, shifted one row down with a reflected first row.
+    The original kernel's line sits one row above its anchor for even sizes, so
+    this reproduces it exactly; the pass writes straight into the shifted view.
+    """
+    blur_rows(image[:-1], kernel_size, out=out[1:])
+    blur_rows(image[1:2], kernel_size, out=out[:1])
+    return out
+
+
+def _separable_motion_blur(image, kernel_size, vertical, out=None):
+    if vertical:
+        # Blurring columns is blurring the rows of the transposed image.
+        axes = (1, 0, 2)[:image.ndim]
+        blurred = _separable_motion_blur(np.ascontiguousarray(image.transpose(axes)), kernel_size, vertical=False)
+        if out is None:
+            return np.ascontiguousarray(blurred.transpose(axes))
+        out[...] = blurred.transpose(axes)
+        return out
+    if kernel_size % 2:
+        return blur_rows(image, kernel_size, out)
+    return blur_rows_shifted(image, kernel_size, np.empty_like(image) if out is None else out)
+
+
+@functools.lru_cache(maxsize=16)
+def _kernel_spectrum(kernel_size, angle, height, width):
+    """
+    CCS-packed DFT of the flipped line kernel, zero-padded to height x width.
+    """
+    kernel = line_kernel(kernel_size, angle)
+    flipped = np.zeros((height, width), dtype=np.float32)
+    flipped[:kernel_size, :kernel_size] = kernel[::-1, ::-1]
+    return cv2.dft(flipped)
+
+
+def _taps_motion_blur(image, kernel_size, angle, out=None):
+    """
+    filter2D with the line kernel (correlation, reflect-101 borders, rounded to
+    uint8) as a float32 sum of shifted copies, one per nonzero tap, in a fixed
+    order: every output pixel goes through the same operations wherever it
+    sits in the image.
+    """
+    kernel = line_kernel(kernel_size, angle).astype(np.float32)
+    anchor = kernel_size // 2
+    height, width = image.shape[:2]
+    padded = cv2.copyMakeBorder(image, anchor, kernel_size - 1 - anchor, anchor, kernel_size - 1 - anchor,
+                                cv2.BORDER_REFLECT_101).astype(np.float32)
+    total = np.zeros(image.shape, dtype=np.float32)
+    term = np.empty_like(total)
+    for y, x in zip(*np.nonzero(kernel)):
+        np.multiply(padded[y:y + height, x:x + width], kernel[y, x], out=term)
+        total += term
+    np.rint(total, out=total)
+    np.clip(total, 0, 255, out=total)
+    if out is None:
+        return total.astype(np.uint8)
+    np.copyto(out, total, casting='unsafe')
+    return out
+
+
+def local_method(kernel_size, angle):
+    """
+    The method of apply_motion_blur whose output at a pixel depends only on
+    the pixels its kernel reaches, so a band of rows blurred together with
+    kernel_size rows around it comes out as in the whole frame: the cached
+    kernel while filter2D convolves it directly, the sum of taps once
+    filter2D would switch to its DFT.
+    """
+    if _quantize_angle(angle) in (0.0, 90.0):
+        return 'separable'
+    return 'kernel' if kernel_size * kernel_size < FILTER2D_DFT_AREA else 'taps'
+
+
+def _fft_motion_blur(image, kernel_size, angle, out=None):
+    """
+    filter2D with the line kernel (correlation, reflect-101 borders, rounded to
+    uint8) computed through the DFT. The padded frame is grown to a fast DFT
+    size; the extra zeros only reach outputs that are cropped away.
+    """
+    anchor = kernel_size // 2
+    height, width = image.shape[:2]
+    padded_height = cv2.getOptimalDFTSize(height + kernel_size - 1)
+    padded_width = cv2.getOptimalDFTSize(width + kernel_size - 1)
+    padded = cv2.copyMakeBorder(image, anchor, kernel_size - 1 - anchor, anchor, kernel_size - 1 - anchor,
+                                cv2.BORDER_REFLECT_101)
+    kernel_spectrum = _kernel_spectrum(kernel_size, angle, padded_height, padded_width)
+
+    channels = cv2.split(padded) if padded.ndim == 3 else [padded]
+    plane = np.zeros((padded_height, padded_width), dtype=np.float32)
+    filtered = []
+    for channel in channels:
+        plane[:channel.shape[0], :channel.shape[1]] = channel
+        spectrum = cv2.mulSpectrums(cv2.dft(plane), kernel_spectrum, 0)
+        result = cv2.idft(spectrum, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        filtered.append(result[kernel_size - 1:kernel_size - 1 + height, kernel_size - 1:kernel_size - 1 + width])
+    filtered = filtered[0] if image.ndim == 2 else cv2.merge(filtered)
+    np.rint(filtered, out=filtered)
+    np.clip(filtered, 0, 255, out=filtered)
+    if out is None:
+        return filtered.astype(np.uint8)
+    np.copyto(out, filtered, casting='unsafe')
+    return out
+
+
+def apply_motion_blur(image, kernel_size, angle=0.0, method='auto', out=None):
+    """
+    Apply motion blur along a line of kernel_size pixels at angle degrees.
+    Increasing the kernel_size will increase the amount of motion blur applied to the image.
+
+    method='auto' takes the separable path for horizontal and vertical blur
+    (horizontal blur is bit-identical to 'dense' for every size), FFT
+    convolution for long slanted kernels and a cached rotated kernel otherwise.
+    'taps' sums the shifted image over the nonzero taps of the kernel (see
+    local_method). 'dense' rebuilds the original k x k kernel and applies its
+    nonzero rows, which keeps the horizontal kernel on filter2D's direct path
+    at every size, and is kept as the reference.
+    The result is written into out when given.
+    """
+    if method not in MOTION_BLUR_METHODS:
+        raise ValueError(f"Unknown motion blur method '{method}', expected one of {MOTION_BLUR_METHODS}")
+    kernel_size = int(kernel_size)
+    if kernel_size <= 1:
+        if out is None:
+            return image
+        out[...] = image
+        return out
+    if method == 'dense':
+        kernel = dense_line_kernel(kernel_size)
+        if angle:
+            kernel = line_kernel(kernel_size, angle)
+        # Leave out the all-zero rows away from the anchor, which add nothing, so
+        # filter2D convolves directly instead of through its DFT from
+        # FILTER2D_DFT_AREA taps up.
+        anchor = kernel_size // 2
+        rows = np.flatnonzero(kernel.any(axis=1))
+        top, bottom = min(rows[0], anchor), max(rows[-1], anchor)
+        return cv2.filter2D(image, -1, kernel[top:bottom + 1], dst=out, anchor=(anchor, anchor - top))
+
+    angle = _quantize_angle(angle)
+    axis_aligned = angle in (0.0, 90.0)
+    if method == 'auto':
+        if axis_aligned:
+            method = 'separable'
+        elif kernel_size >= FFT_MIN_KERNEL:
+            method = 'fft'
+        else:
+            method = 'kernel'
+    if method == 'separable':
+        if not axis_aligned:
+            raise ValueError(f"The separable path needs a horizontal or vertical blur, got angle {angle}")
+        return _separable_motion_blur(image, kernel_size, vertical=angle == 90.0, out=out)
+    if method == 'fft':
+        return _fft_motion_blur(image, kernel_size, angle, out)
+    if method == 'taps':
+        return _taps_motion_blur(image, kernel_size, angle, out)
+    return cv2.filter2D(image, -1, line_kernel(kernel_size, angle), dst=out)
@@ -0,0 +1,97 @@
+import numpy as np
+
+# Stable ids of the random streams each stage draws from. Only ever append to
+# this table: renumbering a stage changes the noise of every dataset generated
+# with an existing seed.
+STAGES = {
+    'params': 0,
+    'shot_noise': 1,
+    'gaussian_noise': 2,
+    'haze': 3,
+    'design': 4,
+}
+
+
+def fresh_seed():
+    """
+    Draw a new 128-bit global seed from OS entropy.
+    """
+    return int(np.random.SeedSequence().entropy)
+
+
+def epoch_seed(seed, epoch):
+    """
+    The global seed of a training epoch: seed itself for epoch 0, so the first
+    epoch reproduces a conversion run with seed, and a 128-bit seed derived
+    from (seed, epoch) for the others.
+    """
+    if epoch == 0:
+        return seed
+    words = np.random.SeedSequence((seed, epoch)).generate_state(4, np.uint32)
+    return sum(int(word) << (32 * position) for position, word in enumerate(words))
+
+
+def _key_tuple(key):
+    if isinstance(key, tuple):
+        return tuple(int(part) for part in key)
+    return (int(key),)
+
+
+class RandomStreams:
+    """
+    Counter-based random streams keyed by (global seed, sample key, stage).
+
+    Every (key, stage) gets its own Philox stream derived from the global seed,
+    so the noise of a sample depends only on the seed and its key: not on the
+    order samples are processed in, on which worker handles them, or on how
+    many workers there are. A key is an int (e.g. a pair index) or a tuple of
+    ints (e.g. (pair index, frame)).
+    """
+
+    def __init__(self, seed=None):
+        self.seed = fresh_seed() if seed is None else int(seed)
+
+    def __repr__(self):
+        return f"RandomStreams(seed={self.seed})"
+
+    def generator(self, key, stage):
+        """
+        Return a fresh Generator positioned at the start of the (key, stage) stream.
+        """
+        sequence = np.random.SeedSequence(self.seed, spawn_key=(STAGES[stage],) + _key_tuple(key))
+        return np.random.Generator(np.random.Philox(sequence))
+
+
+def band_key(key, band):
+    """
+    The key of the substream of one band of rows of the sample key: the
+    threaded pipeline draws the noise of every band from its own streams.
+    """
+    return _key_tuple(key) + (int(band),)
+
+
+def as_streams(rng):
+    """
+    rng as RandomStreams: itself, or streams seeded with one 128-bit draw from
+    a Generator, a RandomState or (None) the global numpy state, so a seeded
+    generator still gives the same streams.
+    """
+    if isinstance(rng, RandomStreams):
+        return rng
+    source = np.random if rng is None else rng
+    if isinstance(source, np.random.Generator):
+        words = source.integers(0, 2 ** 32, 4, dtype=np.uint64)
+    else:
+        words = source.randint(0, 2 ** 32, 4, dtype=np.uint64)
+    return RandomStreams(sum(int(word) << (32 * position) for position, word in enumerate(words)))
+
+
+def stage_generators(rng, keys, stage):
+    """
+    Resolve the rng argument of the batch ops for one stage.
+    A RandomStreams gives one Generator per sample key; anything else (None for
+    the global numpy state, a Generator or a RandomState) is shared by the batch.
+    """
+    if isinstance(rng, RandomStreams):
+        return [rng.generator(key, stage) for key in keys]
+    return np.random if rng is None else rng
@@ -0,0 +1,161 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from .cli import pool_settings
+from .convert import degrade_item, plan_options, read_image
+from .datasets import plan_conversion
+from .effects import DEFAULT_RANGES
+from .noise_rng import RandomStreams, epoch_seed
+from .shards import decode_field, field_name
+
+
+def dataset_options(spec, effect='darken', **options):
+    """
+    The options of degrade_image for a dataset without going through the
+    command line: the dataset's own darkening, no haze and the default
+    low-light ranges, with any of them replaced by keyword arguments.
+    """
+    return dict({
+        'effect': effect,
+        'method': spec.method,
+        'darkness': spec.darkness,
+        'haze': 0.0,
+        'ranges': dict(DEFAULT_RANGES),
+        'shot_noise_mode': 'auto',
+        'saturation_mode': 'luma',
+    }, **options)
+
+
+def worker_shard():
+    """
+    The (index, count) of the data-loading worker this runs in. Workers of a
+    PyTorch DataLoader are recognized when torch has been imported; anything
+    else is a single worker.
+    """
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        info = torch.utils.data.get_worker_info()
+        if info is not None:
+            return info.id, info.num_workers
+    return 0, 1
+
+
+def init_worker(worker_id=None, workers=None):
+    """
+    A worker_init_fn for data loaders: limits OpenCV to the worker's share of
+    the cores, as the conversion pools do, instead of one thread per core in
+    every worker. The noise needs no per-worker seeding, since every image
+    draws from its own keyed streams.
+    """
+    if workers is None:
+        workers = worker_shard()[1]
+    cv2.setNumThreads(pool_settings(workers, workers)[2])
+
+
+class DegradedDataset:
+    """
+    A map-style dataset degrading a clean dataset as it is read, instead of
+    reading a converted copy. The files of the dataset at root are gathered
+    into samples by spec.sample_key, as when packing; a sample is a dict of
+    its fields (field_name of each relative path) plus '__key__', the images
+    degraded with options (see dataset_options) and everything else (flow,
+    occlusions, disparity) passed through untouched, as bytes or, with
+    decode, as decode_field gives it. '__images__' lists the fields of the
+    degraded images, in frame order.
+
+    Every image draws from the streams of (seed, group, frame), so a sample
+    does not depend on the order it is read in or on the worker reading it,
+    and epoch 0 reproduces convert_dataset with the same seed. set_epoch()
+    moves to the streams of another epoch for fresh degradations. A seed of
+    None draws one when the dataset is built, before any worker starts.
+    """
+
+    def __init__(self, spec, root, options=None, seed=None, decode=False, paths=None):
+        self.spec = spec
+        self.root = root
+        plan = plan_conversion(spec, root, paths)
+        self.options = plan_options(dataset_options(spec) if options is None else options, plan)
+        self.base_seed = RandomStreams(seed).seed
+        self.decode = decode
+        self.epoch = 0
+        images = {task.path: task for task in plan.images}
+        samples = {}
+        for path in sorted(list(images) + plan.companions):
+            samples.setdefault(spec.sample_key(path), []).append((path, images.get(path)))
+        self.samples = sorted(samples.items())
+
+    def __repr__(self):
+        return f"DegradedDataset({self.spec.name!r}, {self.root!r}, {len(self)} samples, epoch={self.epoch})"
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def seed(self):
+        """
+        The seed the images of the current epoch are degraded with.
+        """
+        return epoch_seed(self.base_seed, self.epoch)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def keys(self):
+        return [key for key, _ in self.samples]
+
+    def __getitem__(self, index):
+        key, files = self.samples[index]
+        seed = self.seed
+        sample = {'__key__': key, '__images__': []}
+        for path, task in files:
+            if task is None:
+                with open(os.path.join(self.root, path), 'rb') as f:
+                    data = f.read()
+                sample[field_name(path)] = decode_field(path, data) if self.decode else data
+            else:
+                item, _ = read_image((path, self.root, None, task.group, task.frame, seed, self.options))
+                sample[field_name(path)] = degrade_item(item)
+                sample['__images__'].append(field_name(path))
+        return sample
+
+
+class DegradedIterable:
+    """
+    An iterable over the samples of a DegradedDataset, split between the
+    workers of a data loader (see worker_shard) and, for distributed
+    training, between world_size ranks. With shuffle, the order is a
+    permutation drawn from the dataset's seed and epoch, the same in every
+    worker, so the workers share out the epoch without overlap.
+    """
+
+    def __init__(self, dataset, shuffle=False, rank=0, world_size=1):
+        self.dataset = dataset
+        self.shuffle = shuffle
+        self.rank = rank
+        self.world_size = world_size
+
+    def __repr__(self):
+        return f"DegradedIterable({self.dataset!r}, shuffle={self.shuffle}, rank={self.rank}/{self.world_size})"
+
+    def __len__(self):
+        return len(self.order())
+
+    def set_epoch(self, epoch):
+        self.dataset.set_epoch(epoch)
+
+    def order(self):
+        """
+        The indices of the samples this worker yields, in order.
+        """
+        order = np.arange(len(self.dataset))
+        if self.shuffle:
+            np.random.default_rng([self.dataset.base_seed, self.dataset.epoch]).shuffle(order)
+        worker, workers = worker_shard()
+        return order[self.rank * workers + worker::self.world_size * workers]
+
+    def __iter__(self):
+        for index in self.order():
+            yield self.dataset[index]
@@ -0,0 +1,56 @@
+import json
+import os
+
+from .datasets import STATE_DIR
+from .files import write_bytes_atomic
+
+MANIFEST_NAME = 'overlay.json'
+
+
+def manifest_path(root):
+    return os.path.join(root, STATE_DIR, MANIFEST_NAME)
+
+
+def write_overlay_manifest(root, source, paths, dataset=None):
+    """
+    Record that the files at paths of the converted dataset at root are to be
+    read from the source dataset instead, where they still are.
+    """
+    os.makedirs(os.path.join(root, STATE_DIR), exist_ok=True)
+    manifest = {'dataset': dataset, 'source': os.path.abspath(source), 'files': sorted(paths)}
+    write_bytes_atomic(manifest_path(root), json.dumps(manifest).encode())
+
+
+class Overlay:
+    """
+    A converted dataset whose pass-through files (typically the ground truth)
+    were not materialized but listed in an overlay manifest pointing at the
+    source dataset. path() resolves a relative path to the file to read: the
+    converted file when there is one, else the source file the manifest
+    points at. Without a manifest every path resolves into root, so loaders
+    can use an Overlay for any converted dataset.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.source = None
+        self.files = frozenset()
+        if os.path.exists(manifest_path(root)):
+            with open(manifest_path(root), 'r') as f:
+                manifest = json.load(f)
+            self.source = manifest['source']
+            self.files = frozenset(manifest['files'])
+
+    def __repr__(self):
+        return f"Overlay({self.root!r}, source={self.source!r}, {len(self.files)} files)"
+
+    def __contains__(self, path):
+        return path in self.files or os.path.exists(os.path.join(self.root, path))
+
+    def path(self, path):
+        if path in self.files:
+            return os.path.join(self.source, path)
+        return os.path.join(self.root, path)
+
+    def open(self, path, mode='rb'):
+        return open(self.path(path), mode)
@@ -0,0 +1,517 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .batch import (_check_batch, _per_sample, add_gaussian_noise_batch, add_shot_noise_batch, adjust_color_batch,
+                    adjust_contrast_saturation_batch, apply_lut_batch, apply_motion_blur_batch)
+from .motion_blur import apply_motion_blur, local_method
+from .noise_rng import as_streams, band_key, stage_generators
+from .pointwise_lut import compose_luts, is_identity_lut, stage_lut
+from .saturation import SATURATION_MODES
+from .shot_noise import SHOT_NOISE_MODES
+from .workspace import scratch, worker_workspace
+
+# Parameters a stage may read without the caller passing them.
+OPTIONAL_PARAMS = {'blur_angle': 0.0}
+
+# Rows of a frame streamed through the pipeline at a time in tiled mode (see
+# Pipeline.run): at 4K width the float temporaries of a band stay around a
+# few MB instead of several full-frame copies.
+TILE_ROWS = 64
+
+# Rows of the bands a frame is split into in threaded mode (see Pipeline.run).
+# Every band draws its noise from its own substreams, so this, and not the
+# number of threads, decides the noise a seed gives (it is part of the
+# parameter digest of threaded conversions).
+BAND_ROWS = 64
+
+
+class PlanStep:
+    """
+    One operation of a planned pipeline: either per-sample lookup tables, which
+    the planner can merge with neighbouring tables, or a
+    function(source, target, workspace) that writes the stage output into target.
+    halo is the number of rows above and below an output row its value may
+    depend on; 0 for operations that work row by row.
+    """
+
+    def __init__(self, name, tables=None, function=None, halo=0):
+        self.name = name
+        self.tables = tables
+        self.function = function
+        self.halo = halo
+
+    def __repr__(self):
+        return f"PlanStep({self.name!r}{', lut' if self.tables is not None else ''})"
+
+    @property
+    def pointwise(self):
+        return self.tables is not None
+
+    def run(self, source, target, workspace=None):
+        if self.tables is not None:
+            return apply_lut_batch(source, self.tables, out=target)
+        return self.function(source, target, workspace)
+
+
+class Stage:
+    """
+    A named, switchable step of a Pipeline.
+    Subclasses list the parameters they read and lower one batch of per-sample
+    parameters into plan steps, returning no steps when the stage would leave
+    every sample unchanged.
+    """
+    name = None
+    params = ()
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+
+    def __repr__(self):
+        return f"{type(self).__name__}(enabled={self.enabled})"
+
+    def steps(self, params, rng, keys):
+        raise NotImplementedError
+
+
+class _LutStage(Stage):
+
+    def tables(self, params):
+        columns = [params[name].tolist() for name in self.params]
+        return [stage_lut(self.name, *values) for values in zip(*columns)]
+
+    def steps(self, params, rng, keys):
+        tables = self.tables(params)
+        if all(is_identity_lut(table) for table in tables):
+            return []
+        return [PlanStep(self.name, tables=tables)]
+
+
+class ShotNoise(Stage):
+    name = 'shot_noise'
+    params = ('noise_level',)
+
+    def __init__(self, mode='auto', enabled=True):
+        if mode not in SHOT_NOISE_MODES:
+            raise ValueError(f"Unknown shot noise mode '{mode}', expected one of {SHOT_NOISE_MODES}")
+        super().__init__(enabled)
+        self.mode = mode
+
+    def steps(self, params, rng, keys):
+        noise_level = params['noise_level']
+        if not (noise_level > 0).any():
+            return []
+        generators = stage_generators(rng, keys, self.name)
+        return [PlanStep(self.name, function=lambda source, target, workspace: add_shot_noise_batch(
+            source, noise_level, self.mode, generators, out=target, workspace=workspace))]
+
+
+class GaussianNoise(Stage):
+    name = 'gaussian_noise'
+    params = ('gaussian_std',)
+
+    def steps(self, params, rng, keys):
+        std = params['gaussian_std']
+        if not std.any():
+            return []
+        generators = stage_generators(rng, keys, self.name)
+        return [PlanStep(self.name, function=lambda source, target, workspace: add_gaussian_noise_batch(
+            source, 0, std, generators, out=target, workspace=workspace))]
+
+
+class Illumination(_LutStage):
+    name = 'illumination'
+    params = ('illumination_factor',)
+
+
+class MotionBlur(Stage):
+    name = 'motion_blur'
+    params = ('blur_kernel_size', 'blur_angle')
+
+    def steps(self, params, rng, keys):
+        kernel_size = params['blur_kernel_size']
+        angle = params['blur_angle']
+        if not (kernel_size > 1).any():
+            return []
+        # A line kernel reaches at most its length in any direction
+        halo = int(kernel_size.max())
+        if not angle.any():
+            return [PlanStep(self.name, function=lambda source, target, workspace: apply_motion_blur_batch(
+                source, kernel_size, out=target), halo=halo)]
+
+        # Slanted blurs use a method that is exact on a band and its halo, so tiled
+        # and threaded runs blur as whole frames do
+        def blur(source, target, workspace):
+            for image, size, sample_angle, output in zip(source, kernel_size.tolist(), angle.tolist(), target):
+                apply_motion_blur(image, size, sample_angle, method=local_method(size, sample_angle), out=output)
+            return target
+        return [PlanStep(self.name, function=blur, halo=halo)]
+
+
+class ContrastColor(Stage):
+    """
+    Contrast and saturation. In 'luma' mode both run as one fused matrix pass; in
+    'hsv' mode contrast is a lookup table (and merges with its pointwise
+    neighbours) followed by the HSV round trip, which is never skipped because it
+    quantizes hue even at color_factor 1.
+    """
+    name = 'contrast_color'
+    params = ('contrast_factor', 'color_factor')
+
+    def __init__(self, mode='luma', enabled=True):
+        if mode not in SATURATION_MODES:
+            raise ValueError(f"Unknown saturation mode '{mode}', expected one of {SATURATION_MODES}")
+        super().__init__(enabled)
+        self.mode = mode
+
+    def steps(self, params, rng, keys):
+        contrast_factor = params['contrast_factor']
+        color_factor = params['color_factor']
+        if self.mode == 'hsv':
+            tables = [stage_lut('contrast', contrast) for contrast in contrast_factor.tolist()]
+            steps = [] if all(is_identity_lut(table) for table in tables) else [PlanStep('contrast', tables=tables)]
+            return steps + [PlanStep('color', function=lambda source, target, workspace: adjust_color_batch(
+                source, color_factor, out=target, workspace=workspace))]
+        if (contrast_factor == 1).all() and (color_factor == 1).all():
+            return []
+        return [PlanStep(self.name, function=lambda source, target, workspace: adjust_contrast_saturation_batch(
+            source, contrast_factor, color_factor, self.mode, out=target, workspace=workspace))]
+
+
+class WhiteBalance(_LutStage):
+    name = 'white_balance'
+    params = ('red_gain', 'green_gain', 'blue_gain')
+
+
+class Pipeline:
+    """
+    An ordered list of named stages applied to (N, H, W, C) uint8 batches.
+
+    Stages can be looked up by name, enabled, disabled and reordered. Each run is
+    first planned: stages that are an identity for the whole batch are dropped,
+    adjacent lookup-table stages are composed into one table per sample, and the
+    remaining steps ping-pong between two work buffers instead of allocating an
+    array per stage. The work buffers, and the float temporaries of the stages,
+    come from a workspace when one is passed, so a worker that keeps its
+    workspace reuses them from frame to frame.
+    """
+
+    def __init__(self, stages=None, shot_noise_mode='auto', saturation_mode='luma'):
+        if stages is None:
+            stages = [ShotNoise(shot_noise_mode), GaussianNoise(), Illumination(), MotionBlur(),
+                      ContrastColor(saturation_mode), WhiteBalance()]
+        self.stages = list(stages)
+        names = self.names
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stage names must be unique, got {names}")
+
+    def __repr__(self):
+        return f"Pipeline({self.stages})"
+
+    @property
+    def names(self):
+        return [stage.name for stage in self.stages]
+
+    def __getitem__(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f"No stage named '{name}', expected one of {self.names}")
+
+    def enable(self, *names):
+        for name in names:
+            self[name].enabled = True
+        return self
+
+    def disable(self, *names):
+        for name in names:
+            self[name].enabled = False
+        return self
+
+    def reorder(self, names):
+        """
+        Put the stages in the order of names, which must name every stage once.
+        """
+        if sorted(names) != sorted(self.names):
+            raise ValueError(f"Expected an ordering of {self.names}, got {list(names)}")
+        self.stages = [self[name] for name in names]
+        return self
+
+    def _resolve(self, params, num):
+        resolved = {}
+        for stage in self.stages:
+            if not stage.enabled:
+                continue
+            for name in stage.params:
+                if name in params:
+                    resolved[name] = _per_sample(params[name], num, name)
+                elif name in OPTIONAL_PARAMS:
+                    resolved[name] = np.full(num, OPTIONAL_PARAMS[name])
+                else:
+                    raise ValueError(f"Stage '{stage.name}' needs the parameter '{name}'")
+        return resolved
+
+    def plan(self, params, num, rng=None, keys=None):
+        """
+        Lower the enabled stages into PlanSteps for a batch of num samples.
+        """
+        params = self._resolve(params, num)
+        if keys is None:
+            keys = range(num)
+        elif len(keys) != num:
+            raise ValueError(f"keys must have length {num}, got {len(keys)}")
+        steps = []
+        for stage in self.stages:
+            if not stage.enabled:
+                continue
+            for step in stage.steps(params, rng, keys):
+                if step.pointwise and steps and steps[-1].pointwise:
+                    previous = steps.pop()
+                    step = PlanStep(f"{previous.name}+{step.name}", tables=[
+                        compose_luts(first, second) for first, second in zip(previous.tables, step.tables)])
+                steps.append(step)
+        return steps
+
+    def run(self, images, params, rng=None, keys=None, out=None, workspace=None, tile_rows=None, threads=None):
+        """
+        Apply the pipeline to a stacked (N, H, W, C) uint8 batch.
+        params maps parameter names to a scalar shared by the batch or a length-N
+        array; rng and keys are as in apply_low_light_effects_batch. The result
+        is written into out (which must not overlap images) or a new batch.
+
+        With tile_rows, each sample instead streams through the steps in bands
+        of about tile_rows rows (see run_bands), so the temporaries are sized
+        by the band rather than the frame, and out may be images itself. The
+        result is the same, bit for bit, when the noise comes from streams:
+        a generator shared by both noise stages would serve their draws band
+        by band, interleaved, instead of one stage after the other.
+
+        With threads, each sample is split into bands of BAND_ROWS rows that a
+        pool of that many threads works on at once (see run_threaded), for
+        the latency of a single large image. The noise of every band comes
+        from its own substreams, keyed by band_key(key, band) (an rng that is
+        not a RandomStreams seeds one, see as_streams), so the output depends
+        on the seed and BAND_ROWS but not on the number of threads; it is a
+        different draw than the whole-frame run. out may be images itself.
+        """
+        _check_batch(images)
+        if tile_rows and threads:
+            raise ValueError('Runs are either tiled or threaded, not both')
+        if tile_rows:
+            return self._run_tiled(images, params, rng, keys, out, workspace, tile_rows)
+        if threads:
+            return self._run_threaded(images, params, rng, keys, out, workspace, threads)
+        steps = self.plan(params, len(images), rng, keys)
+        if out is None:
+            out = np.empty_like(images)
+        source = images
+        for number, step in enumerate(steps):
+            if number == len(steps) - 1:
+                target = out
+            else:
+                target = scratch(workspace, f'pipeline_{number % 2}', images.shape, images.dtype)
+            step.run(source, target, workspace)
+            source = target
+        if not steps:
+            out[...] = images
+        return out
+
+    def _run_tiled(self, images, params, rng, keys, out, workspace, tile_rows):
+        num = len(images)
+        params = self._resolve(params, num)
+        keys = range(num) if keys is None else keys
+        if out is None:
+            out = np.empty_like(images)
+        for sample in range(num):
+            # Planned one sample at a time, so its generators carry on from band to band
+            steps = self.plan({name: values[sample:sample + 1] for name, values in params.items()}, 1, rng,
+                              [keys[sample]])
+            run_bands(steps, images[sample:sample + 1], out[sample:sample + 1], tile_rows, workspace)
+        return out
+
+    def _run_threaded(self, images, params, rng, keys, out, workspace, threads):
+        num, height = images.shape[:2]
+        params = self._resolve(params, num)
+        keys = range(num) if keys is None else keys
+        streams = as_streams(rng)
+        if out is None:
+            out = np.empty_like(images)
+        bands = [(start, min(start + BAND_ROWS, height)) for start in range(0, height, BAND_ROWS)]
+        for sample in range(num):
+            values = {name: values[sample:sample + 1] for name, values in params.items()}
+            # One plan per band, each holding the generators of its own substreams
+            plans = [self.plan(values, 1, streams, [band_key(keys[sample], band)]) for band in range(len(bands))]
+            run_threaded(plans, images[sample:sample + 1], out[sample:sample + 1], bands, threads, workspace)
+        return out
+
+
+def apply_low_light_effects_batch(images, noise_level, gaussian_std, illumination_factor, blur_kernel_size,
+                                  contrast_factor, color_factor, red_gain, green_gain, blue_gain,
+                                  shot_noise_mode='auto', rng=None, keys=None, saturation_mode='luma', out=None,
+                                  workspace=None, tile_rows=None, threads=None):
+    """
+    Apply the low-light pipeline to a stacked (N, H, W, C) uint8 batch.
+    Every parameter is either a scalar shared by the batch or a length-N array with
+    one value per sample.
+
+    rng is None (global numpy state), a Generator shared by the batch, or a
+    noise_rng.RandomStreams; with streams, sample i draws from the streams of
+    keys[i] (default: its position in the batch), so any sample can be
+    regenerated on its own from the seed and its key.
+
+    saturation_mode='luma' fuses contrast and saturation into one matrix pass;
+    'hsv' reproduces the original HSV round trip (see saturation.py).
+    out, workspace, tile_rows and threads are as in Pipeline.run.
+    """
+    params = {
+        'noise_level': noise_level,
+        'gaussian_std': gaussian_std,
+        'illumination_factor': illumination_factor,
+        'blur_kernel_size': blur_kernel_size,
+        'contrast_factor': contrast_factor,
+        'color_factor': color_factor,
+        'red_gain': red_gain,
+        'green_gain': green_gain,
+        'blue_gain': blue_gain,
+    }
+    pipeline = Pipeline(shot_noise_mode=shot_noise_mode, saturation_mode=saturation_mode)
+    return pipeline.run(images, params, rng, keys, out, workspace, tile_rows, threads)
+
+
+def run_bands(steps, image, out, tile_rows=TILE_ROWS, workspace=None):
+    """
+    Run planned steps over a (1, H, W, C) sample in bands of rows, top to
+    bottom, holding only band-sized buffers. Row-wise steps process each row
+    exactly once and in order, so a noise step draws the same values from its
+    generators as on the whole frame; a step with a halo keeps the rows it
+    has received in a line buffer and emits the rows whose halo it holds,
+    running on a window that reaches halo rows past them (clipped at the
+    frame edges, where the window border is the frame border). Bands are kept
+    to an even number of rows, since integer draws (the table shot noise
+    sampler) come in pairs. out may be image itself: no row is written before
+    it has been read.
+    """
+    height, dtype = image.shape[1], image.dtype
+    shape = image.shape[2:]
+    tile_rows += tile_rows % 2
+    if not steps:
+        out[...] = image
+        return out
+    # Most rows each step receives at once: a step with a halo emits what it
+    # still holds with the last band, and may hold back one row to stay even
+    capacity = [tile_rows]
+    for step in steps[:-1]:
+        capacity.append(capacity[-1] + step.halo + 1)
+    rows = [count + 2 * step.halo + 2 for count, step in zip(capacity, steps)]
+    # Whether the last step writes its rows straight into out: not when it
+    # would read and write the same rows of an aliased image
+    direct = not (len(steps) == 1 and np.shares_memory(image, out))
+    state = [{'first': 0, 'held': 0, 'emitted': 0} for _ in steps]
+    buffers = {}
+
+    def buffer(name, number):
+        # Taken once per run: without a workspace, scratch hands out a new array every call
+        key = f'{name}_{number}'
+        if key not in buffers:
+            buffers[key] = scratch(workspace, key, (1, rows[number]) + shape, dtype)
+        return buffers[key]
+
+    def push(number, source, start):
+        # source holds the input rows of step number from row start on
+        step = steps[number]
+        last = number == len(steps) - 1
+        if not step.halo:
+            count = source.shape[1]
+            target = out[:, start:start + count] if last and direct else buffer('tile', number)[:, :count]
+            step.run(source, target, workspace)
+        else:
+            current = state[number]
+            lines = buffer('tile_lines', number)
+            lines[:, current['held']:current['held'] + source.shape[1]] = source
+            current['held'] += source.shape[1]
+            first, emitted = current['first'], current['emitted']
+            end = first + current['held']
+            stop = height if end == height else emitted + max(end - step.halo - emitted, 0) // 2 * 2
+            if stop <= emitted:
+                return
+            window_start, window_end = max(emitted - step.halo, 0), min(stop + step.halo, end)
+            window = lines[:, window_start - first:window_end - first]
+            result = buffer('tile_window', number)[:, :window.shape[1]]
+            step.run(window, result, workspace)
+            count, start = stop - emitted, emitted
+            target = out[:, start:start + count] if last else buffer('tile', number)[:, :count]
+            target[...] = result[:, emitted - window_start:stop - window_start]
+            # Keep the rows the halo of the next rows reaches back to
+            keep = max(stop - step.halo, first)
+            lines[:, :end - keep] = lines[:, keep - first:end - first]
+            current.update(first=keep, held=end - keep, emitted=stop)
+        if not last:
+            push(number + 1, target, start)
+        elif not direct:
+            out[:, start:start + count] = target
+
+    for start in range(0, height, tile_rows):
+        push(0, image[:, start:start + tile_rows], start)
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _band_pool(threads):
+    # Kept for the life of the process, so interactive runs do not start threads per frame
+    return ThreadPoolExecutor(threads, thread_name_prefix='band')
+
+
+def _run_band(steps, halo, source, target, start, stop, workspace):
+    # One band of rows of a phase of run_threaded, in the workspace of the thread running it
+    workspace = None if workspace is None else worker_workspace()
+    if not halo:
+        return run_bands(steps, source[:, start:stop], target[:, start:stop], stop - start, workspace)
+    window_start, window_end = max(start - halo, 0), min(stop + halo, source.shape[1])
+    window = source[:, window_start:window_end]
+    result = scratch(workspace, 'band_window', window.shape, window.dtype)
+    steps[0].run(window, result, workspace)
+    target[:, start:stop] = result[:, start - window_start:stop - window_start]
+    return target
+
+
+def run_threaded(plans, image, out, bands, threads, workspace=None):
+    """
+    Run a (1, H, W, C) sample through the steps of plans, one plan per
+    (start, stop) band of rows, on a pool of threads; numpy and OpenCV drop
+    the GIL while they work on a band. The steps go in phases: a run of
+    row-wise steps takes every band through on its own, a step with a halo
+    waits for the whole frame before it and reads its halo rows from the
+    neighbouring bands, as run_bands does. Full-frame intermediates come
+    from workspace, band temporaries from each thread's own workspace.
+    out may be image itself.
+    """
+    steps = plans[0]
+    if not steps:
+        out[...] = image
+        return out
+    phases = []
+    for number, step in enumerate(steps):
+        if step.halo or not phases or steps[phases[-1][0]].halo:
+            phases.append([number])
+        else:
+            phases[-1].append(number)
+    pool = _band_pool(threads)
+    source = image
+    for index, phase in enumerate(phases):
+        halo = steps[phase[0]].halo
+        last = index == len(phases) - 1
+        # A step with a halo reads rows of its neighbours: never write over its own source
+        if last and not (halo and np.shares_memory(source, out)):
+            target = out
+        else:
+            target = scratch(workspace, f'pipeline_{index % 2}', image.shape, image.dtype)
+        futures = [pool.submit(_run_band, [plan[number] for number in phase], halo, source, target, start, stop,
+                               workspace)
+                   for plan, (start, stop) in zip(plans, bands)]
+        for future in futures:
+            future.result()
+        source = target
+    if source is not out:
+        out[...] = source
+    return out
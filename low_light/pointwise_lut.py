@@ -0,0 +1,92 @@
+import functools
+
+import numpy as np
+import cv2
+
+# Every uint8 value a channel can take; the tables below are built by running
+# the reference arithmetic of each stage over this ramp, so looking a pixel up
+# in the table returns exactly what the staged code would have computed.
+_RAMP = np.arange(256, dtype=np.uint8)
+
+
+def illumination_lut(illumination_factor):
+    """
+    Build the 256-entry table for adjust_illumination.
+    Mirrors the float32 gamma curve of the staged path value for value.
+    """
+    ramp = _RAMP.astype(np.float32) / 255.0
+    gamma = 1.0 / illumination_factor
+    table = (np.power(ramp, gamma) * 255).clip(0, 255).astype(np.uint8)
+    return np.repeat(table[:, None], 3, axis=1)
+
+
+def contrast_lut(contrast_factor):
+    """
+    Build the 256-entry table for the convertScaleAbs part of adjust_contrast_color.
+    The table is produced by OpenCV itself, so its rounding is reproduced exactly.
+    """
+    table = cv2.convertScaleAbs(_RAMP.reshape(1, 256), alpha=contrast_factor, beta=0).reshape(256)
+    return np.repeat(table[:, None], 3, axis=1)
+
+
+def white_balance_lut(red_gain, green_gain, blue_gain):
+    """
+    Build the per-channel table for apply_white_balance.
+    Channel 0 gets red_gain, 1 green_gain and 2 blue_gain, as in the staged path.
+    """
+    table = np.empty((256, 3), dtype=np.uint8)
+    for channel, gain in enumerate((red_gain, green_gain, blue_gain)):
+        values = _RAMP.astype(np.float32)
+        values *= gain
+        table[:, channel] = np.clip(values, 0, 255).astype(np.uint8)
+    return table
+
+
+def compose_luts(*luts):
+    """
+    Fuse tables that are applied one after another into a single table.
+    Since every table maps uint8 to uint8, the composition is exact.
+    """
+    fused = luts[0]
+    channels = np.arange(3)
+    for lut in luts[1:]:
+        fused = lut[fused, channels]
+    return fused
+
+
+def apply_lut(image, lut, out=None):
+    """
+    Apply a (256, 3) table to a BGR image, or its first column to a single-channel image.
+    One table lookup per pixel and no float temporaries.
+    """
+    if image.ndim == 2 or image.shape[2] == 1:
+        table = np.ascontiguousarray(lut[:, 0])
+    else:
+        table = lut.reshape(256, 1, 3)
+    return cv2.LUT(image, table, dst=out)
+
+
+IDENTITY_LUT = np.repeat(_RAMP[:, None], 3, axis=1)
+IDENTITY_LUT.flags.writeable = False
+
+_BUILDERS = {
+    'illumination': illumination_lut,
+    'contrast': contrast_lut,
+    'white_balance': white_balance_lut,
+}
+
+
+def is_identity_lut(lut):
+    return np.array_equal(lut, IDENTITY_LUT)
+
+
+@functools.lru_cache(maxsize=512)
+def stage_lut(stage, *params):
+    """
+    Build the read-only table of one pointwise stage ('illumination', 'contrast'
+    or 'white_balance') for one parameter set. Cached, so a pair of frames (or
+    repeated GUI slider values) builds it only once.
+    """
+    lut = _BUILDERS[stage](*params)
+    lut.flags.writeable = False
+    return lut
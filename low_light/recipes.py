@@ -0,0 +1,168 @@
+import io
+import json
+import os
+
+import numpy as np
+
+from .convert import degrade_image, plan_options, read_image
+from .effects import draw_low_light_params
+from .files import write_bytes_atomic
+from .noise_rng import RandomStreams
+from .workspace import worker_workspace
+
+# Version of the recipe file layout, stored in every file.
+RECIPE_VERSION = 1
+
+# Name of the recipe file a conversion records in its state directory, or
+# writes as the whole output with --output recipes.
+RECIPE_NAME = 'recipes.npz'
+
+# Columns of the parameters sampled for the low_light effect, as
+# sample_low_light_params names them.
+PARAMETERS = ('noise_level', 'gaussian_std', 'illumination_factor', 'blur_kernel_size', 'contrast_factor',
+              'color_factor', 'red_gain', 'green_gain', 'blue_gain')
+
+
+def _seed_words(seed):
+    # A 128-bit seed as (low, high) 64-bit words
+    return seed & (2 ** 64 - 1), seed >> 64
+
+
+class Recipes:
+    """
+    How every image of a degraded dataset is made, without its pixels: one
+    row per image with its source path (relative to root), the (group,
+    frame) key of its random streams, the seed and, for the low_light
+    effect, every parameter sampled for its group. metadata holds what the
+    rows share: the options of the effect, the dataset and its root.
+
+    render() regenerates an image from the clean source, bit-exact, since the
+    parameters are applied as recorded and the noise is drawn again from the
+    recorded streams. Images of a group with consecutive frames are the pairs
+    of the dataset (see pairs()). Saved as compressed NPZ, a dataset of
+    100k images takes a few MB, so many variants cost next to nothing on
+    disk.
+    """
+
+    def __init__(self, columns, metadata):
+        self.columns = columns
+        self.metadata = metadata
+        self._rows = None
+
+    def __repr__(self):
+        return f"Recipes({self.metadata.get('dataset')!r}, {len(self)} images, {self.options['effect']!r})"
+
+    def __len__(self):
+        return len(self.columns['path'])
+
+    @property
+    def options(self):
+        return self.metadata['options']
+
+    @property
+    def root(self):
+        return self.metadata.get('root')
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files if name != 'metadata'}
+            metadata = json.loads(str(data['metadata']))
+        if metadata.get('version') != RECIPE_VERSION:
+            raise ValueError(f"{path} is a version {metadata.get('version')} recipe file, "
+                             f"expected version {RECIPE_VERSION}")
+        return cls(columns, metadata)
+
+    def save(self, path):
+        """
+        Write the recipes to path as compressed NPZ, renamed into place.
+        """
+        # np.savez writes through a zip file, which needs a seekable file
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, metadata=np.array(json.dumps(self.metadata)), **self.columns)
+        write_bytes_atomic(path, buffer.getbuffer())
+
+    def index(self, path):
+        """
+        The row of the image at path.
+        """
+        if self._rows is None:
+            self._rows = {str(row_path): row for row, row_path in enumerate(self.columns['path'])}
+        return self._rows[path]
+
+    def seed(self, row):
+        low, high = self.columns['seed'][row]
+        return int(low) | int(high) << 64
+
+    def params(self, row):
+        """
+        The low_light parameters recorded for row, as sample_low_light_params returns them, or None.
+        """
+        if 'noise_level' not in self.columns:
+            return None
+        return {name: (int if name == 'blur_kernel_size' else float)(self.columns[name][row]) for name in PARAMETERS}
+
+    def pairs(self):
+        """
+        The (row1, row2) of consecutive frames within each group, the pairs of the dataset.
+        """
+        group, frame = self.columns['group'], self.columns['frame']
+        order = np.lexsort((frame, group))
+        return [(int(first), int(second)) for first, second in zip(order, order[1:])
+                if group[first] == group[second] and frame[second] == frame[first] + 1]
+
+    def render(self, row, root=None):
+        """
+        The degraded image of a row, regenerated from its source under root
+        (default: the root recorded with the recipes).
+        """
+        root = self.root if root is None else root
+        group, frame = int(self.columns['group'][row]), int(self.columns['frame'][row])
+        task = (str(self.columns['path'][row]), root, None, group, frame, self.seed(row), self.options)
+        image = read_image(task)[0][0]
+        return degrade_image(image, group, frame, RandomStreams(task[5]), self.options, worker_workspace(),
+                             self.params(row))
+
+    def render_pair(self, pair, root=None):
+        first, second = self.pairs()[pair]
+        return self.render(first, root), self.render(second, root)
+
+
+def make_recipes(tasks, seed, options, root=None, dataset=None):
+    """
+    The Recipes of degrading the (path, group, frame) tasks with options and
+    seed, drawing the parameters of every group exactly as degrade_image
+    does (a sampler in options must already be sized, see plan_options).
+    """
+    seed = RandomStreams(seed).seed
+    streams = RandomStreams(seed)
+    paths = [path for path, _, _ in tasks]
+    columns = {
+        'path': np.array(paths, dtype=str) if paths else np.empty(0, dtype='<U1'),
+        'group': np.array([group for _, group, _ in tasks], dtype=np.int64),
+        'frame': np.array([frame for _, _, frame in tasks], dtype=np.int64),
+        'seed': np.tile(np.array(_seed_words(seed), dtype=np.uint64), (len(tasks), 1)),
+    }
+    if options['effect'] == 'low_light':
+        sampled = {}
+        for _, group, _ in tasks:
+            if group not in sampled:
+                sampled[group] = draw_low_light_params(streams, group, options['ranges'], options.get('sampler'))
+        for name in PARAMETERS:
+            dtype = np.int64 if name == 'blur_kernel_size' else np.float64
+            columns[name] = np.array([sampled[group][name] for _, group, _ in tasks], dtype=dtype)
+    metadata = {
+        'version': RECIPE_VERSION,
+        'dataset': dataset,
+        'root': None if root is None else os.path.abspath(root),
+        'options': options,
+    }
+    return Recipes(columns, metadata)
+
+
+def plan_recipes(plan, seed, options, root=None):
+    """
+    The Recipes of the images of a ConversionPlan.
+    """
+    tasks = [(task.path, task.group, task.frame) for task in plan.images]
+    return make_recipes(tasks, seed, plan_options(options, plan), root, plan.spec.name)
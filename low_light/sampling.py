@@ -0,0 +1,188 @@
+import numpy as np
+
+# How the points of a parameter table are placed in the unit cube: independent
+# uniform draws, a Latin hypercube (every parameter stratified into N equal
+# bins, one point each) or a scrambled Sobol sequence (stratified in every
+# dyadic box, best with N a power of two).
+DESIGNS = ('random', 'lhs', 'sobol')
+
+# How a unit coordinate maps onto a parameter's range.
+SCALES = ('linear', 'log')
+
+# Bits of precision of the Sobol points.
+SOBOL_BITS = 32
+
+# Joe and Kuo's primitive polynomials and initial direction numbers
+# (new-joe-kuo-6.21201) for dimensions 2 and up, as (degree, coefficients,
+# m_1..m_degree); dimension 1 is the van der Corput sequence.
+_SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+)
+
+
+def _sobol_directions(dims):
+    """
+    The direction numbers of the first dims dimensions, as a (dims, SOBOL_BITS) array of integers.
+    """
+    if dims > len(_SOBOL_DIRECTIONS) + 1:
+        raise ValueError(f"Sobol points are available in up to {len(_SOBOL_DIRECTIONS) + 1} dimensions, not {dims}")
+    directions = np.zeros((dims, SOBOL_BITS), dtype=np.uint64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - bit) for bit in range(SOBOL_BITS)]
+    for dim, (degree, coefficients, initial) in enumerate(_SOBOL_DIRECTIONS[:dims - 1], 1):
+        values = [m << (SOBOL_BITS - 1 - bit) for bit, m in enumerate(initial)]
+        for bit in range(degree, SOBOL_BITS):
+            value = values[bit - degree] ^ (values[bit - degree] >> degree)
+            for step in range(1, degree):
+                if (coefficients >> (degree - 1 - step)) & 1:
+                    value ^= values[bit - step]
+            values.append(value)
+        directions[dim] = values
+    return directions
+
+
+def _scramble_directions(directions, rng):
+    """
+    Linear matrix scrambling: every dimension's direction numbers multiplied
+    over GF(2) by a random lower-triangular matrix with a unit diagonal.
+    """
+    shifts = np.arange(SOBOL_BITS - 1, -1, -1, dtype=np.uint64)
+    scrambled = np.empty_like(directions)
+    for dim in range(len(directions)):
+        # Row r of the matrix acts on bit r counted from the most significant
+        matrix = np.tril(rng.integers(0, 2, (SOBOL_BITS, SOBOL_BITS), dtype=np.uint64), -1)
+        np.fill_diagonal(matrix, 1)
+        bits = (directions[dim][:, None] >> shifts) & np.uint64(1)
+        products = (bits @ matrix.T) & np.uint64(1)
+        scrambled[dim] = (products << shifts).sum(axis=1, dtype=np.uint64)
+    return scrambled
+
+
+def sobol_points(count, dims, rng=None):
+    """
+    The first count points of the dims-dimensional Sobol sequence in [0, 1),
+    as a (count, dims) float64 array. With a Generator, the sequence is
+    scrambled (random linear matrix scrambling and digital shift), which
+    keeps its stratification and removes the point at the origin and the
+    alignments of the plain sequence.
+    """
+    directions = _sobol_directions(dims)
+    shift = np.zeros(dims, dtype=np.uint64)
+    if rng is not None:
+        directions = _scramble_directions(directions, rng)
+        shift = rng.integers(0, 2 ** SOBOL_BITS, dims, dtype=np.uint64)
+    index = np.arange(count, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    points = np.zeros((count, dims), dtype=np.uint64)
+    for bit in range(max(int(count - 1).bit_length(), 1)):
+        mask = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[mask] ^= directions[:, bit]
+    return (points ^ shift) / float(2 ** SOBOL_BITS)
+
+
+def latin_hypercube(count, dims, rng):
+    """
+    count points in [0, 1) with every coordinate stratified: each of the
+    count equal bins of every dimension holds exactly one point, at a random
+    position within it.
+    """
+    bins = rng.permuted(np.tile(np.arange(count), (dims, 1)), axis=1).T
+    return (bins + rng.random((count, dims))) / count
+
+
+def unit_points(count, dims, design='random', rng=None):
+    """
+    count points of design (see DESIGNS) in the dims-dimensional unit cube.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if design == 'random':
+        return rng.random((count, dims))
+    if design == 'lhs':
+        return latin_hypercube(count, dims, rng)
+    if design == 'sobol':
+        return sobol_points(count, dims, rng)
+    raise ValueError(f"Unknown design '{design}', expected one of {DESIGNS}")
+
+
+def correlate(points, correlation, rng):
+    """
+    Reorder the columns of points so their rank correlation follows the
+    correlation matrix (Iman and Conover's method). Only values are permuted
+    within each column, so every coordinate keeps exactly the values, and
+    with them the stratification, its design gave it; the joint placement
+    of the correlated coordinates follows the normal scores instead.
+    """
+    count, dims = points.shape
+    correlation = np.asarray(correlation, dtype=np.float64)
+    try:
+        target = np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError:
+        raise ValueError('The declared correlations do not form a positive definite correlation matrix') from None
+    scores = rng.standard_normal((count, dims))
+    current = np.linalg.cholesky(np.corrcoef(scores, rowvar=False))
+    ranks = (scores @ np.linalg.inv(current).T @ target.T).argsort(axis=0).argsort(axis=0)
+    return np.take_along_axis(np.sort(points, axis=0), ranks, axis=0)
+
+
+def scale_points(unit, low, high, scale='linear', integer=False):
+    """
+    Map unit coordinates onto [low, high]: uniformly, or log-uniformly with
+    scale='log'. Integers are drawn over low..high inclusive, each value
+    getting an equal share (an equal share of the log range with 'log').
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale '{scale}', expected one of {SCALES}")
+    if integer:
+        high = high + 1
+    if scale == 'log':
+        if low <= 0:
+            raise ValueError(f"A log-uniform range needs a positive lower bound, got {low}")
+        values = np.exp(np.log(low) + unit * (np.log(high) - np.log(low)))
+    else:
+        values = low + unit * (high - low)
+    if integer:
+        return np.minimum(np.floor(values), high - 1).astype(np.int64)
+    return values
+
+
+def sample_table(count, ranges, design='random', scales=None, correlations=(), rng=None, integers=()):
+    """
+    Draw count values of every parameter of ranges, a mapping of names to
+    (low, high), in one vectorized call: points of design in the unit cube,
+    reordered to the declared correlations, mapped onto each range by its
+    scale (default 'linear'). correlations is a sequence of (name, name,
+    coefficient), e.g. [('illumination', 'noise_level', -0.6)] for darker
+    images going with more noise; the parameters named in integers are drawn
+    as integers. Returns a dict of arrays of length count, keyed like ranges.
+    """
+    names = list(ranges)
+    unknown = {name for first, second, _ in correlations for name in (first, second)} - set(names)
+    if unknown:
+        raise ValueError(f"Cannot correlate unknown parameters {sorted(unknown)}, expected some of {names}")
+    rng = np.random.default_rng() if rng is None else rng
+    unit = unit_points(count, len(names), design, rng)
+    correlated = sorted({names.index(name) for first, second, _ in correlations for name in (first, second)})
+    # Fewer samples than correlated parameters have a singular correlation
+    # matrix of their own, which cannot be reordered: they are left as drawn.
+    if correlations and count > len(correlated):
+        matrix = np.eye(len(correlated))
+        for first, second, coefficient in correlations:
+            i, j = correlated.index(names.index(first)), correlated.index(names.index(second))
+            matrix[i, j] = matrix[j, i] = coefficient
+        unit[:, correlated] = correlate(unit[:, correlated], matrix, rng)
+    scales = scales or {}
+    return {name: scale_points(unit[:, dim], *ranges[name], scales.get(name, 'linear'), name in integers)
+            for dim, name in enumerate(names)}
@@ -0,0 +1,68 @@
+import functools
+
+import numpy as np
+import cv2
+
+SATURATION_MODES = ('luma', 'hsv')
+
+# Rec. 601 luma weights in BGR order, the same ones cv2.COLOR_BGR2GRAY uses.
+LUMA_WEIGHTS = np.array([0.114, 0.587, 0.299])
+
+
+def saturation_matrix(color_factor):
+    """
+    Build the 3x3 BGR matrix that blends each pixel toward its luma.
+    color_factor 1 is the identity, 0 gives the grey image and values above 1
+    push colors away from grey. Luma is preserved for every factor.
+    """
+    identity = np.eye(3)
+    grey = np.repeat(LUMA_WEIGHTS[None, :], 3, axis=0)
+    return color_factor * identity + (1.0 - color_factor) * grey
+
+
+@functools.lru_cache(maxsize=128)
+def contrast_saturation_matrix(contrast_factor, color_factor):
+    """
+    Fuse the contrast scale and the luma blend into one matrix.
+    Both are linear, so scaling then blending is a single matrix product per pixel.
+    """
+    matrix = contrast_factor * saturation_matrix(color_factor)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def _hsv_saturation(image, color_factor):
+    adjusted_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    adjusted_image[:, :, 1] = np.clip(adjusted_image[:, :, 1] * color_factor, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(adjusted_image, cv2.COLOR_HSV2BGR)
+
+
+def adjust_contrast_saturation(image, contrast_factor, color_factor, mode='luma', out=None):
+    """
+    Scale the contrast and the color saturation of a BGR image.
+
+    mode='luma' applies the fused contrast and luma-blend matrix in one pass,
+    rounding and saturating once at the end. mode='hsv' is the original
+    convertScaleAbs followed by scaling S in an HSV round trip, kept as the
+    legacy-exact reference. HSV desaturation keeps each pixel's brightest
+    channel while the blend keeps its luma, so the modes drift apart as
+    color_factor falls; at color_factor 1 the only difference is the hue
+    quantization of the round trip (see benchmarks/bench_saturation.py).
+    """
+    if mode not in SATURATION_MODES:
+        raise ValueError(f"Unknown saturation mode '{mode}', expected one of {SATURATION_MODES}")
+    if mode == 'hsv':
+        adjusted_image = cv2.convertScaleAbs(image, alpha=contrast_factor, beta=0)
+        adjusted_image = _hsv_saturation(adjusted_image, color_factor)
+        if out is None:
+            return adjusted_image
+        out[...] = adjusted_image
+        return out
+    return cv2.transform(image, contrast_saturation_matrix(float(contrast_factor), float(color_factor)), dst=out)
+
+
+def adjust_saturation(image, color_factor, mode='luma', out=None):
+    """
+    Scale the color saturation of a BGR image; adjust_contrast_saturation with contrast 1.
+    """
+    return adjust_contrast_saturation(image, 1.0, color_factor, mode, out)
@@ -0,0 +1,467 @@
+import io
+import json
+import logging
+import os
+import re
+import struct
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .cli import _init_worker, pool_settings
+from .codecs import NpyCodec, get_codec
+from .convert import ConversionStats, degrade_item, plan_options, read_image
+from .datasets import plan_conversion
+from .files import partial_path, write_bytes_atomic
+from .noise_rng import RandomStreams
+
+# Containers a dataset can be packed into instead of a tree of files.
+FORMATS = ('tar', 'lmdb')
+
+# File listing the shards (or the LMDB environment) of a packed dataset.
+INDEX_NAME = 'index.json'
+
+# Default size a tar shard is closed at.
+SHARD_SIZE = 1 << 30
+
+# Bytes read at a time when streaming a shard.
+READ_BUFFER = 1 << 20
+
+# Extensions decoded into arrays when a reader decodes samples.
+IMAGE_EXTENSIONS = ('.png', '.webp', '.ppm', '.jpg', '.jpeg')
+
+# WebDataset's split of a member name into sample key and field.
+_MEMBER = re.compile(r'^((?:.*/|)[^.]+)[.]([^/]*)$')
+
+
+def field_name(path):
+    """
+    The field a file is stored under in its sample: its relative path with
+    '/' as '.', since a field may not contain '/'.
+    """
+    return path.replace('/', '.')
+
+
+def decode_field(field, data):
+    """
+    The array an image field holds, or data itself for other files (flow, disparity, text).
+    """
+    extension = os.path.splitext(field)[1].lower()
+    if extension == '.npy':
+        return NpyCodec().decode(data)
+    if extension in IMAGE_EXTENSIONS:
+        return get_codec('source').decode(data)
+    return data
+
+
+def _decode(sample, decode):
+    if not decode:
+        return sample
+    return {field: value if field == '__key__' else decode_field(field, value) for field, value in sample.items()}
+
+
+def _import_lmdb():
+    try:
+        import lmdb
+    except ImportError:
+        raise ImportError('LMDB output needs the lmdb package (pip install lmdb)') from None
+    return lmdb
+
+
+def pack_sample(members):
+    """
+    One LMDB value holding the (field, data) members of a sample: the length
+    of a JSON header mapping each field to its (offset, size), the header,
+    then the data.
+    """
+    header, offset = {}, 0
+    for field, data in members:
+        size = memoryview(data).nbytes
+        header[field] = [offset, size]
+        offset += size
+    header = json.dumps(header).encode()
+    return b''.join([struct.pack('<I', len(header)), header] + [memoryview(data).cast('B') for _, data in members])
+
+
+def unpack_sample(value):
+    value = memoryview(value)
+    length, = struct.unpack_from('<I', value)
+    header = json.loads(bytes(value[4:4 + length]))
+    start = 4 + length
+    return {field: bytes(value[start + offset:start + offset + size]) for field, (offset, size) in header.items()}
+
+
+class TarShardWriter:
+    """
+    Samples packed WebDataset-style into tar shards of about shard_size bytes
+    (a sample is never split): the (field, data) members of a sample become
+    consecutive tar members named 'key.field'. Next to every shard-NNNNNN.tar,
+    shard-NNNNNN.json indexes it, mapping each key to {field: [offset, size]}
+    of the members' data for random access, and close() writes index.json,
+    listing the shards with metadata (and removes the shards of an earlier
+    run beyond the last). Shards are written under temporary names and
+    renamed when complete.
+    """
+
+    format = 'tar'
+
+    def __init__(self, root, shard_size=SHARD_SIZE, metadata=None):
+        self.root = root
+        self.shard_size = shard_size
+        self.metadata = metadata or {}
+        self.shards = []
+        self._tar = None
+        self._index = None
+        # Whole seconds: a fractional mtime costs every member a PAX header
+        self._mtime = int(time.time())
+        os.makedirs(root, exist_ok=True)
+
+    def __repr__(self):
+        return f"TarShardWriter({self.root!r}, {len(self.shards)} shards)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _path(self, number, extension):
+        return os.path.join(self.root, f"shard-{number:06d}{extension}")
+
+    def _open_shard(self):
+        self._number = len(self.shards)
+        self._partial = partial_path(self._path(self._number, '.tar'))
+        self._tar = tarfile.open(self._partial, 'w', format=tarfile.PAX_FORMAT)
+        self._index = {}
+
+    def _close_shard(self):
+        self._tar.close()
+        name = os.path.basename(self._path(self._number, '.tar'))
+        os.replace(self._partial, self._path(self._number, '.tar'))
+        write_bytes_atomic(self._path(self._number, '.json'), json.dumps(self._index).encode())
+        self.shards.append({'name': name, 'samples': len(self._index),
+                            'bytes': os.path.getsize(self._path(self._number, '.tar'))})
+        self._tar = None
+
+    def add(self, key, members):
+        if self._tar is not None and self._index and self._tar.offset >= self.shard_size:
+            self._close_shard()
+        if self._tar is None:
+            self._open_shard()
+        fields = {}
+        for field, data in members:
+            data = memoryview(data).cast('B')
+            info = tarfile.TarInfo(f"{key}.{field}")
+            info.size = data.nbytes
+            info.mtime = self._mtime
+            self._tar.addfile(info, io.BytesIO(data))
+            # addfile leaves the offset past the data, padded to whole blocks
+            blocks = (info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+            fields[field] = [self._tar.offset - blocks * tarfile.BLOCKSIZE, info.size]
+        self._index[key] = fields
+
+    def close(self):
+        if self._tar is not None:
+            self._close_shard()
+        # Shards of an earlier, larger run
+        number = len(self.shards)
+        while os.path.exists(self._path(number, '.tar')):
+            os.remove(self._path(number, '.tar'))
+            if os.path.exists(self._path(number, '.json')):
+                os.remove(self._path(number, '.json'))
+            number += 1
+        index = dict(self.metadata, format=self.format, samples=sum(shard['samples'] for shard in self.shards),
+                     shards=self.shards)
+        write_bytes_atomic(os.path.join(self.root, INDEX_NAME), json.dumps(index, indent=1).encode())
+
+
+class LmdbWriter:
+    """
+    Samples stored in one LMDB environment at root, each under its key as a
+    pack_sample value; LMDB's B-tree is the index. Transactions are committed
+    every commit_every samples; close() writes index.json with metadata.
+    map_size only reserves address space, the file grows as needed.
+    """
+
+    format = 'lmdb'
+
+    def __init__(self, root, map_size=1 << 40, metadata=None, commit_every=256):
+        lmdb = _import_lmdb()
+        self.root = root
+        self.metadata = metadata or {}
+        self.commit_every = commit_every
+        self.samples = 0
+        self._env = lmdb.open(root, map_size=map_size, subdir=True, readahead=False, meminit=False)
+        self._txn = self._env.begin(write=True)
+
+    def __repr__(self):
+        return f"LmdbWriter({self.root!r}, {self.samples} samples)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, key, members):
+        self._txn.put(key.encode(), pack_sample(members))
+        self.samples += 1
+        if self.samples % self.commit_every == 0:
+            self._txn.commit()
+            self._txn = self._env.begin(write=True)
+
+    def close(self):
+        if self._env is None:
+            return
+        self._txn.commit()
+        self._env.close()
+        self._env = None
+        index = dict(self.metadata, format=self.format, samples=self.samples)
+        write_bytes_atomic(os.path.join(self.root, INDEX_NAME), json.dumps(index, indent=1).encode())
+
+
+class ShardReader:
+    """
+    Reads a dataset packed by TarShardWriter. Iterating streams the samples
+    shard by shard with sequential reads, the way training reads them;
+    iterate(shards) reads only some shards, to split them between data loader
+    workers. reader[key] reads one sample through the shard indexes. Samples
+    are dicts of field to bytes with the key under '__key__', or with decode
+    set, of images decoded to arrays (see decode_field).
+    """
+
+    def __init__(self, root, decode=False):
+        self.root = root
+        self.decode = decode
+        with open(os.path.join(root, INDEX_NAME), 'r') as f:
+            self.index = json.load(f)
+        if self.index['format'] != 'tar':
+            raise ValueError(f"{root} holds {self.index['format']} output, not tar shards")
+        self.shards = [shard['name'] for shard in self.index['shards']]
+        self._locations = None
+
+    def __repr__(self):
+        return f"ShardReader({self.root!r}, {len(self.shards)} shards, {len(self)} samples)"
+
+    def __len__(self):
+        return self.index['samples']
+
+    def __iter__(self):
+        return self.iterate()
+
+    def iterate(self, shards=None):
+        for name in self.shards if shards is None else shards:
+            sample = None
+            # Seekable mode over a buffered file: members are still read in
+            # order, in large reads, without tarfile's stream copying
+            with open(os.path.join(self.root, name), 'rb', buffering=READ_BUFFER) as f, \
+                    tarfile.open(fileobj=f, mode='r:') as tar:
+                for member in tar:
+                    match = _MEMBER.match(member.name)
+                    if not member.isfile() or match is None:
+                        continue
+                    key, field = match.groups()
+                    if sample is not None and sample['__key__'] != key:
+                        yield _decode(sample, self.decode)
+                        sample = None
+                    if sample is None:
+                        sample = {'__key__': key}
+                    sample[field] = tar.extractfile(member).read()
+            if sample is not None:
+                yield _decode(sample, self.decode)
+
+    def _load_locations(self):
+        self._locations = {}
+        for name in self.shards:
+            with open(os.path.join(self.root, os.path.splitext(name)[0] + '.json'), 'r') as f:
+                for key, fields in json.load(f).items():
+                    self._locations[key] = (name, fields)
+
+    def keys(self):
+        if self._locations is None:
+            self._load_locations()
+        return self._locations.keys()
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __getitem__(self, key):
+        if self._locations is None:
+            self._load_locations()
+        name, fields = self._locations[key]
+        # The members of a sample are consecutive: one read covers them all
+        start = min(offset for offset, _ in fields.values())
+        end = max(offset + size for offset, size in fields.values())
+        with open(os.path.join(self.root, name), 'rb') as f:
+            data = memoryview(os.pread(f.fileno(), end - start, start))
+        sample = {'__key__': key}
+        for field, (offset, size) in fields.items():
+            sample[field] = bytes(data[offset - start:offset - start + size])
+        return _decode(sample, self.decode)
+
+
+class LmdbReader:
+    """
+    Reads a dataset packed by LmdbWriter, with the interface of ShardReader:
+    iterating walks the samples in key order, reader[key] looks one up.
+    LMDB allows one open environment per process and path; close() the
+    reader (or use it as a context manager) before opening another.
+    """
+
+    def __init__(self, root, decode=False):
+        lmdb = _import_lmdb()
+        self.root = root
+        self.decode = decode
+        with open(os.path.join(root, INDEX_NAME), 'r') as f:
+            self.index = json.load(f)
+        self._env = lmdb.open(root, subdir=True, readonly=True, lock=False, readahead=True)
+
+    def __repr__(self):
+        return f"LmdbReader({self.root!r}, {len(self)} samples)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.index['samples']
+
+    def __iter__(self):
+        with self._env.begin() as txn:
+            for key, value in txn.cursor():
+                yield _decode(dict(unpack_sample(value), __key__=bytes(key).decode()), self.decode)
+
+    def keys(self):
+        with self._env.begin() as txn:
+            return [bytes(key).decode() for key in txn.cursor().iternext(values=False)]
+
+    def __contains__(self, key):
+        with self._env.begin() as txn:
+            return txn.get(key.encode()) is not None
+
+    def __getitem__(self, key):
+        with self._env.begin() as txn:
+            value = txn.get(key.encode())
+            if value is None:
+                raise KeyError(key)
+            return _decode(dict(unpack_sample(value), __key__=key), self.decode)
+
+    def close(self):
+        self._env.close()
+
+
+def open_packed(root, decode=False):
+    """
+    The reader of a packed dataset, whichever its format.
+    """
+    with open(os.path.join(root, INDEX_NAME), 'r') as f:
+        packed_format = json.load(f)['format']
+    return (ShardReader if packed_format == 'tar' else LmdbReader)(root, decode)
+
+
+def encode_image(task):
+    """
+    Read, degrade and encode one image with the codec of the options, for
+    packing. Returns (path, error, timings, data) like convert_image, with the
+    encoded bytes instead of their size.
+    """
+    path, options = task[0], task[6]
+    timings = [0.0, 0.0, 0.0]
+    try:
+        started = time.perf_counter()
+        item, _ = read_image(task)
+        read = time.perf_counter()
+        timings[0] = read - started
+        image = degrade_item(item)
+        degraded = time.perf_counter()
+        timings[1] = degraded - read
+        data = bytes(get_codec(options.get('codec', 'source')).encode(image, path))
+        timings[2] = time.perf_counter() - degraded
+        return path, None, timings, data
+    except Exception as e:
+        return path, str(e), timings, None
+
+
+def pack_dataset(spec, src, dst, options, seed=None, workers=1, chunk_size=None, cv_threads=None, output='tar',
+                 shard_size=SHARD_SIZE, dry_run=False, log_every=100):
+    """
+    Convert the dataset described by spec from src into packed samples in
+    dst instead of a tree of files: tar shards with output='tar', an LMDB
+    environment with 'lmdb'. Files are gathered into samples by
+    spec.sample_key, so a pair travels with its ground truth; images are
+    degraded and encoded on a pool of workers as in convert_dataset, in
+    sample order, and every other file of the sample (ground truth, and the
+    other files if the dataset copies them) is stored as it is. A sample with
+    an image that fails to convert is left out. Packing is not incremental:
+    every run writes all samples. Returns the ConversionStats of the run.
+    """
+    plan = plan_conversion(spec, src)
+    options = plan_options(options, plan)
+    seed = RandomStreams(seed).seed
+    codec = get_codec(options.get('codec', 'source'))
+    images = {task.path: task for task in plan.images}
+    samples = {}
+    for path in sorted(list(images) + plan.pass_through):
+        samples.setdefault(spec.sample_key(path), []).append(path)
+    keys = sorted(samples)
+    logging.info(f"{plan}; {len(keys)} samples")
+    stats = ConversionStats(len(plan.images))
+    if dry_run:
+        logging.info(f"Would pack {len(keys)} samples ({len(images)} images) into {output} output")
+        return stats
+
+    tasks = [(path, src, dst, images[path].group, images[path].frame, seed, options)
+             for key in keys for path in samples[key] if path in images]
+    metadata = {'dataset': spec.name, 'source': os.path.abspath(src), 'codec': codec.spec}
+    if output == 'lmdb':
+        writer = LmdbWriter(dst, metadata=metadata)
+    else:
+        writer = TarShardWriter(dst, shard_size, metadata)
+    executor = None
+    try:
+        if workers <= 1 or len(tasks) <= 1:
+            results = map(encode_image, tasks)
+        else:
+            workers, chunk_size, cv_threads = pool_settings(len(tasks), workers, chunk_size, cv_threads)
+            logging.info(f"Converting {len(tasks)} images with {workers} workers, {chunk_size} images per chunk")
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cv_threads,))
+            results = executor.map(encode_image, tasks, chunksize=chunk_size)
+
+        packed = 0
+        for number, key in enumerate(keys, 1):
+            members = []
+            complete = True
+            for path in samples[key]:
+                if path in images:
+                    path, error, timings, data = next(results)
+                    stats.add(error, timings, len(data) if error is None else 0)
+                    if error is not None:
+                        logging.error(f"Error converting {path}: {error}")
+                        complete = False
+                        continue
+                    members.append((field_name(codec.output_path(path)), data))
+                else:
+                    started = time.perf_counter()
+                    with open(os.path.join(src, path), 'rb') as f:
+                        data = f.read()
+                    stats.copy_seconds += time.perf_counter() - started
+                    stats.copied += 1
+                    stats.bytes_copied += len(data)
+                    members.append((field_name(path), data))
+            if complete:
+                writer.add(key, members)
+                packed += 1
+            else:
+                logging.error(f"Left sample {key} out")
+            if number % log_every == 0:
+                logging.info(stats.progress())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        writer.close()
+
+    logging.info(stats.summary())
+    logging.info(f"Packed {packed} of {len(keys)} samples into {dst} ({output})")
+    return stats
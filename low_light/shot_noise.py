@@ -0,0 +1,173 @@
+import functools
+import math
+
+import numpy as np
+
+from .workspace import scratch, to_uint8
+
+SHOT_NOISE_MODES = ('auto', 'poisson', 'normal', 'table')
+
+# Photon count of a full-scale (255) pixel above which 'auto' switches from the
+# table sampler to the normal approximation. At this rate even a pixel value of
+# 20 collects ~80 photons, where Poisson and its variance-matched normal agree
+# closely, while the inverse-CDF tables would need thousands of count bins.
+NORMAL_MIN_PEAK = 1024.0
+
+# Quantile levels per intensity in the table sampler and the resolution of the
+# log-spaced noise-level grid the count tables are cached on (about 0.3% apart).
+TABLE_QUANTILES = 4096
+LEVELS_PER_OCTAVE = 256
+
+
+def _rate(noise_level):
+    return max(noise_level, 0.01)
+
+
+def _standard_normal(rng, out):
+    """
+    Fill a float32 buffer with standard normals from a numpy Generator or the legacy RandomState API.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.standard_normal(dtype=np.float32, out=out)
+    out[...] = rng.standard_normal(out.shape)
+    return out
+
+
+def _random_indices(rng, high, shape):
+    integers = getattr(rng, 'integers', None) or rng.randint
+    return integers(0, high, size=shape, dtype=np.uint16)
+
+
+def choose_shot_noise_mode(noise_level):
+    """
+    Pick the sampler 'auto' uses for a noise level.
+    Tables cover the usual low photon counts; the normal approximation takes over
+    when every visible intensity already collects many photons.
+    """
+    if _rate(noise_level) * 255 >= NORMAL_MIN_PEAK:
+        return 'normal'
+    return 'table'
+
+
+def quantize_noise_level(noise_level):
+    """
+    Snap a noise level onto the log-spaced grid the count tables are cached on.
+    """
+    steps = round(math.log2(_rate(noise_level)) * LEVELS_PER_OCTAVE)
+    return 2.0 ** (steps / LEVELS_PER_OCTAVE)
+
+
+@functools.lru_cache(maxsize=32)
+def shot_noise_counts(rate):
+    """
+    Build the (256, TABLE_QUANTILES) inverse-CDF table of photon counts for a rate.
+    Row v holds evenly spaced quantiles of Poisson(v * rate).
+    """
+    peak = 255 * rate
+    max_count = int(math.ceil(peak + 12 * math.sqrt(peak) + 12))
+    counts = np.arange(max_count + 1)
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max_count + 1)))])
+    means = np.arange(1, 256)[:, None] * rate
+    cdf = np.cumsum(np.exp(counts * np.log(means) - means - log_factorial), axis=1)
+
+    # Quantile j sits at u_j = (j + 0.5) / Q and maps to the number of counts whose
+    # CDF lies below it; count k stops being below from quantile floor(cdf*Q - 0.5) + 1.
+    first_quantile = np.clip(np.floor(cdf * TABLE_QUANTILES - 0.5).astype(np.int64) + 1, 0, TABLE_QUANTILES)
+    rows = np.arange(255)[:, None] * (TABLE_QUANTILES + 1)
+    histogram = np.bincount((rows + first_quantile).ravel(), minlength=255 * (TABLE_QUANTILES + 1))
+    samples = np.cumsum(histogram.reshape(255, TABLE_QUANTILES + 1), axis=1)[:, :TABLE_QUANTILES]
+
+    table = np.zeros((256, TABLE_QUANTILES), dtype=np.uint16)
+    table[1:] = np.minimum(samples, max_count)
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=8)
+def shot_noise_table(rate):
+    """
+    Turn the cached count table of the nearest grid rate into output intensities.
+    Counts are rescaled with the exact rate, so outputs land on the same k / rate
+    lattice as the exact sampler, clipped and cast the way it casts them.
+    """
+    counts = shot_noise_counts(quantize_noise_level(rate))
+    table = np.clip(counts / rate, 0, 255).astype(np.uint8)
+    table.flags.writeable = False
+    return table
+
+
+def poisson_shot_noise(image, rate, rng, out=None, workspace=None):
+    """
+    Exact Poisson shot noise; rate may be a scalar or broadcast against the image.
+    The counts themselves are a fresh int64 array: numpy cannot draw them in place.
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    mean = scratch(workspace, 'shot_noise_mean', image.shape, np.float32)
+    np.copyto(mean, image)
+    mean *= rate.astype(np.float32)
+    # poisson works on float64 means; widening into a workspace buffer saves it
+    # from allocating its own copy
+    lam = scratch(workspace, 'shot_noise_lam', image.shape, np.float64)
+    np.copyto(lam, mean)
+    noisy_image = np.divide(rng.poisson(lam), rate, out=lam)
+    return to_uint8(noisy_image, out)
+
+
+def normal_shot_noise(image, rate, rng, out=None, workspace=None):
+    """
+    Variance-matched normal approximation: counts ~ round(N(v * rate, v * rate)).
+    """
+    rate = np.asarray(rate, dtype=np.float32)
+    mean = scratch(workspace, 'shot_noise_mean', image.shape, np.float32)
+    np.copyto(mean, image)
+    mean *= rate
+    counts = _standard_normal(rng, scratch(workspace, 'shot_noise_normal', image.shape, np.float32))
+    counts *= np.sqrt(mean, out=scratch(workspace, 'shot_noise_std', image.shape, np.float32))
+    counts += mean
+    np.rint(counts, out=counts)
+    np.maximum(counts, 0, out=counts)
+    counts /= rate
+    return to_uint8(counts, out)
+
+
+def table_shot_noise(image, rate, rng, out=None, workspace=None):
+    """
+    Sample shot noise by looking up a random quantile in the per-intensity table.
+    """
+    table = shot_noise_table(float(rate))
+    # np.take wants intp indices and, with the default mode, buffers out; an
+    # intp workspace buffer and mode='clip' (the indices are in range) avoid both copies
+    index = scratch(workspace, 'shot_noise_index', image.shape, np.intp)
+    np.multiply(image, TABLE_QUANTILES, out=index, dtype=np.intp)
+    index += _random_indices(rng, TABLE_QUANTILES, image.shape)
+    if out is None:
+        out = np.empty_like(image)
+    return np.take(table.ravel(), index, out=out, mode='clip')
+
+
+# The sampler of each mode but 'auto', as f(image, rate, rng, out, workspace).
+SHOT_NOISE_SAMPLERS = {
+    'poisson': poisson_shot_noise,
+    'normal': normal_shot_noise,
+    'table': table_shot_noise,
+}
+
+
+def sample_shot_noise(image, noise_level, mode='auto', rng=None, out=None, workspace=None):
+    """
+    Add shot noise to a uint8 image.
+    mode is 'poisson' (exact), 'normal', 'table' or 'auto', which picks a sampler
+    from the noise level. rng is a numpy Generator or RandomState; by default the
+    global numpy random state is used. out and workspace (see workspace.Workspace)
+    take the result and the float temporaries.
+    """
+    if noise_level <= 0:
+        if out is None:
+            return image
+        out[...] = image
+        return out
+    if mode not in SHOT_NOISE_MODES:
+        raise ValueError(f"Unknown shot noise mode '{mode}', expected one of {SHOT_NOISE_MODES}")
+    if mode == 'auto':
+        mode = choose_shot_noise_mode(noise_level)
+    return SHOT_NOISE_SAMPLERS[mode](image, _rate(noise_level), rng if rng is not None else np.random, out, workspace)
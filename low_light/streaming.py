@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STAGES = ('read', 'compute', 'write')
+
+
+class ByteBudget:
+    """
+    The bytes of the items between their read and their write, bounded by
+    limit: acquire() blocks while admitting an item would exceed it, which
+    stalls the readers until the writers catch up. An item larger than the
+    whole budget is still admitted once nothing else is in flight.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self.waited = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return f"ByteBudget({self.used}/{self.limit} bytes)"
+
+    def acquire(self, nbytes):
+        started = time.perf_counter()
+        with self._condition:
+            while self.used and self.used + nbytes > self.limit and not self._closed:
+                self._condition.wait()
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+            self.waited += time.perf_counter() - started
+
+    def release(self, nbytes):
+        with self._condition:
+            self.used -= nbytes
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Let every blocked and later acquire() through, so a pipeline being torn down cannot hang.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def _timed_call(function, argument):
+    # Module level, so process pools can run it: the compute time is measured
+    # where the work happens, not in the parent.
+    started = time.perf_counter()
+    value = function(argument)
+    return value, time.perf_counter() - started
+
+
+class StreamingPipeline:
+    """
+    Stream tasks through three stages that overlap: read(task) on a pool of
+    reader threads returns (item, nbytes), compute(item) runs on
+    compute_executor (a process pool, or threads; compute must be picklable
+    for processes) and write(task, item) on a pool of writer threads returns
+    the result of the task. Decoding and encoding release the GIL and the
+    file I/O waits on the disk, so readers and writers keep the compute
+    workers fed instead of taking turns with them.
+
+    Items hold byte_budget bytes at most between their read and their write
+    (see ByteBudget). run() yields (task, result, error, timings) in
+    completion order: error is None, or the message of the exception a stage
+    raised, and timings are the seconds the task spent in each stage.
+    occupancy() tells which stage is the bottleneck: the share of its
+    capacity (threads or workers) each stage kept busy.
+    """
+
+    def __init__(self, read, compute, write, compute_executor, compute_slots, readers=2, writers=2,
+                 byte_budget=1 << 30):
+        self.read = read
+        self.compute = compute
+        self.write = write
+        self.capacity = {'read': readers, 'compute': compute_slots, 'write': writers}
+        self.busy = dict.fromkeys(STAGES, 0.0)
+        self.budget = ByteBudget(byte_budget)
+        self._compute_executor = compute_executor
+        self._readers = None
+        self._writers = None
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = None
+        self._finished = None
+
+    def __repr__(self):
+        stages = ', '.join(f"{stage} x{self.capacity[stage]}" for stage in STAGES)
+        return f"StreamingPipeline({stages}, budget {self.budget.limit} bytes)"
+
+    def _account(self, stage, seconds):
+        with self._lock:
+            self.busy[stage] += seconds
+
+    def _fail(self, task, error, timings, nbytes=0):
+        if nbytes:
+            self.budget.release(nbytes)
+        self._results.put((task, None, str(error) or type(error).__name__, timings))
+
+    def _read(self, task):
+        timings = [0.0, 0.0, 0.0]
+        started = time.perf_counter()
+        try:
+            item, nbytes = self.read(task)
+        except Exception as e:
+            timings[0] = time.perf_counter() - started
+            self._account('read', timings[0])
+            self._fail(task, e, timings)
+            return
+        timings[0] = time.perf_counter() - started
+        self._account('read', timings[0])
+        # Waiting here is the backpressure, not read time
+        self.budget.acquire(nbytes)
+        try:
+            future = self._compute_executor.submit(_timed_call, self.compute, item)
+        except RuntimeError as e:
+            # The pipeline is shutting down
+            self._fail(task, e, timings, nbytes)
+            return
+        future.add_done_callback(lambda future: self._computed(task, nbytes, timings, future))
+
+    def _computed(self, task, nbytes, timings, future):
+        try:
+            item, timings[1] = future.result()
+        except BaseException as e:
+            self._fail(task, e, timings, nbytes)
+            return
+        self._account('compute', timings[1])
+        try:
+            self._writers.submit(self._write, task, nbytes, timings, item)
+        except RuntimeError as e:
+            self._fail(task, e, timings, nbytes)
+
+    def _write(self, task, nbytes, timings, item):
+        started = time.perf_counter()
+        try:
+            result = self.write(task, item)
+        except Exception as e:
+            timings[2] = time.perf_counter() - started
+            self._account('write', timings[2])
+            self._fail(task, e, timings, nbytes)
+            return
+        timings[2] = time.perf_counter() - started
+        self._account('write', timings[2])
+        self.budget.release(nbytes)
+        self._results.put((task, result, None, timings))
+
+    def run(self, tasks):
+        self._started = time.perf_counter()
+        self._readers = ThreadPoolExecutor(self.capacity['read'], thread_name_prefix='read')
+        self._writers = ThreadPoolExecutor(self.capacity['write'], thread_name_prefix='write')
+        try:
+            for task in tasks:
+                self._readers.submit(self._read, task)
+            for _ in range(len(tasks)):
+                yield self._results.get()
+        finally:
+            self._finished = time.perf_counter()
+            self.budget.close()
+            self._readers.shutdown(cancel_futures=True)
+            self._compute_executor.shutdown(cancel_futures=True)
+            self._writers.shutdown(cancel_futures=True)
+
+    @property
+    def elapsed(self):
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def occupancy(self):
+        """
+        The share of each stage's capacity kept busy so far, as {stage: fraction}.
+        """
+        elapsed = max(self.elapsed, 1e-9)
+        return {stage: self.busy[stage] / (self.capacity[stage] * elapsed) for stage in STAGES}
+
+    def report(self):
+        occupancy = self.occupancy()
+        stages = ', '.join(f"{stage} {100 * occupancy[stage]:.0f}% of {self.capacity[stage]}" for stage in STAGES)
+        return (f"Stage occupancy: {stages}; readers waited {self.budget.waited:.1f} s on the "
+                f"{self.budget.limit / 2 ** 20:.1f} MiB budget (peak {self.budget.peak / 2 ** 20:.1f} MiB)")
@@ -0,0 +1,94 @@
+import numpy as np
+
+try:
+    import torch
+    from torch.utils.data import DataLoader, Dataset, IterableDataset
+except ImportError:
+    raise ImportError('The PyTorch adapter needs the torch package (pip install torch)') from None
+
+from .online import DegradedIterable, init_worker
+
+
+def to_tensors(sample):
+    """
+    A sample of a DegradedDataset in the form collate batches: '__key__',
+    'images', its degraded images stacked into one (frames, H, W, C) uint8
+    tensor, BGR as OpenCV decodes them, and 'files', every other field as it
+    is (raw bytes, or arrays as tensors), keyed by field.
+    """
+    images = [sample[field] for field in sample['__images__']]
+    files = {field: torch.from_numpy(np.ascontiguousarray(value)) if isinstance(value, np.ndarray) else value
+             for field, value in sample.items()
+             if not field.startswith('__') and field not in sample['__images__']}
+    if images and len({image.shape for image in images}) == 1:
+        images = torch.from_numpy(np.stack(images))
+    else:
+        images = [torch.from_numpy(image) for image in images]
+    return {'__key__': sample['__key__'], 'images': images, 'files': files}
+
+
+def collate(batch):
+    """
+    Collate samples transformed by to_tensors: image stacks of one shape
+    become a (batch, frames, H, W, C) tensor, anything else (keys, files,
+    images of different sizes) a list.
+    """
+    images = [sample['images'] for sample in batch]
+    if all(isinstance(stack, torch.Tensor) for stack in images) and len({stack.shape for stack in images}) == 1:
+        images = torch.stack(images)
+    return {
+        '__key__': [sample['__key__'] for sample in batch],
+        'images': images,
+        'files': [sample['files'] for sample in batch],
+    }
+
+
+class TorchDegradedDataset(Dataset):
+    """
+    A DegradedDataset as a torch Dataset, with transform applied to every sample.
+    """
+
+    def __init__(self, dataset, transform=to_tensors):
+        self.dataset = dataset
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        return self.transform(self.dataset[index])
+
+    def set_epoch(self, epoch):
+        self.dataset.set_epoch(epoch)
+
+
+class TorchDegradedIterable(IterableDataset):
+    """
+    A DegradedIterable as a torch IterableDataset, with transform applied to
+    every sample. Every DataLoader worker yields its own share of the epoch.
+    """
+
+    def __init__(self, iterable, transform=to_tensors):
+        self.iterable = iterable
+        self.transform = transform
+
+    def __iter__(self):
+        return map(self.transform, self.iterable)
+
+    def set_epoch(self, epoch):
+        self.iterable.set_epoch(epoch)
+
+
+def data_loader(dataset, batch_size=1, workers=0, transform=to_tensors, **options):
+    """
+    A DataLoader over a DegradedDataset or a DegradedIterable, batching with
+    collate and limiting OpenCV threads in its workers (see init_worker).
+    Call set_epoch on the loader's dataset before each epoch; with
+    persistent_workers the workers keep the epoch they started with.
+    """
+    if isinstance(dataset, DegradedIterable):
+        wrapped = TorchDegradedIterable(dataset, transform)
+    else:
+        wrapped = TorchDegradedDataset(dataset, transform)
+    return DataLoader(wrapped, batch_size=batch_size, num_workers=workers, collate_fn=collate,
+                      worker_init_fn=init_worker if workers else None, **options)
@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+
+
+class Workspace:
+    """
+    An arena of named scratch buffers, meant to live for the whole life of a worker.
+
+    get() allocates a buffer the first time a name is requested and hands the
+    same memory out on every later call, so a worker processing frames of one
+    resolution sizes its temporaries once. A request that fits in the memory
+    already held under a name (the shorter last band of a tiled frame, see
+    Pipeline.run) gets a contiguous view of it; a larger one, or another
+    dtype, replaces the buffer. Names are per-op, so an op may hold its
+    buffers while it calls a lower-level op.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self.allocated = 0
+
+    def __repr__(self):
+        return f"Workspace({len(self._buffers)} buffers, {self.nbytes} bytes)"
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def get(self, name, shape, dtype):
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            size = int(np.prod(shape))
+            if buffer is not None and buffer.dtype == dtype and buffer.size >= size:
+                return buffer.reshape(-1)[:size].reshape(shape)
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+            self.allocated += buffer.nbytes
+        return buffer
+
+    def clear(self):
+        self._buffers.clear()
+
+
+_local = threading.local()
+
+
+def worker_workspace():
+    """
+    Return the workspace of the current thread, creating it on first use.
+    Every pool worker process and every compute thread gets its own arena.
+    """
+    workspace = getattr(_local, 'workspace', None)
+    if workspace is None:
+        workspace = _local.workspace = Workspace()
+    return workspace
+
+
+def scratch(workspace, name, shape, dtype):
+    """
+    A scratch buffer from workspace, or a fresh array when there is none.
+    """
+    if workspace is None:
+        return np.empty(shape, dtype=dtype)
+    return workspace.get(name, shape, dtype)
+
+
+def to_uint8(values, out=None):
+    """
+    Clip float values to [0, 255] in place and cast them to uint8, into out if given.
+    Same result as values.clip(0, 255).astype(np.uint8).
+    """
+    np.clip(values, 0, 255, out=values)
+    if out is None:
+        return values.astype(np.uint8)
+    np.copyto(out, values, casting='unsafe')
+    return out
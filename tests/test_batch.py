@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from low_light import apply_low_light_effects_batch
+
+
+@pytest.mark.parametrize('rng', [None, np.random, np.random.default_rng(0)])
+@pytest.mark.parametrize('shot_noise_mode', ['auto', 'table'])
+def test_shared_generator_low_noise(rng, shot_noise_mode):
+    # A noise level this low picks the table sampler under 'auto'
+    images = np.random.default_rng(1).integers(0, 256, (3, 24, 32, 3), dtype=np.uint8)
+    output = apply_low_light_effects_batch(images, 0.1, 10, 0.5, 5, 1.0, 0.8, 1, 1, 1,
+                                           shot_noise_mode=shot_noise_mode, rng=rng)
+    assert output.shape == images.shape
+    assert output.dtype == np.uint8
@@ -0,0 +1,9 @@
+from low_light.convert import parameter_digest
+
+OPTIONS = {'effect': 'low_light', 'ranges': None, 'shot_noise_mode': 'auto', 'saturation_mode': 'luma'}
+
+
+def test_digest_depends_on_pointwise_mode():
+    lut = parameter_digest(dict(OPTIONS, mode='lut'), seed=0)
+    assert lut == parameter_digest(OPTIONS, seed=0)
+    assert lut != parameter_digest(dict(OPTIONS, mode='staged'), seed=0)
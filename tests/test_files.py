@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from low_light import files
+
+
+def _short(source_fd, target_fd, size, chunk_size):
+    os.write(target_fd, os.read(source_fd, size // 2))
+    return size // 2
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source.bin'
+    path.write_bytes(os.urandom(10000))
+    return path
+
+
+def test_short_copy_falls_back(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(files, '_COPY_METHODS', [('short', _short), ('read_write', files._read_write)])
+    target = tmp_path / 'target.bin'
+    assert files.copy_fast(source, target) == 'read_write'
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_short_copy_is_not_renamed(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(files, '_COPY_METHODS', [('read_write', _short)])
+    target = tmp_path / 'target.bin'
+    with pytest.raises(OSError):
+        files.copy_fast(source, target)
+    assert os.listdir(tmp_path) == ['source.bin']
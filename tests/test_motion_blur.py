@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import cv2
+
+from low_light import RandomStreams, apply_low_light_effects, apply_motion_blur
+
+
+@pytest.fixture(scope='module')
+def frame():
+    image = np.random.default_rng(0).integers(0, 256, (120, 200, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(image, (0, 0), 2)
+
+
+@pytest.mark.parametrize('kernel_size', range(3, 32))
+def test_separable_matches_dense(frame, kernel_size):
+    dense = apply_motion_blur(frame, kernel_size, method='dense')
+    np.testing.assert_array_equal(apply_motion_blur(frame, kernel_size, method='separable'), dense)
+
+
+@pytest.mark.parametrize('kernel_size', range(3, 32))
+def test_staged_matches_lut(frame, kernel_size):
+    ranges = {'blur_kernel': (kernel_size, kernel_size)}
+    staged = apply_low_light_effects(frame, frame, RandomStreams(0), 0, ranges, mode='staged',
+                                     shot_noise_mode='poisson')
+    lut = apply_low_light_effects(frame, frame, RandomStreams(0), 0, ranges, mode='lut', shot_noise_mode='poisson')
+    for staged_frame, lut_frame in zip(staged, lut):
+        np.testing.assert_array_equal(staged_frame, lut_frame)
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from low_light.sampling import DESIGNS, sample_table
+
+RANGES = {'a': (0, 1), 'b': (0, 1), 'c': (0, 1), 'd': (0, 1), 'e': (0, 1)}
+CORRELATIONS = [('a', 'b', 0.5), ('b', 'c', -0.3), ('d', 'e', 0.4)]
+
+
+@pytest.mark.parametrize('design', DESIGNS)
+@pytest.mark.parametrize('count', range(1, 8))
+def test_few_samples_with_correlations(design, count):
+    table = sample_table(count, RANGES, design, correlations=CORRELATIONS, rng=np.random.default_rng(0))
+    for values in table.values():
+        assert values.shape == (count,)
+        assert ((values >= 0) & (values <= 1)).all()